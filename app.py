@@ -2,6 +2,8 @@ import os
 from flask import Flask
 from flask_cors import CORS
 from app import db, routes
+from app.logging_setup import configure_logging
+from app.sqlite_profile import apply_sqlite_pragmas, configure_sqlite_engine
 
 def create_app(test_config=None):
     """Create and configure the Flask application"""
@@ -24,14 +26,19 @@ def create_app(test_config=None):
         # Load test configuration
         app.config.update(test_config)
 
+    # Route logging through the background writer
+    configure_logging(app.config)
+
     # Ensure instance folder exists
     try:
         os.makedirs(app.instance_path)
     except OSError:
         pass
 
-    # Initialize database
+    # Initialize database with the SQLite tuning profile
+    configure_sqlite_engine(app)
     db.init_app(app)
+    apply_sqlite_pragmas(app, db)
 
     # Register blueprints
     app.register_blueprint(routes.bp)
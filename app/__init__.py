@@ -1,11 +1,12 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, jsonify, request
 from flask_migrate import Migrate
+from .models import db
+from .logging_setup import configure_logging
+from .sqlite_profile import apply_sqlite_pragmas, configure_sqlite_engine
 import os
 import logging
 import traceback
 
-db = SQLAlchemy()
 migrate = Migrate()
 
 def init_db(app):
@@ -36,28 +37,28 @@ def create_app(test_config=None):
     config = {**default_config, **test_config}
     
     # Special handling for testing environment
-    if test_config.get('TESTING', False):
+    if test_config.get('TESTING', False) and 'SQLALCHEMY_DATABASE_URI' not in test_config:
         config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     
     app.config.from_mapping(config)
+
+    # Configure logging before anything else logs
+    configure_logging(app.config)
     
-    # Initialize extensions
+    # Initialize extensions with the SQLite tuning profile
+    configure_sqlite_engine(app)
     db.init_app(app)
+    apply_sqlite_pragmas(app, db)
     migrate.init_app(app, db)
     
     # Initialize database
     init_db(app)
     
-    # Initialize routes
-    from .routes import init_routes
+    # Register blueprints and initialize routes
+    from .routes import bp, init_routes
+    app.register_blueprint(bp)
     init_routes(app)
     
-    # Configure logging
-    logging.basicConfig(
-        filename='system.log',
-        level=logging.INFO,
-        format='%(asctime)s %(levelname)s %(name)s %(threadName)s : %(message)s'
-    )
     logger = logging.getLogger(__name__)
     
     # Error handling middleware
@@ -74,7 +75,9 @@ def create_app(test_config=None):
     
     @app.after_request
     def after_request(response):
-        logger.info(f"{request.method} {request.path} {response.status_code}")
+        logger.info('%s %s %s', request.method, request.path, response.status_code, extra={
+            'method': request.method, 'path': request.path, 'status': response.status_code
+        })
         return response
     
     return app
@@ -0,0 +1,188 @@
+from collections import OrderedDict
+from functools import wraps
+import hashlib
+import json
+import threading
+import time
+from flask import Response, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .models import Task, Log
+
+# Default time-to-live in seconds for each cached namespace
+DEFAULT_TTLS = {
+    'tasks': 5,
+    'logs': 5,
+    'dashboard': 30
+}
+
+# Namespaces invalidated when a model of the given type is written
+MODEL_NAMESPACES = {
+    Task: ('tasks', 'dashboard'),
+    Log: ('logs', 'dashboard')
+}
+
+# Response headers that are part of a cached entry
+CACHED_HEADERS = ('X-Next-Cursor', 'X-Search-Order')
+
+class LRUCacheBackend:
+    """In-process LRU cache with per-entry expiry"""
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_version(self, namespace):
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def bump_version(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+class RedisCacheBackend:
+    """Redis cache shared between processes"""
+    def __init__(self, url, prefix='response-cache:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.setex(self.prefix + key, max(1, int(ttl)), json.dumps(value))
+
+    def get_version(self, namespace):
+        raw = self.client.get(f'{self.prefix}version:{namespace}')
+        return int(raw) if raw is not None else 0
+
+    def bump_version(self, namespace):
+        self.client.incr(f'{self.prefix}version:{namespace}')
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+class ResponseCache:
+    """Response cache for read-heavy endpoints.
+
+    Entries are keyed by namespace, namespace version and request path.
+    Invalidating a namespace bumps its version, so stale entries are never
+    read again and age out through their TTL or LRU eviction.
+    """
+    def __init__(self):
+        self.backend = LRUCacheBackend()
+        self.ttls = dict(DEFAULT_TTLS)
+        self.enabled = True
+
+    def init_app(self, app):
+        """Configure the backend from CACHE_* settings"""
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        if backend == 'redis':
+            self.backend = RedisCacheBackend(
+                app.config.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+            )
+        elif backend == 'memory':
+            self.backend = LRUCacheBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        else:
+            raise ValueError(f'Unknown cache backend: {backend}')
+        self.ttls = {**DEFAULT_TTLS, **app.config.get('CACHE_TTLS', {})}
+        self.enabled = app.config.get('CACHE_ENABLED', True)
+        app.extensions['response_cache'] = self
+
+        if not event.contains(Session, 'after_flush', _track_writes):
+            event.listen(Session, 'after_flush', _track_writes)
+            event.listen(Session, 'after_commit', _invalidate_written)
+            event.listen(Session, 'after_rollback', _discard_written)
+
+    def make_key(self, namespace):
+        version = self.backend.get_version(namespace)
+        query = '&'.join(sorted(request.query_string.decode('utf-8').split('&')))
+        return f'{namespace}:{version}:{request.path}?{query}'
+
+    def invalidate(self, *namespaces):
+        """Invalidate every cached entry of the given namespaces"""
+        for namespace in namespaces:
+            self.backend.bump_version(namespace)
+
+    def invalidate_models(self, *models):
+        """Invalidate the namespaces that depend on the given models"""
+        namespaces = set()
+        for model in models:
+            namespaces.update(MODEL_NAMESPACES.get(model, ()))
+        self.invalidate(*namespaces)
+
+cache = ResponseCache()
+
+def cached(namespace):
+    """Cache a view's 200 responses and answer If-None-Match with 304"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not cache.enabled:
+                return view(*args, **kwargs)
+
+            key = cache.make_key(namespace)
+            entry = cache.backend.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data(as_text=True)
+                entry = {
+                    'body': body,
+                    'mimetype': response.mimetype,
+                    'headers': {h: response.headers[h] for h in CACHED_HEADERS if h in response.headers},
+                    'etag': hashlib.sha1(body.encode('utf-8')).hexdigest()
+                }
+                cache.backend.set(key, entry, cache.ttls.get(namespace, 5))
+
+            response = Response(entry['body'], mimetype=entry['mimetype'], headers=entry['headers'])
+            response.set_etag(entry['etag'])
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+def _track_writes(session, flush_context):
+    """after_flush hook: remember which cached models this transaction wrote"""
+    written = session.info.setdefault('cache_written_models', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if type(obj) in MODEL_NAMESPACES:
+            written.add(type(obj))
+
+def _invalidate_written(session):
+    written = session.info.pop('cache_written_models', None)
+    if written:
+        cache.invalidate_models(*written)
+
+def _discard_written(session):
+    session.info.pop('cache_written_models', None)
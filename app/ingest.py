@@ -0,0 +1,146 @@
+from collections import deque
+import atexit
+import logging
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from .models import Log, db
+from . import rollups
+from .cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Defaults for the LOG_INGEST_* settings
+DEFAULT_QUEUE_SIZE = 100000
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_FLUSH_MS = 200
+# How long stop() keeps retrying queued rows on a locked database
+DEFAULT_STOP_TIMEOUT_MS = 10000
+
+class LogIngestQueue:
+    """Bounded in-process buffer of log rows written by a background flusher.
+
+    Rows are written with one executemany per batch, either when
+    ``batch_size`` rows are waiting or ``flush_interval`` seconds after the
+    oldest waiting row arrived, whichever comes first.
+    """
+    def __init__(self, max_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_MS / 1000, stop_timeout=DEFAULT_STOP_TIMEOUT_MS / 1000):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stop_timeout = stop_timeout
+        self.app = None
+        self._rows = deque()
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        atexit.register(self.stop)
+
+    def init_app(self, app):
+        """Bind the queue to an app and read LOG_INGEST_* settings"""
+        self.stop()
+        self.app = app
+        self.max_size = app.config.get('LOG_INGEST_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+        self.batch_size = app.config.get('LOG_INGEST_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.flush_interval = app.config.get('LOG_INGEST_FLUSH_MS', DEFAULT_FLUSH_MS) / 1000
+        self.stop_timeout = app.config.get('LOG_INGEST_STOP_TIMEOUT_MS', DEFAULT_STOP_TIMEOUT_MS) / 1000
+        app.extensions['log_ingest'] = self
+
+    def submit(self, rows):
+        """Queue rows for writing; returns False if the queue lacks room for all of them"""
+        with self._condition:
+            if len(self._rows) + len(rows) > self.max_size:
+                return False
+            self._rows.extend(rows)
+            if len(self._rows) >= self.batch_size:
+                self._condition.notify()
+        self._ensure_started()
+        return True
+
+    def depth(self):
+        with self._condition:
+            return len(self._rows)
+
+    def flush(self, timeout=0):
+        """Write every queued row synchronously; returns the number left queued.
+
+        A batch that fails on a locked database is retried until
+        ``timeout`` seconds have passed.
+        """
+        deadline = time.monotonic() + timeout
+        while self.depth():
+            if not self._write_batch() and time.monotonic() >= deadline:
+                break
+        return self.depth()
+
+    def stop(self):
+        """Stop the flusher thread after draining the queue.
+
+        Rows that still cannot be written after ``stop_timeout`` seconds
+        are dropped and counted in an error log.
+        """
+        with self._condition:
+            thread = self._thread
+            self._running = False
+            self._thread = None
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+        if self.app is not None and self.flush(self.stop_timeout):
+            with self._condition:
+                dropped = len(self._rows)
+                self._rows.clear()
+            logger.error(f"Log ingest dropped {dropped} queued rows at shutdown: "
+                         f"not written within {self.stop_timeout:g}s")
+
+    def _ensure_started(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='log-ingest-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                if len(self._rows) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if not self._rows:
+                    continue
+            self._write_batch()
+
+    def _take_batch(self):
+        with self._condition:
+            count = min(self.batch_size, len(self._rows))
+            return [self._rows.popleft() for _ in range(count)]
+
+    def _write_batch(self):
+        """Write up to batch_size rows; returns the number taken off the queue"""
+        with self._write_lock:
+            batch = self._take_batch()
+            if not batch:
+                return 0
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as connection:
+                        connection.execute(Log.__table__.insert(), batch)
+                        rollups.apply_log_deltas(connection, rollups.log_deltas(batch))
+            except OperationalError as e:
+                # Usually a locked database; put the batch back and retry later
+                logger.warning(f"Log ingest write failed, retrying: {e}")
+                with self._condition:
+                    self._rows.extendleft(reversed(batch))
+                time.sleep(self.flush_interval)
+                return 0
+            except Exception as e:
+                logger.error(f"Log ingest dropped {len(batch)} rows: {e}")
+                return len(batch)
+            cache.invalidate_models(Log)
+            return len(batch)
+
+log_ingest = LogIngestQueue()
@@ -0,0 +1,208 @@
+import base64
+import html
+import json
+import re
+import click
+from flask.cli import AppGroup
+from sqlalchemy import DateTime, text
+from .models import db
+from .pagination import PaginationError
+
+search_cli = AppGroup('log-search', help='Manage the log full-text search index.')
+
+# Log columns mirrored into the FTS5 table, in index column order
+SEARCH_COLUMNS = ('error_message', 'source_server_file_path', 'source_server_file_name')
+# bm25 weights of SEARCH_COLUMNS; a hit in the error text outranks a path hit
+RANK_WEIGHTS = (10.0, 1.0, 2.0)
+# Markers wrapped around matched terms in the ``highlight`` fields
+HIGHLIGHT_OPEN = '<mark>'
+HIGHLIGHT_CLOSE = '</mark>'
+# Private-use characters highlight() puts around matches; they become the
+# markers above only after the column text has been HTML-escaped
+MATCH_START = '\ue000'
+MATCH_END = '\ue001'
+# Result orders accepted by search_logs
+SEARCH_ORDERS = ('rank', 'recent')
+# Newest matches scored by ``rank``. bm25 scores and sorts every row it
+# ranks, so relevance is computed within this window of recent matches
+# and the cost of a page stays bounded however broad the search is
+RANK_WINDOW = 5000
+
+_columns = ', '.join(SEARCH_COLUMNS)
+_new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+_old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+
+# External-content FTS5 table over ``log`` plus the triggers keeping it in
+# sync; the index stores only tokens, the text stays in ``log``
+CREATE_STATEMENTS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING fts5({_columns}, "
+    f"content='log', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS log_fts_insert AFTER INSERT ON log BEGIN "
+    f"INSERT INTO log_fts(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    f"CREATE TRIGGER IF NOT EXISTS log_fts_delete AFTER DELETE ON log BEGIN "
+    f"INSERT INTO log_fts(log_fts, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); END",
+    f"CREATE TRIGGER IF NOT EXISTS log_fts_update AFTER UPDATE OF {_columns} ON log BEGIN "
+    f"INSERT INTO log_fts(log_fts, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); "
+    f"INSERT INTO log_fts(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    "INSERT INTO log_fts(log_fts, rank) VALUES "
+    f"('rank', 'bm25({', '.join(str(weight) for weight in RANK_WEIGHTS)})')"
+]
+_highlights = ',\n    '.join(
+    f"highlight(log_fts, {index}, :open, :close) AS {column}_highlight"
+    for index, column in enumerate(SEARCH_COLUMNS)
+)
+SEARCH_SQL = f"""
+SELECT log.id, log.task_id, task.name AS task_name, log.source_server_name,
+    log.source_server_ip, log.source_server_file_path, log.source_server_file_name,
+    log.task_time, log.bytes_transferred, log.duration_ms, log.error_message, {{rank}} AS rank,
+    {{floor}} AS rank_floor,
+    {_highlights}
+FROM log_fts
+JOIN log ON log.id = log_fts.rowid
+LEFT OUTER JOIN task ON task.id = log.task_id
+WHERE log_fts MATCH :query {{window}} {{after}}
+ORDER BY {{order}}
+LIMIT :limit
+"""
+# Lowest rowid of the RANK_WINDOW newest matches; FTS5 reads rowids newest
+# first and stops at the window, without scoring them
+WINDOW_FLOOR_SQL = (
+    '(SELECT min(rowid) FROM (SELECT rowid FROM log_fts WHERE log_fts MATCH :query '
+    'ORDER BY rowid DESC LIMIT :window))'
+)
+# Keyset conditions continuing after the cursor row, per order
+AFTER_CONDITIONS = {
+    'rank': 'AND (log_fts.rank > :rank OR (log_fts.rank = :rank AND log_fts.rowid > :row_id))',
+    'recent': 'AND log_fts.rowid < :row_id'
+}
+ORDER_CLAUSES = {
+    'rank': 'log_fts.rank, log_fts.rowid',
+    'recent': 'log_fts.rowid DESC'
+}
+# Reading the rank column makes FTS5 score every match, so only rank reads it
+RANK_COLUMNS = {
+    'rank': 'log_fts.rank',
+    'recent': 'NULL'
+}
+
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+def match_terms(q):
+    """Split user search text into quoted FTS5 phrases.
+
+    Words and "quoted phrases" must all match; a trailing ``*`` makes a
+    word a prefix search. FTS5 operators in the input are treated as plain
+    text, so no input can produce a query syntax error.
+    """
+    terms = []
+    for phrase, word in _TERM.findall(q or ''):
+        prefix = False
+        if word:
+            prefix = word.endswith('*')
+            phrase = word.rstrip('*')
+        phrase = phrase.replace('"', '').strip()
+        if phrase:
+            terms.append('"' + phrase + '"' + ('*' if prefix else ''))
+    if not terms:
+        raise PaginationError('q must contain at least one search term')
+    return terms
+
+def highlight_html(value):
+    """HTML-escaped highlight() text with matched terms wrapped in <mark>"""
+    return html.escape(value).replace(MATCH_START, HIGHLIGHT_OPEN).replace(MATCH_END, HIGHLIGHT_CLOSE)
+
+def _encode_cursor(values):
+    payload = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    """Return the order and keyset parameters stored in a search cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if values[0] == 'rank':
+            return 'rank', {'rank': float(values[1]), 'row_id': int(values[2]), 'floor': int(values[3])}
+        if values[0] == 'recent':
+            return 'recent', {'row_id': int(values[1])}
+    except Exception:
+        pass
+    raise PaginationError('Invalid cursor')
+
+def search_logs(q, limit, cursor=None, order='rank'):
+    """One page of logs matching ``q``; returns (rows, next_cursor, order).
+
+    ``rank`` orders the RANK_WINDOW newest matches by weighted bm25
+    relevance and ``recent`` orders every match newest first. Cursors carry
+    their order, and pages continue from the cursor's (rank, id) or id, so
+    deep pages cost the same as the first. A rank cursor also keeps the
+    window of its first page.
+    """
+    if order not in SEARCH_ORDERS:
+        raise PaginationError(f'order must be one of {", ".join(SEARCH_ORDERS)}')
+    query = ' '.join(match_terms(q))
+    params = {'query': query, 'limit': limit + 1, 'open': MATCH_START, 'close': MATCH_END}
+    after = ''
+    floor = WINDOW_FLOOR_SQL
+    if cursor:
+        order, keys = _decode_cursor(cursor)
+        params.update(keys)
+        after = AFTER_CONDITIONS[order]
+        if order == 'rank':
+            floor = ':floor'
+    if order == 'rank':
+        params['window'] = RANK_WINDOW
+        window = f'AND log_fts.rowid >= {floor}'
+    else:
+        floor = 'NULL'
+        window = ''
+    sql = SEARCH_SQL.format(
+        after=after, order=ORDER_CLAUSES[order], rank=RANK_COLUMNS[order], floor=floor, window=window
+    )
+    rows = db.session.execute(text(sql).columns(task_time=DateTime), params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if order == 'rank':
+            next_cursor = _encode_cursor(['rank', last.rank, last.id, last.rank_floor])
+        else:
+            next_cursor = _encode_cursor(['recent', last.id])
+    return rows, next_cursor, order
+
+def create_search_index(connection):
+    """Create the FTS table and its triggers if they do not exist yet.
+
+    Returns True when the table was created; rows already in ``log`` are
+    only indexed by a rebuild.
+    """
+    exists = connection.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'log_fts'"
+    )).first()
+    for statement in CREATE_STATEMENTS:
+        if exists and statement.startswith('INSERT'):
+            continue
+        connection.execute(text(statement))
+    return not exists
+
+def rebuild_search_index():
+    """Re-index every log row and merge the index into one segment"""
+    session = db.session
+    session.execute(text("INSERT INTO log_fts(log_fts) VALUES ('rebuild')"))
+    session.execute(text("INSERT INTO log_fts(log_fts) VALUES ('optimize')"))
+    session.commit()
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    """Rebuild the log search index from the log table."""
+    rebuild_search_index()
+    click.echo('Log search index rebuilt')
+
+def init_log_search(app):
+    """Make sure the search index exists and register its CLI commands"""
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            with db.engine.begin() as connection:
+                if create_search_index(connection):
+                    connection.execute(text("INSERT INTO log_fts(log_fts) VALUES ('rebuild')"))
+    app.cli.add_command(search_cli)
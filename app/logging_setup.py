@@ -0,0 +1,187 @@
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import time
+
+# Defaults for the LOG_* settings
+DEFAULT_LOG_SETTINGS = {
+    'LOG_FILE': 'system.log',
+    'LOG_LEVEL': 'INFO',
+    'LOG_FORMAT': 'json',          # 'json' or 'text'
+    'LOG_ROTATION': 'size',        # 'size', 'time' or None
+    'LOG_MAX_BYTES': 10 * 1024 * 1024,
+    'LOG_ROTATE_WHEN': 'midnight',
+    'LOG_BACKUP_COUNT': 5,
+    'LOG_COMPRESS': True,
+    'LOG_CONSOLE': False,
+    'LOG_QUEUE_SIZE': 10000
+}
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s %(threadName)s : %(message)s'
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the record's ``extra`` fields merged in"""
+    def __init__(self):
+        super().__init__()
+        self._second = None
+        self._second_text = ''
+
+    def _timestamp(self, created):
+        # strftime once per second; log bursts mostly share the same second
+        second = int(created)
+        if second != self._second:
+            self._second = second
+            self._second_text = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(second))
+        return f'{self._second_text}.{int((created - second) * 1000):03d}'
+
+    def format(self, record):
+        entry = {
+            'time': self._timestamp(record.created),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+def _file_handler(settings):
+    path = settings['LOG_FILE']
+    if settings['LOG_ROTATION'] == 'size':
+        handler = RotatingFileHandler(
+            path, maxBytes=settings['LOG_MAX_BYTES'], backupCount=settings['LOG_BACKUP_COUNT'],
+            encoding='utf-8', delay=True
+        )
+    elif settings['LOG_ROTATION'] == 'time':
+        handler = TimedRotatingFileHandler(
+            path, when=settings['LOG_ROTATE_WHEN'], backupCount=settings['LOG_BACKUP_COUNT'],
+            encoding='utf-8', delay=True
+        )
+    else:
+        return logging.FileHandler(path, encoding='utf-8', delay=True)
+    if settings['LOG_COMPRESS']:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+class _LoggingPipeline:
+    """The root QueueHandler and the listener thread writing its records"""
+    def __init__(self):
+        self.settings = None
+        self.queue_handler = None
+        self.listener = None
+        atexit.register(self.stop)
+
+    def configure(self, config=None):
+        settings = {key: (config or {}).get(key, default) for key, default in DEFAULT_LOG_SETTINGS.items()}
+        if settings == self.settings:
+            return
+        self.stop()
+
+        formatter = JsonFormatter() if settings['LOG_FORMAT'] == 'json' else logging.Formatter(TEXT_FORMAT)
+        handlers = []
+        if settings['LOG_FILE']:
+            handlers.append(_file_handler(settings))
+        if settings['LOG_CONSOLE']:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.Queue(settings['LOG_QUEUE_SIZE'])
+        self.queue_handler = _DroppingQueueHandler(log_queue)
+        self.listener = _BlockingStopListener(log_queue, *handlers, respect_handler_level=True)
+        root = logging.getLogger()
+        root.addHandler(self.queue_handler)
+        root.setLevel(settings['LOG_LEVEL'])
+        self.listener.start()
+        self.settings = settings
+
+    def stop(self):
+        """Flush queued records, report dropped ones and close the handlers"""
+        if self.listener is None:
+            return
+        logging.getLogger().removeHandler(self.queue_handler)
+        self.listener.stop()
+        dropped = self.queue_handler.dropped
+        if dropped:
+            record = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                f'Dropped {dropped} log records because the log queue was full', None, None
+            )
+            record.dropped = dropped
+            for handler in self.listener.handlers:
+                handler.handle(record)
+        for handler in self.listener.handlers:
+            handler.close()
+        self.listener = None
+        self.queue_handler = None
+        self.settings = None
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops and counts records instead of blocking when the queue is full"""
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge args and render tracebacks now, as the base class does, but
+        # without formatting and copying the record on the caller's thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Handler.handle holds the handler lock here, so the count is exact
+            self.dropped += 1
+
+class _BlockingStopListener(QueueListener):
+    """QueueListener whose stop waits for room in a full queue instead of raising"""
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+_pipeline = _LoggingPipeline()
+
+def configure_logging(config=None):
+    """Route all logging through a background QueueListener.
+
+    Callers only put records on a bounded queue; formatting, JSON encoding
+    and file writes with rotation happen on the listener thread. Settings
+    come from the LOG_* keys of ``config`` (see DEFAULT_LOG_SETTINGS).
+    Calling it again with the same settings is a no-op.
+    """
+    _pipeline.configure(config)
+
+def stop_logging():
+    """Drain the log queue and close the log files"""
+    _pipeline.stop()
+
+def dropped_log_records():
+    """Records dropped on a full log queue since logging was configured"""
+    return _pipeline.queue_handler.dropped if _pipeline.queue_handler is not None else 0
@@ -1,6 +1,6 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, synonym
 from sqlalchemy import ForeignKey
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -30,7 +30,30 @@ class Task(db.Model):
     status = db.Column(db.String(20), nullable=False, default='pending')
     priority = db.Column(db.String(20), nullable=False, default='medium')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    task_type = db.Column(db.String(50))
+    payload = db.Column(db.Text)
+    progress = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    checkpoint = db.Column(db.Text)
+    due_date = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    owner = db.Column(db.String(100))
+    error_code = db.Column(db.String(50))
+    error_message = db.Column(db.String(500))
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    retry_policy = db.Column(db.Text)
+    next_attempt_at = db.Column(db.DateTime)
+    result = db.Column(db.Text)
+    title = synonym('name')
     logs = relationship('Log', back_populates='task')
+
+    # Composite indexes backing keyset pagination on (created_at, id)
+    __table_args__ = (
+        db.Index('ix_task_created_at_id', 'created_at', 'id'),
+        db.Index('ix_task_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_task_priority_created_at_id', 'priority', 'created_at', 'id'),
+    )
     
     def __repr__(self):
         return f'<Task {self.name}>'
@@ -46,6 +69,147 @@ class Log(db.Model):
     source_server_file_name = db.Column(db.String(100))
     task_time = db.Column(db.DateTime, default=datetime.utcnow)
     error_message = db.Column(db.String(500))
+    bytes_transferred = db.Column(db.BigInteger)
+    duration_ms = db.Column(db.Integer)
+
+    # Indexes backing keyset pagination on (task_time, id) and the log filters
+    __table_args__ = (
+        db.Index('ix_log_task_time_id', 'task_time', 'id'),
+        db.Index('ix_log_task_id_task_time_id', 'task_id', 'task_time', 'id'),
+        db.Index('ix_log_server_name_task_time_id', 'source_server_name', 'task_time', 'id'),
+        db.Index('ix_log_server_ip_task_time_id', 'source_server_ip', 'task_time', 'id'),
+        db.Index('ix_log_errors_task_time_id', 'task_time', 'id',
+                 sqlite_where=db.text('error_message IS NOT NULL')),
+    )
     
     def __repr__(self):
         return f'<Log {self.task_id}>'
+
+class TaskDependency(db.Model):
+    """任务依赖模型 (task_id 在 depends_on_id 完成后才能运行)"""
+    task_id = db.Column(db.Integer, ForeignKey('task.id'), primary_key=True)
+    depends_on_id = db.Column(db.Integer, ForeignKey('task.id'), primary_key=True)
+
+    # Children of a task are looked up when it finishes
+    __table_args__ = (
+        db.Index('ix_task_dependency_depends_on_id', 'depends_on_id'),
+    )
+
+    def __repr__(self):
+        return f'<TaskDependency {self.task_id} -> {self.depends_on_id}>'
+
+class TaskDailyStat(db.Model):
+    """任务日统计模型 (按创建日期/状态/优先级汇总)"""
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<TaskDailyStat {self.day} {self.status} {self.priority}>'
+
+class TaskCompletionStat(db.Model):
+    """任务完成日统计模型 (按完成日期汇总)"""
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<TaskCompletionStat {self.day}>'
+
+class LogDailyStat(db.Model):
+    """日志日统计模型 (按日期/源服务器汇总)"""
+    day = db.Column(db.Date, primary_key=True)
+    source_server_name = db.Column(db.String(100), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<LogDailyStat {self.day} {self.source_server_name}>'
+
+class StoredFile(db.Model):
+    """文件模型 (内容保存在文件存储目录的 storage_name 下)"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    storage_name = db.Column(db.String(64), nullable=False, unique=True)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    content_type = db.Column(db.String(100))
+    # Resumable upload the file was completed from, so completing it again finds the file
+    upload_id = db.Column(db.String(32), unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Keyset pagination of the file list on (created_at, id)
+    __table_args__ = (
+        db.Index('ix_stored_file_created_at_id', 'created_at', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<StoredFile {self.name}>'
+
+class FileUpload(db.Model):
+    """分块上传会话模型 (offset 为已持久化的字节数)"""
+    id = db.Column(db.String(32), primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger)
+    offset = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    content_type = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FileUpload {self.id}>'
+
+class ContentObject(db.Model):
+    """内容寻址存储对象模型 (以内容摘要为键)"""
+    digest = db.Column(db.String(128), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    mtime_ns = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<ContentObject {self.digest}>'
+
+class ContentSource(db.Model):
+    """内容来源索引模型 (路径或 URL 在给定大小/版本下对应的摘要)"""
+    location = db.Column(db.String(500), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    version = db.Column(db.String(200), nullable=False)
+    digest = db.Column(db.String(128), nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ContentSource {self.location}>'
+
+class FileState(db.Model):
+    """文件同步状态模型 (每个源服务器上文件最后一次同步时的大小/修改时间/摘要)"""
+    id = db.Column(db.Integer, primary_key=True)
+    source_server_name = db.Column(db.String(100), nullable=False)
+    path = db.Column(db.String(1024), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    mtime_ns = db.Column(db.BigInteger, nullable=False)
+    digest = db.Column(db.String(128), nullable=False)
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('source_server_name', 'path', name='uq_file_state_server_path'),
+    )
+
+    def __repr__(self):
+        return f'<FileState {self.source_server_name}:{self.path}>'
+
+class FileChecksum(db.Model):
+    """文件校验结果模型 (文件在给定大小/修改时间下的摘要)"""
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(1024), nullable=False)
+    algorithm = db.Column(db.String(20), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    mtime_ns = db.Column(db.BigInteger, nullable=False)
+    digest = db.Column(db.String(128), nullable=False)
+    verified_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('path', 'algorithm', name='uq_file_checksum_path_algorithm'),
+    )
+
+    def __repr__(self):
+        return f'<FileChecksum {self.path} {self.algorithm}>'
@@ -0,0 +1,83 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+class PaginationError(ValueError):
+    """Raised when pagination or filter parameters are invalid"""
+    pass
+
+def encode_cursor(timestamp, row_id):
+    """Encode a (timestamp, id) keyset position as an opaque cursor"""
+    payload = json.dumps([timestamp.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise PaginationError('Invalid cursor')
+
+def parse_limit(value):
+    """Parse the page size, clamped to MAX_PAGE_SIZE"""
+    if value is None or value == '':
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+def parse_datetime(value, name):
+    """Parse an ISO 8601 query parameter, returning None when absent"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise PaginationError(f'{name} must be an ISO 8601 datetime')
+
+def parse_bool(value, name):
+    """Parse a boolean query parameter, returning None when absent"""
+    if value is None or value == '':
+        return None
+    lowered = value.lower()
+    if lowered in ('1', 'true', 'yes'):
+        return True
+    if lowered in ('0', 'false', 'no'):
+        return False
+    raise PaginationError(f'{name} must be a boolean')
+
+def parse_list(value):
+    """Split a comma separated query parameter into a list"""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def keyset_page(query, time_column, id_column, cursor, limit):
+    """Apply newest-first keyset pagination on (time_column, id_column).
+
+    Returns the rows of the page and the cursor of the next page, or None
+    when this is the last page. The query must select the two key columns.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(time_column, id_column) < (timestamp, row_id))
+
+    rows = query.order_by(time_column.desc(), id_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            getattr(last, time_column.key), getattr(last, id_column.key)
+        )
+    return rows, next_cursor
@@ -0,0 +1,262 @@
+from collections import Counter
+from datetime import date, datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .models import Task, Log, TaskDailyStat, TaskCompletionStat, LogDailyStat, db
+
+rollup_cli = AppGroup('rollups', help='Manage the dashboard rollup tables.')
+
+def _day(value):
+    return (value or datetime.utcnow()).date()
+
+def _server_key(name):
+    # Primary key columns cannot be NULL, so unnamed servers share ''
+    return name or ''
+
+def task_deltas(rows):
+    """Count (day, status, priority) buckets for task mappings being inserted"""
+    deltas = Counter()
+    for row in rows:
+        deltas[(_day(row.get('created_at')), row['status'], row['priority'])] += 1
+    return deltas
+
+def completion_deltas(rows):
+    """Count completed tasks per completion day for task mappings"""
+    deltas = Counter()
+    for row in rows:
+        if row.get('status') == 'completed':
+            deltas[_day(row.get('finished_at') or row.get('updated_at'))] += 1
+    return deltas
+
+def log_deltas(rows):
+    """Count (day, server) totals and errors for log mappings being inserted"""
+    deltas = Counter()
+    for row in rows:
+        key = (_day(row.get('task_time')), _server_key(row.get('source_server_name')))
+        deltas[key + ('total',)] += 1
+        if row.get('error_message') is not None:
+            deltas[key + ('errors',)] += 1
+    return deltas
+
+def apply_task_deltas(connection, deltas):
+    """Add task bucket deltas to task_daily_stat in the current transaction"""
+    params = [
+        {'day': day, 'status': status, 'priority': priority, 'count': delta}
+        for (day, status, priority), delta in deltas.items() if delta
+    ]
+    if not params:
+        return
+    table = TaskDailyStat.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.status, table.c.priority],
+        set_={'count': table.c.count + stmt.excluded.count}
+    )
+    connection.execute(stmt, params)
+
+def apply_completion_deltas(connection, deltas):
+    """Add completion day deltas to task_completion_stat in the current transaction"""
+    params = [{'day': day, 'count': delta} for day, delta in deltas.items() if delta]
+    if not params:
+        return
+    table = TaskCompletionStat.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.day],
+        set_={'count': table.c.count + stmt.excluded.count}
+    )
+    connection.execute(stmt, params)
+
+def apply_log_deltas(connection, deltas):
+    """Add log bucket deltas to log_daily_stat in the current transaction"""
+    buckets = {}
+    for (day, server, column), delta in deltas.items():
+        bucket = buckets.setdefault((day, server), {
+            'day': day, 'source_server_name': server, 'total': 0, 'errors': 0
+        })
+        bucket[column] += delta
+    params = [b for b in buckets.values() if b['total'] or b['errors']]
+    if not params:
+        return
+    table = LogDailyStat.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.source_server_name],
+        set_={
+            'total': table.c.total + stmt.excluded.total,
+            'errors': table.c.errors + stmt.excluded.errors
+        }
+    )
+    connection.execute(stmt, params)
+
+def _history(obj, key):
+    """Return the (old, new) values of an attribute pending flush"""
+    attr = inspect(obj).attrs[key]
+    new = attr.value
+    history = attr.history
+    return (history.deleted[0] if history.deleted else new), new
+
+def _collect_deltas(session, flush_context, instances):
+    """before_flush hook: record rollup deltas for pending Task/Log changes"""
+    task_changes = Counter()
+    completion_changes = Counter()
+    log_changes = Counter()
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            if obj.created_at is None:
+                obj.created_at = datetime.utcnow()
+            task_changes.update(task_deltas([{
+                'created_at': obj.created_at,
+                'status': obj.status or 'pending',
+                'priority': obj.priority or 'medium'
+            }]))
+            completion_changes.update(completion_deltas([{
+                'status': obj.status, 'finished_at': obj.finished_at, 'updated_at': obj.updated_at
+            }]))
+        elif isinstance(obj, Log):
+            if obj.task_time is None:
+                obj.task_time = datetime.utcnow()
+            log_changes.update(log_deltas([{
+                'task_time': obj.task_time,
+                'source_server_name': obj.source_server_name,
+                'error_message': obj.error_message
+            }]))
+
+    for obj in session.dirty:
+        if isinstance(obj, Task) and session.is_modified(obj):
+            old = [_history(obj, key)[0] for key in ('created_at', 'status', 'priority')]
+            new = [_history(obj, key)[1] for key in ('created_at', 'status', 'priority')]
+            if old != new:
+                task_changes[(_day(old[0]), old[1], old[2])] -= 1
+                task_changes[(_day(new[0]), new[1], new[2])] += 1
+            keys = ('status', 'finished_at', 'updated_at')
+            old = dict(zip(keys, (_history(obj, key)[0] for key in keys)))
+            new = dict(zip(keys, (_history(obj, key)[1] for key in keys)))
+            completion_changes.subtract(completion_deltas([old]))
+            completion_changes.update(completion_deltas([new]))
+        elif isinstance(obj, Log) and session.is_modified(obj):
+            keys = ('task_time', 'source_server_name', 'error_message')
+            old = dict(zip(keys, (_history(obj, key)[0] for key in keys)))
+            new = dict(zip(keys, (_history(obj, key)[1] for key in keys)))
+            log_changes.subtract(log_deltas([old]))
+            log_changes.update(log_deltas([new]))
+
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            task_changes[(_day(obj.created_at), obj.status, obj.priority)] -= 1
+            completion_changes.subtract(completion_deltas([{
+                'status': obj.status, 'finished_at': obj.finished_at, 'updated_at': obj.updated_at
+            }]))
+        elif isinstance(obj, Log):
+            log_changes.subtract(log_deltas([{
+                'task_time': obj.task_time,
+                'source_server_name': obj.source_server_name,
+                'error_message': obj.error_message
+            }]))
+
+    if task_changes or completion_changes or log_changes:
+        pending = session.info.setdefault('rollup_deltas', [Counter(), Counter(), Counter()])
+        pending[0].update(task_changes)
+        pending[1].update(completion_changes)
+        pending[2].update(log_changes)
+
+def _apply_pending(session, flush_context):
+    """after_flush hook: write recorded deltas inside the same transaction"""
+    pending = session.info.pop('rollup_deltas', None)
+    if not pending:
+        return
+    connection = session.connection()
+    apply_task_deltas(connection, pending[0])
+    apply_completion_deltas(connection, pending[1])
+    apply_log_deltas(connection, pending[2])
+
+def rebuild_rollups():
+    """Recompute the rollup tables from the task and log tables"""
+    session = db.session
+    task_table = TaskDailyStat.__table__
+    completion_table = TaskCompletionStat.__table__
+    log_table = LogDailyStat.__table__
+    session.execute(task_table.delete())
+    session.execute(completion_table.delete())
+    session.execute(log_table.delete())
+
+    day = func.date(Task.created_at)
+    session.execute(insert(task_table).from_select(
+        ['day', 'status', 'priority', 'count'],
+        select(day, Task.status, Task.priority, func.count())
+        .where(Task.created_at.isnot(None))
+        .group_by(day, Task.status, Task.priority)
+    ))
+    day = func.date(func.coalesce(Task.finished_at, Task.updated_at, Task.created_at))
+    session.execute(insert(completion_table).from_select(
+        ['day', 'count'],
+        select(day, func.count())
+        .where(Task.status == 'completed', day.isnot(None))
+        .group_by(day)
+    ))
+    day = func.date(Log.task_time)
+    server = func.coalesce(Log.source_server_name, '')
+    session.execute(insert(log_table).from_select(
+        ['day', 'source_server_name', 'total', 'errors'],
+        select(day, server, func.count(), func.count(Log.error_message))
+        .where(Log.task_time.isnot(None))
+        .group_by(day, server)
+    ))
+    session.commit()
+
+def task_status_totals():
+    """Current task count per status"""
+    rows = db.session.query(
+        TaskDailyStat.status, func.sum(TaskDailyStat.count)
+    ).group_by(TaskDailyStat.status).all()
+    return {status: total for status, total in rows if total}
+
+def task_priority_totals():
+    """Current task count per priority"""
+    rows = db.session.query(
+        TaskDailyStat.priority, func.sum(TaskDailyStat.count)
+    ).group_by(TaskDailyStat.priority).all()
+    return {priority: total for priority, total in rows if total}
+
+def monthly_completions(months=6, today=None):
+    """Completed task counts for the last ``months`` months, oldest first.
+
+    Tasks are bucketed by the month they were completed in.
+    """
+    today = today or date.today()
+    keys = []
+    year, month = today.year, today.month
+    for _ in range(months):
+        keys.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    keys.reverse()
+
+    month_key = func.strftime('%Y-%m', TaskCompletionStat.day)
+    rows = db.session.query(month_key, func.sum(TaskCompletionStat.count)).filter(
+        TaskCompletionStat.day >= date(keys[0][0], keys[0][1], 1)
+    ).group_by(month_key).all()
+    totals = dict(rows)
+    return [(date(y, m, 1), totals.get(f'{y:04d}-{m:02d}', 0) or 0) for y, m in keys]
+
+def daily_errors(since):
+    """Log error counts per day since the given date"""
+    return db.session.query(
+        LogDailyStat.day, func.sum(LogDailyStat.errors)
+    ).filter(LogDailyStat.day >= since).group_by(LogDailyStat.day).order_by(LogDailyStat.day).all()
+
+@rollup_cli.command('rebuild')
+def rebuild_command():
+    """Rebuild the rollup tables from scratch."""
+    rebuild_rollups()
+    click.echo('Rollup tables rebuilt')
+
+def init_rollups(app):
+    """Register the rollup flush hooks and CLI commands"""
+    if not event.contains(Session, 'before_flush', _collect_deltas):
+        event.listen(Session, 'before_flush', _collect_deltas)
+        event.listen(Session, 'after_flush', _apply_pending)
+    app.cli.add_command(rollup_cli)
@@ -1,8 +1,37 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, stream_with_context
 from flask_swagger_ui import get_swaggerui_blueprint
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
-from .models import Task, Log, db
+from werkzeug.formparser import parse_form_data
+from .models import Task, Log, StoredFile, db
+from . import log_search, rollups
+from .cache import cache, cached
+from .ingest import log_ingest
+from src.modules.files import ContentStore, DirectorySync, FileManager, FileVerifier, TransferEngine
+from src.modules.files.exceptions import (
+    FileError, StoredFileNotFoundError, UploadConflictError, UploadNotFoundError
+)
+from src.modules.files.content_store import DEFAULT_MAX_BYTES, LINK_MODES
+from src.modules.files.file_manager import DEFAULT_CHUNK_SIZE
+from src.modules.files.sync import DEFAULT_COPY_WORKERS, DEFAULT_SCAN_WORKERS
+from src.modules.files.transfer import DEFAULT_CONNECTIONS, DEFAULT_PART_SIZE
+from src.modules.files.verify import DEFAULT_VERIFY_WORKERS, MAX_VERIFY_BATCH
+from src.modules.tasks import TaskManager
+from src.modules.tasks.async_runner import DEFAULT_HOST_LIMIT, DEFAULT_MAX_CONCURRENCY
+from src.modules.tasks.process_pool import DEFAULT_MAX_TASKS_PER_PROCESS
+from src.modules.tasks.exceptions import (
+    TaskError, TaskNotFoundError, TaskAlreadyRunningError, TaskValidationError
+)
+from .pagination import (
+    PaginationError, keyset_page, parse_bool, parse_datetime, parse_limit,
+    parse_list
+)
+from datetime import date, datetime, timedelta
+import csv
+import io
+import json
 import logging
+import os
 
 # Swagger UI configuration
 SWAGGER_URL = '/api/docs'
@@ -29,97 +58,1000 @@ def init_routes(app):
     )
     app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
+    # Keep the dashboard rollup tables in step with task and log writes
+    rollups.init_rollups(app)
+
+    # Full-text index over log error messages and file names
+    log_search.init_log_search(app)
+
+    # Response cache for the polled read endpoints
+    cache.init_app(app)
+
+    # Background writer for pushed log rows
+    log_ingest.init_app(app)
+
+    # Task execution engine sharing the app's database
+    with app.app_context():
+        task_manager = TaskManager(
+            engine=db.engine,
+            pools=app.config.get('TASK_WORKER_POOLS'),
+            node_id=app.config.get('TASK_NODE_ID'),
+            quotas=app.config.get('TASK_PRIORITY_QUOTAS'),
+            aging=app.config.get('TASK_PRIORITY_AGING', 30.0),
+            process_workers=app.config.get('TASK_PROCESS_WORKERS'),
+            max_tasks_per_process=app.config.get('TASK_PROCESS_MAX_TASKS', DEFAULT_MAX_TASKS_PER_PROCESS),
+            async_concurrency=app.config.get('TASK_ASYNC_CONCURRENCY', DEFAULT_MAX_CONCURRENCY),
+            async_host_limit=app.config.get('TASK_ASYNC_HOST_LIMIT', DEFAULT_HOST_LIMIT),
+            async_host_limits=app.config.get('TASK_ASYNC_HOST_LIMITS')
+        )
+    app.extensions['task_manager'] = task_manager
+
+    # Uploaded file storage, the engines behind file_copy and file_sync
+    # tasks, the content store file_copy reuses copies from
+    # (CONTENT_STORE_DIR=None disables it) and checksum verification.
+    # file_sync only reads below SYNC_SOURCE_ROOT (symlinks are resolved);
+    # mount the source servers' exports there
+    with app.app_context():
+        app.extensions['file_manager'] = FileManager(
+            db.engine,
+            storage_dir=app.config.get('FILE_STORAGE_DIR', os.path.join(app.instance_path, 'files')),
+            chunk_size=app.config.get('FILE_CHUNK_SIZE', DEFAULT_CHUNK_SIZE),
+            max_size=app.config.get('FILE_MAX_SIZE')
+        )
+        content_store_dir = app.config.get('CONTENT_STORE_DIR', os.path.join(app.instance_path, 'content'))
+        content_store = None
+        if content_store_dir:
+            content_store = ContentStore(
+                db.engine, content_store_dir,
+                max_bytes=app.config.get('CONTENT_STORE_MAX_BYTES', DEFAULT_MAX_BYTES),
+                link_modes=app.config.get('CONTENT_STORE_LINK_MODES', LINK_MODES)
+            )
+        app.extensions['content_store'] = content_store
+        transfer_root = app.config.get('TRANSFER_ROOT', os.path.join(app.instance_path, 'transfers'))
+        transfer_engine = TransferEngine(
+            db.engine,
+            destination_root=transfer_root,
+            part_size=app.config.get('TRANSFER_PART_SIZE', DEFAULT_PART_SIZE),
+            max_connections=app.config.get('TRANSFER_CONNECTIONS', DEFAULT_CONNECTIONS),
+            content_store=content_store
+        )
+        directory_sync = DirectorySync(
+            db.engine,
+            destination_root=transfer_root,
+            source_root=app.config.get('SYNC_SOURCE_ROOT', os.path.join(app.instance_path, 'sync-sources')),
+            scan_workers=app.config.get('SYNC_SCAN_WORKERS', DEFAULT_SCAN_WORKERS),
+            copy_workers=app.config.get('SYNC_COPY_WORKERS', DEFAULT_COPY_WORKERS)
+        )
+        app.extensions['file_verifier'] = FileVerifier(
+            db.engine, root=transfer_root, workers=app.config.get('VERIFY_WORKERS', DEFAULT_VERIFY_WORKERS)
+        )
+    app.extensions['transfer_engine'] = transfer_engine
+    app.extensions['directory_sync'] = directory_sync
+    task_manager.register_handler('file_copy', transfer_engine.run_task)
+    task_manager.register_handler('file_sync', directory_sync.run_task)
+    if app.config.get('TASK_RECOVER_ON_START', True):
+        task_manager.recover()
+
+# Columns that may be requested through the ``fields`` projection
+TASK_FIELDS = {
+    'id': Task.id,
+    'name': Task.name,
+    'description': Task.description,
+    'status': Task.status,
+    'priority': Task.priority,
+    'created_at': Task.created_at,
+    'attempts': Task.attempts,
+    'error_code': Task.error_code
+}
+DEFAULT_TASK_FIELDS = ['id', 'name', 'status', 'priority', 'created_at']
+
+def _serialize_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
 @bp.route('/tasks', methods=['GET'])
+@cached('tasks')
 def get_tasks():
-    """Get all tasks"""
-    try:
-        tasks = db.session.query(Task).all()
-        return jsonify([{
-            'id': task.id,
-            'name': task.name,
-            'status': task.status,
-            'priority': task.priority,
-            'created_at': task.created_at.isoformat()
-        } for task in tasks]), 200
+    """Get tasks, newest first, using keyset pagination.
+
+    Query parameters:
+        limit: page size (default 100, max 1000)
+        cursor: value of the X-Next-Cursor header of the previous page
+        status, priority: comma separated values to filter on
+        created_after, created_before: ISO 8601 bounds on created_at
+        fields: comma separated columns to return
+    """
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        fields = parse_list(request.args.get('fields')) or DEFAULT_TASK_FIELDS
+        unknown = [field for field in fields if field not in TASK_FIELDS]
+        if unknown:
+            raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+        created_after = parse_datetime(request.args.get('created_after'), 'created_after')
+        created_before = parse_datetime(request.args.get('created_before'), 'created_before')
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+
+    try:
+        # The keyset columns are always selected so the next cursor can be built
+        columns = [TASK_FIELDS[field] for field in fields]
+        columns += [col for col in (Task.created_at, Task.id) if col not in columns]
+        query = db.session.query(Task).with_entities(*columns)
+
+        statuses = parse_list(request.args.get('status'))
+        if statuses:
+            query = query.filter(Task.status.in_(statuses))
+        priorities = parse_list(request.args.get('priority'))
+        if priorities:
+            query = query.filter(Task.priority.in_(priorities))
+        if created_after:
+            query = query.filter(Task.created_at >= created_after)
+        if created_before:
+            query = query.filter(Task.created_at < created_before)
+
+        rows, next_cursor = keyset_page(
+            query, Task.created_at, Task.id, request.args.get('cursor'), limit
+        )
+        response = jsonify([{
+            field: _serialize_value(getattr(row, field)) for field in fields
+        } for row in rows])
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response, 200
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         logging.error(f"Get tasks error: {e}")
         return jsonify({'message': 'Failed to get tasks'}), 500
 
+# Fields a client may set when creating or updating a task
+WRITABLE_TASK_FIELDS = ['name', 'description', 'due_date', 'priority', 'task_type', 'payload', 'retry_policy', 'depends_on']
+
+def _read_task_fields(data):
+    """TaskManager keyword arguments from a task JSON body"""
+    if not isinstance(data, dict):
+        raise TaskValidationError('INVALID_TASK', 'Request body must be a JSON object')
+    unknown = [key for key in data if key not in WRITABLE_TASK_FIELDS]
+    if unknown:
+        raise TaskValidationError('INVALID_FIELD', f'Unknown task fields: {unknown}')
+    fields = dict(data)
+    if fields.get('due_date') is not None:
+        try:
+            fields['due_date'] = datetime.fromisoformat(fields['due_date'])
+        except (TypeError, ValueError):
+            raise TaskValidationError('INVALID_DUE_DATE', 'due_date must be an ISO 8601 datetime')
+    depends_on = fields.get('depends_on')
+    if depends_on is not None and (
+        not isinstance(depends_on, list)
+        or not all(isinstance(parent_id, int) and not isinstance(parent_id, bool) for parent_id in depends_on)
+    ):
+        raise TaskValidationError('INVALID_DEPENDENCY', 'depends_on must be a list of task ids')
+    return fields
+
 @bp.route('/tasks', methods=['POST'])
 def create_task():
-    """Create new task"""
+    """Create a task.
+
+    Besides ``name`` the body may set description, due_date, priority,
+    task_type, payload, retry_policy and ``depends_on``, a list of the ids
+    of parent tasks that must complete before this one runs.
+    """
     if not request.is_json:
         return jsonify({'message': 'Request must be JSON'}), 400
-        
-    data = request.get_json()
-    name = data.get('name')
-    description = data.get('description')
-    
-    if not name:
-        return jsonify({'message': 'Task name is required'}), 400
-        
-    try:
-        new_task = Task(
-            name=name,
-            description=description
+    task_manager = current_app.extensions['task_manager']
+    try:
+        fields = _read_task_fields(request.get_json(silent=True))
+        task = task_manager.create_task(fields.pop('name', None), **fields)
+        depends_on = task_manager.get_dependencies(task.id)
+    except TaskError as e:
+        return _task_error_response(e)
+    result = _serialize_task(task)
+    result['depends_on'] = depends_on
+    return jsonify(result), 201
+
+@bp.route('/tasks/<int:task_id>', methods=['PATCH'])
+def update_task(task_id):
+    """Update a task; ``depends_on`` replaces its parent tasks"""
+    task_manager = current_app.extensions['task_manager']
+    try:
+        fields = _read_task_fields(request.get_json(silent=True))
+        task = task_manager.update_task(task_id, fields)
+        depends_on = task_manager.get_dependencies(task.id)
+    except TaskError as e:
+        return _task_error_response(e)
+    result = _serialize_task(task)
+    result['depends_on'] = depends_on
+    return jsonify(result), 200
+
+def _task_error_response(e):
+    """Map a TaskManager error to a JSON error response"""
+    if isinstance(e, TaskNotFoundError):
+        status = 404
+    elif isinstance(e, TaskAlreadyRunningError):
+        status = 409
+    else:
+        status = 400
+    return jsonify({'message': e.message, 'code': e.code}), status
+
+def _serialize_task(task, runtime=None):
+    return {
+        'id': task.id,
+        'name': task.name,
+        'description': task.description,
+        'status': task.status,
+        'priority': task.priority,
+        'task_type': task.task_type,
+        'progress': (runtime or {}).get('progress', task.progress),
+        'created_at': _serialize_value(task.created_at),
+        'started_at': _serialize_value(task.started_at),
+        'finished_at': _serialize_value(task.finished_at),
+        'attempts': task.attempts,
+        'next_attempt_at': _serialize_value(task.next_attempt_at),
+        'error': {
+            'code': task.error_code,
+            'message': task.error_message
+        } if task.error_code else None
+    }
+
+@bp.route('/tasks/metrics', methods=['GET'])
+def get_task_metrics():
+    """Get scheduler queue depth and start latency per worker pool, plus async runner load"""
+    return jsonify(current_app.extensions['task_manager'].metrics()), 200
+
+@bp.route('/tasks/dead-letter', methods=['GET'])
+def get_dead_letter_tasks():
+    """Get tasks that ran out of retries, newest first.
+
+    Query parameters:
+        limit: page size (default 100, max 1000)
+        cursor: value of the X-Next-Cursor header of the previous page
+    """
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        query = db.session.query(Task).filter(Task.status == 'dead_letter')
+        tasks, next_cursor = keyset_page(
+            query, Task.created_at, Task.id, request.args.get('cursor'), limit
         )
-        db.session.add(new_task)
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+    response = jsonify([_serialize_task(task) for task in tasks])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+@bp.route('/tasks/dead-letter/requeue', methods=['POST'])
+def requeue_dead_letter_tasks():
+    """Queue dead-lettered tasks again; body {"ids": [...]} limits which ones"""
+    data = request.get_json(silent=True) or {}
+    task_ids = data.get('ids')
+    if task_ids is not None and (
+        not isinstance(task_ids, list) or not all(isinstance(task_id, int) for task_id in task_ids)
+    ):
+        return jsonify({'message': 'ids must be a list of task ids'}), 400
+    try:
+        requeued = current_app.extensions['task_manager'].requeue_dead_letters(task_ids)
+    except TaskError as e:
+        return _task_error_response(e)
+    return jsonify({'requeued': requeued}), 200
+
+@bp.route('/tasks/<int:task_id>', methods=['GET'])
+def get_task(task_id):
+    """Get one task with its live progress and parent task ids"""
+    task_manager = current_app.extensions['task_manager']
+    try:
+        task = task_manager.get_task(task_id)
+        depends_on = task_manager.get_dependencies(task.id)
+    except TaskError as e:
+        return _task_error_response(e)
+    result = _serialize_task(task, task_manager.tasks.get(task.id))
+    result['depends_on'] = depends_on
+    return jsonify(result), 200
+
+@bp.route('/tasks/<int:task_id>/result', methods=['GET'])
+def get_task_result(task_id):
+    """Get the result a task's handler recorded (null until it records one)"""
+    try:
+        task = current_app.extensions['task_manager'].get_task(task_id)
+    except TaskError as e:
+        return _task_error_response(e)
+    return jsonify({
+        'id': task.id,
+        'status': task.status,
+        'result': json.loads(task.result) if task.result else None
+    }), 200
+
+def _control_task(task_id, action):
+    task_manager = current_app.extensions['task_manager']
+    try:
+        getattr(task_manager, f'{action}_task')(task_id)
+        task = task_manager.get_task(task_id)
+    except TaskError as e:
+        return _task_error_response(e)
+    return jsonify(_serialize_task(task)), 200
+
+@bp.route('/tasks/<int:task_id>/start', methods=['POST'])
+def start_task(task_id):
+    """Queue a task for execution"""
+    return _control_task(task_id, 'start')
+
+@bp.route('/tasks/<int:task_id>/pause', methods=['POST'])
+def pause_task(task_id):
+    """Pause a task at its next checkpoint"""
+    return _control_task(task_id, 'pause')
+
+@bp.route('/tasks/<int:task_id>/resume', methods=['POST'])
+def resume_task(task_id):
+    """Resume a paused task from its last checkpoint"""
+    return _control_task(task_id, 'resume')
+
+@bp.route('/tasks/<int:task_id>/cancel', methods=['POST'])
+def cancel_task(task_id):
+    """Cancel a task"""
+    return _control_task(task_id, 'cancel')
+
+# Bulk task creation limits
+BULK_CHUNK_SIZE = 500
+MAX_BULK_TASKS = 10000
+TASK_PRIORITIES = ('high', 'medium', 'low')
+
+def _validate_task_item(item):
+    """Validate one bulk task payload, returning (row, errors)"""
+    if not isinstance(item, dict):
+        return None, ['Task must be an object']
+    errors = []
+    name = item.get('name')
+    description = item.get('description')
+    priority = item.get('priority', 'medium')
+    if not name or not isinstance(name, str):
+        errors.append('Task name is required')
+    elif len(name) > 100:
+        errors.append('Task name must be at most 100 characters')
+    if description is not None and (not isinstance(description, str) or len(description) > 500):
+        errors.append('Task description must be a string of at most 500 characters')
+    if priority not in TASK_PRIORITIES:
+        errors.append(f"Task priority must be one of {', '.join(TASK_PRIORITIES)}")
+    if errors:
+        return None, errors
+    return {'name': name, 'description': description, 'priority': priority}, []
+
+def _read_bulk_items():
+    """Yield bulk items from a JSON array or an NDJSON request body"""
+    if request.mimetype == 'application/x-ndjson':
+        for line in request.stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    elif request.is_json:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            raise ValueError('Request body must be a JSON array')
+        yield from items
+    else:
+        raise ValueError('Request must be a JSON array or NDJSON')
+
+def insert_task_rows(rows):
+    """Insert task rows with executemany in the current transaction.
+
+    Returns the ids assigned to the rows, in order. SQLite assigns
+    consecutive rowids to the rows of one executemany while the transaction
+    holds the write lock, so each chunk's ids end at last_insert_rowid().
+    """
+    ids = []
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_CHUNK_SIZE]
+        db.session.execute(Task.__table__.insert(), chunk)
+        last_id = db.session.execute(select(func.last_insert_rowid())).scalar()
+        ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+    connection = db.session.connection()
+    rollups.apply_task_deltas(connection, rollups.task_deltas(rows))
+    rollups.apply_completion_deltas(connection, rollups.completion_deltas(rows))
+    return ids
+
+@bp.route('/tasks/bulk', methods=['POST'])
+def create_tasks_bulk():
+    """Create many tasks in one transaction.
+
+    Accepts a JSON array or an NDJSON stream of task objects. Valid items
+    are inserted and invalid ones are reported by index; the response is
+    201 when every item was created and 207 when some were rejected.
+    """
+    results = []
+    rows = []
+    now = datetime.utcnow()
+    try:
+        for index, item in enumerate(_read_bulk_items()):
+            if index >= MAX_BULK_TASKS:
+                return jsonify({'message': f'At most {MAX_BULK_TASKS} tasks per request'}), 413
+            row, errors = _validate_task_item(item)
+            if errors:
+                results.append({'index': index, 'errors': errors})
+            else:
+                row.update(status='pending', created_at=now)
+                results.append({'index': index, 'row': row})
+                rows.append(row)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    if not rows:
+        return jsonify({'message': 'No valid tasks', 'results': results}), 400
+
+    try:
+        ids = iter(insert_task_rows(rows))
         db.session.commit()
-        return jsonify({'message': 'Task created successfully'}), 201
     except Exception as e:
-        logging.error(f"Create task error: {e}")
+        logging.error(f"Bulk create tasks error: {e}")
         db.session.rollback()
-        return jsonify({'message': 'Failed to create task'}), 500
+        return jsonify({'message': 'Failed to create tasks'}), 500
+    cache.invalidate_models(Task)
+
+    for result in results:
+        if result.pop('row', None) is not None:
+            result['id'] = next(ids)
+    status = 201 if len(rows) == len(results) else 207
+    return jsonify({
+        'created': len(rows),
+        'failed': len(results) - len(rows),
+        'results': results
+    }), status
+
+# Log columns returned by the log endpoints, with the task name joined in
+LOG_COLUMNS = [
+    Log.id,
+    Log.task_id,
+    Task.name.label('task_name'),
+    Log.source_server_name,
+    Log.source_server_ip,
+    Log.source_server_file_path,
+    Log.source_server_file_name,
+    Log.task_time,
+    Log.bytes_transferred,
+    Log.duration_ms,
+    Log.error_message
+]
+
+def _build_log_query(args):
+    """Build the filtered log query shared by the log endpoints.
+
+    Task names are fetched through an outer join, so the query is a single
+    SELECT no matter how many rows it returns.
+    """
+    task_ids = parse_list(args.get('task_id'))
+    try:
+        task_ids = [int(task_id) for task_id in task_ids]
+    except ValueError:
+        raise PaginationError('task_id must be an integer')
+    has_error = parse_bool(args.get('has_error'), 'has_error')
+    since = parse_datetime(args.get('since'), 'since')
+    until = parse_datetime(args.get('until'), 'until')
+
+    query = db.session.query(Log).outerjoin(Task, Log.task_id == Task.id).with_entities(*LOG_COLUMNS)
+    if task_ids:
+        query = query.filter(Log.task_id.in_(task_ids))
+    server_names = parse_list(args.get('source_server_name'))
+    if server_names:
+        query = query.filter(Log.source_server_name.in_(server_names))
+    server_ips = parse_list(args.get('source_server_ip'))
+    if server_ips:
+        query = query.filter(Log.source_server_ip.in_(server_ips))
+    if has_error is True:
+        query = query.filter(Log.error_message.isnot(None))
+    elif has_error is False:
+        query = query.filter(Log.error_message.is_(None))
+    if since:
+        query = query.filter(Log.task_time >= since)
+    if until:
+        query = query.filter(Log.task_time < until)
+    return query
+
+def _serialize_log(row):
+    return {
+        'id': row.id,
+        'task_id': row.task_id,
+        'task_name': row.task_name,
+        'source_server_name': row.source_server_name,
+        'source_server_ip': row.source_server_ip,
+        'source_server_file_path': row.source_server_file_path,
+        'source_server_file_name': row.source_server_file_name,
+        'task_time': _serialize_value(row.task_time),
+        'bytes_transferred': row.bytes_transferred,
+        'duration_ms': row.duration_ms,
+        'error_message': row.error_message
+    }
 
 @bp.route('/logs', methods=['GET'])
+@cached('logs')
 def get_logs():
-    """Get all logs"""
-    try:
-        logs = db.session.query(Log).order_by(Log.task_time.desc()).limit(100).all()
-        
-        return jsonify([{
-            'id': log.id,
-            'task_id': log.task_id,
-            'task_name': log.task.name,
-            'source_server_name': log.source_server_name,
-            'task_time': log.task_time.isoformat(),
-            'error_message': log.error_message
-        } for log in logs]), 200
+    """Get logs, newest first, using keyset pagination.
+
+    Query parameters:
+        limit: page size (default 100, max 1000)
+        cursor: value of the X-Next-Cursor header of the previous page
+        task_id, source_server_name, source_server_ip: comma separated values
+        has_error: only logs with (true) or without (false) an error message
+        since, until: ISO 8601 bounds on task_time
+    """
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        query = _build_log_query(request.args)
+        rows, next_cursor = keyset_page(
+            query, Log.task_time, Log.id, request.args.get('cursor'), limit
+        )
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         logging.error(f"Get logs error: {e}")
         return jsonify({'message': 'Failed to get logs'}), 500
 
+    response = jsonify([_serialize_log(row) for row in rows])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+@bp.route('/logs/search', methods=['GET'])
+@cached('logs')
+def search_logs():
+    """Full-text search over log error messages and file paths.
+
+    Query parameters:
+        q: words and "quoted phrases" that must all match; ``word*`` matches a prefix
+        order: rank (best of the newest RANK_WINDOW matches first, default)
+            or recent (newest first)
+        limit, cursor: as for GET /logs
+    Each result carries ``highlight``: the HTML-escaped column text with
+    matched terms wrapped in <mark>.
+    The X-Search-Order header gives the order used.
+    """
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        rows, next_cursor, order = log_search.search_logs(
+            request.args.get('q'), limit, request.args.get('cursor'),
+            request.args.get('order', 'rank')
+        )
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Search logs error: {e}")
+        return jsonify({'message': 'Failed to search logs'}), 500
+
+    results = []
+    for row in rows:
+        record = _serialize_log(row)
+        record['rank'] = row.rank
+        record['highlight'] = {
+            column: log_search.highlight_html(getattr(row, f'{column}_highlight'))
+            for column in log_search.SEARCH_COLUMNS if getattr(row, column) is not None
+        }
+        results.append(record)
+    response = jsonify(results)
+    response.headers['X-Search-Order'] = order
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+# Maximum lengths of the string columns accepted by log ingestion
+LOG_STRING_FIELDS = {
+    'source_server_name': 100,
+    'source_server_ip': 15,
+    'source_server_file_path': 200,
+    'source_server_file_name': 100,
+    'error_message': 500
+}
+MAX_INGEST_BATCH = 10000
+
+def _validate_log_item(item):
+    """Validate one ingested log payload, returning (row, errors)"""
+    if not isinstance(item, dict):
+        return None, ['Log must be an object']
+    errors = []
+    row = {}
+    for field, max_length in LOG_STRING_FIELDS.items():
+        value = item.get(field)
+        if value is not None and (not isinstance(value, str) or len(value) > max_length):
+            errors.append(f'{field} must be a string of at most {max_length} characters')
+        row[field] = value
+    task_id = item.get('task_id')
+    if task_id is not None and (not isinstance(task_id, int) or isinstance(task_id, bool)):
+        errors.append('task_id must be an integer')
+    row['task_id'] = task_id
+    try:
+        row['task_time'] = parse_datetime(item.get('task_time'), 'task_time') or datetime.utcnow()
+    except PaginationError as e:
+        errors.append(str(e))
+    return (None, errors) if errors else (row, [])
+
+@bp.route('/logs/ingest', methods=['POST'])
+def ingest_logs():
+    """Queue a batch of log rows pushed by the file servers.
+
+    Accepts a JSON array or an NDJSON stream of log objects. The batch is
+    rejected as a whole if any item is invalid, returns 202 once queued and
+    429 when the ingest queue is full.
+    """
+    rows = []
+    errors = []
+    try:
+        for index, item in enumerate(_read_bulk_items()):
+            if index >= MAX_INGEST_BATCH:
+                return jsonify({'message': f'At most {MAX_INGEST_BATCH} logs per request'}), 413
+            row, item_errors = _validate_log_item(item)
+            if item_errors:
+                errors.append({'index': index, 'errors': item_errors})
+            else:
+                rows.append(row)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    if errors:
+        return jsonify({'message': 'Invalid logs', 'results': errors}), 400
+    if not log_ingest.submit(rows):
+        response = jsonify({'message': 'Log ingest queue is full'})
+        response.headers['Retry-After'] = '1'
+        return response, 429
+    return jsonify({'accepted': len(rows)}), 202
+
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = [
+    'id', 'task_id', 'task_name', 'source_server_name', 'source_server_ip',
+    'source_server_file_path', 'source_server_file_name', 'task_time',
+    'bytes_transferred', 'duration_ms', 'error_message'
+]
+
+def _iter_log_export(query, export_format):
+    """Yield the export body in chunks of EXPORT_BATCH_SIZE rows.
+
+    Rows are read through a server-side cursor with yield_per, so memory use
+    does not depend on the number of exported rows.
+    """
+    rows = query.order_by(Log.task_time, Log.id).execution_options(
+        stream_results=True
+    ).yield_per(EXPORT_BATCH_SIZE)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == 'csv' else None
+    if writer:
+        writer.writerow(EXPORT_FIELDS)
+
+    for count, row in enumerate(rows, 1):
+        record = _serialize_log(row)
+        if writer:
+            writer.writerow([record[field] for field in EXPORT_FIELDS])
+        else:
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write('\n')
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+@bp.route('/logs/export', methods=['GET'])
+def export_logs():
+    """Stream logs, oldest first, as NDJSON or CSV.
+
+    Accepts the filters of GET /logs plus ``format`` (ndjson or csv).
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'message': 'format must be ndjson or csv'}), 400
+    try:
+        query = _build_log_query(request.args)
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = Response(
+        stream_with_context(_iter_log_export(query, export_format)),
+        mimetype=mimetype
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename=logs.{export_format}'
+    return response
+
+# Chart ordering and colours for the dashboard
+CHART_COLORS = ['#ff6384', '#36a2eb', '#cc65fe', '#ffce56', '#4bc0c0', '#9966ff']
+STATUS_ORDER = ['pending', 'running', 'paused', 'completed', 'failed', 'cancelled']
+PRIORITY_ORDER = ['high', 'medium', 'low']
+ERROR_CHART_DAYS = 14
+
+def _ordered(totals, order):
+    """Order chart buckets by a preferred order, unknown keys last"""
+    known = [key for key in order if key in totals]
+    return known + sorted(key for key in totals if key not in order)
+
 @bp.route('/dashboard/charts', methods=['GET'])
+@cached('dashboard')
 def get_dashboard_charts():
-    """Get dashboard charts data"""
+    """Get dashboard charts data from the rollup tables"""
     try:
-        # Example chart data
+        completions = rollups.monthly_completions()
+        statuses = rollups.task_status_totals()
+        status_keys = _ordered(statuses, STATUS_ORDER)
+        priorities = rollups.task_priority_totals()
+        since = date.today() - timedelta(days=ERROR_CHART_DAYS - 1)
+        errors = dict(rollups.daily_errors(since))
+        error_days = [since + timedelta(days=i) for i in range(ERROR_CHART_DAYS)]
+
         return jsonify({
             'lineChart': {
-                'labels': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'],
+                'labels': [month.strftime('%b') for month, _ in completions],
                 'datasets': [{
                     'label': 'Tasks Completed',
-                    'data': [12, 19, 3, 5, 2, 3],
+                    'data': [count for _, count in completions],
                     'borderColor': '#36a2eb',
                     'fill': False
                 }]
             },
             'pieChart': {
-                'labels': ['Pending', 'In Progress', 'Completed'],
+                'labels': [status.replace('_', ' ').title() for status in status_keys],
                 'datasets': [{
-                    'data': [12, 19, 3],
-                    'backgroundColor': ['#ff6384', '#36a2eb', '#cc65fe']
+                    'data': [statuses[status] for status in status_keys],
+                    'backgroundColor': CHART_COLORS[:len(status_keys)]
                 }]
             },
             'barChart': {
-                'labels': ['High', 'Medium', 'Low'],
+                'labels': [priority.title() for priority in PRIORITY_ORDER],
                 'datasets': [{
                     'label': 'Task Priority',
-                    'data': [5, 10, 15],
-                    'backgroundColor': ['#ff6384', '#36a2eb', '#cc65fe']
+                    'data': [priorities.get(priority, 0) for priority in PRIORITY_ORDER],
+                    'backgroundColor': CHART_COLORS[:len(PRIORITY_ORDER)]
+                }]
+            },
+            'errorChart': {
+                'labels': [day.isoformat() for day in error_days],
+                'datasets': [{
+                    'label': 'Transfer Errors',
+                    'data': [errors.get(day, 0) for day in error_days],
+                    'borderColor': '#ff6384',
+                    'fill': False
                 }]
             }
         }), 200
     except Exception as e:
         logging.error(f"Get dashboard charts error: {e}")
         return jsonify({'message': 'Failed to get dashboard charts'}), 500
+
+def _file_error_response(e):
+    """Map a FileManager error to a JSON error response"""
+    body = {'message': e.message, 'code': e.code}
+    if isinstance(e, (StoredFileNotFoundError, UploadNotFoundError)):
+        status = 404
+    elif isinstance(e, UploadConflictError):
+        status = 409
+        body['offset'] = e.offset
+    elif e.code in ('FILE_TOO_LARGE', 'UPLOAD_TOO_LARGE'):
+        status = 413
+    else:
+        status = 400
+    response = jsonify(body)
+    if isinstance(e, UploadConflictError):
+        response.headers['Upload-Offset'] = str(e.offset)
+    return response, status
+
+def _serialize_file(stored_file):
+    return {
+        'id': stored_file.id,
+        'name': stored_file.name,
+        'size': stored_file.size,
+        'content_type': stored_file.content_type,
+        'created_at': _serialize_value(stored_file.created_at),
+        # Name used by the Files view
+        'uploadDate': _serialize_value(stored_file.created_at)
+    }
+
+def _serialize_upload(upload):
+    return {
+        'id': upload.id,
+        'name': upload.name,
+        'size': upload.size,
+        'offset': upload.offset,
+        'content_type': upload.content_type
+    }
+
+def _upload_response(upload, status=200):
+    response = jsonify(_serialize_upload(upload))
+    response.headers['Upload-Offset'] = str(upload.offset)
+    return response, status
+
+@bp.route('/files', methods=['GET'])
+def get_files():
+    """Get stored files, newest first, using keyset pagination (limit, cursor)"""
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        files, next_cursor = keyset_page(
+            db.session.query(StoredFile), StoredFile.created_at, StoredFile.id,
+            request.args.get('cursor'), limit
+        )
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+    response = jsonify([_serialize_file(stored_file) for stored_file in files])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+@bp.route('/files', methods=['POST'])
+def upload_files():
+    """Upload whole files.
+
+    Accepts multipart/form-data (every file part is stored, or none if one
+    is rejected) or a raw body with the file name in the ``name`` query
+    parameter. Multipart parts are spooled straight into the storage
+    directory, never into memory.
+    """
+    file_manager = current_app.extensions['file_manager']
+    stored = []
+    if request.mimetype == 'multipart/form-data':
+        temp_paths = []
+
+        def stream_factory(total_content_length, content_type, filename, content_length=None):
+            f = file_manager.new_temp_file()
+            temp_paths.append(f.name)
+            return f
+
+        try:
+            _, _, files = parse_form_data(
+                request.environ, stream_factory=stream_factory,
+                max_content_length=current_app.config.get('MAX_CONTENT_LENGTH')
+            )
+            try:
+                for _, upload in files.items(multi=True):
+                    upload.stream.close()
+                    stored.append(file_manager.store_file(upload.stream.name, upload.filename, upload.mimetype))
+            except Exception:
+                # All parts or none: drop the files stored before the failing part
+                for stored_file in stored:
+                    file_manager.delete_file(stored_file.id)
+                raise
+        except FileError as e:
+            return _file_error_response(e)
+        finally:
+            for path in temp_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+    else:
+        try:
+            stored.append(file_manager.save_stream(
+                request.stream, request.args.get('name'), request.mimetype or None
+            ))
+        except FileError as e:
+            return _file_error_response(e)
+    if not stored:
+        return jsonify({'message': 'No files uploaded'}), 400
+    return jsonify([_serialize_file(stored_file) for stored_file in stored]), 201
+
+@bp.route('/files/<int:file_id>', methods=['GET'])
+def download_file(file_id):
+    """Download a file; Range and conditional requests are honoured.
+
+    The file is handed to the WSGI server as a file object, so servers
+    with wsgi.file_wrapper send it with sendfile (set USE_X_SENDFILE to
+    let the front proxy serve it instead).
+    """
+    file_manager = current_app.extensions['file_manager']
+    try:
+        stored_file = file_manager.get_file(file_id)
+    except FileError as e:
+        return _file_error_response(e)
+    return send_file(
+        file_manager.path(stored_file),
+        mimetype=stored_file.content_type or None,
+        as_attachment=True,
+        download_name=stored_file.name,
+        conditional=True
+    )
+
+@bp.route('/files/<int:file_id>', methods=['DELETE'])
+def delete_file(file_id):
+    """Delete a file and its content"""
+    try:
+        current_app.extensions['file_manager'].delete_file(file_id)
+    except FileError as e:
+        return _file_error_response(e)
+    return '', 204
+
+@bp.route('/files/verify', methods=['POST'])
+def verify_files():
+    """Checksum a batch of files and compare them with expected digests.
+
+    Body: {"files": [...], "algorithms": ["sha256", ...]}, where each file
+    is {"path": <path below TRANSFER_ROOT>} or {"file_id": <stored file>}
+    with an optional "expected": {<algorithm>: <hex digest>}. Digests of
+    files unchanged since they were last verified are served from the
+    database. Files that cannot be read get an ``error`` instead.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('files'), list) or not data['files']:
+        return jsonify({'message': 'files must be a non-empty list'}), 400
+    if len(data['files']) > MAX_VERIFY_BATCH:
+        return jsonify({'message': f'At most {MAX_VERIFY_BATCH} files per batch'}), 400
+    file_manager = current_app.extensions['file_manager']
+    verifier = current_app.extensions['file_verifier']
+    results = []
+    jobs = []
+    try:
+        for item in data['files']:
+            if not isinstance(item, dict):
+                return jsonify({'message': 'Each file must be a JSON object'}), 400
+            result = {'file_id': item['file_id']} if 'file_id' in item else {'path': item.get('path')}
+            results.append(result)
+            if 'file_id' in item:
+                if not isinstance(item['file_id'], int):
+                    return jsonify({'message': 'file_id must be an integer'}), 400
+                try:
+                    path = file_manager.path(file_manager.get_file(item['file_id']))
+                except StoredFileNotFoundError as e:
+                    result.update(checksums=None, matches=None, cached=False,
+                                  error={'code': e.code, 'message': e.message})
+                    continue
+            else:
+                path = verifier.resolve(item.get('path'))
+            jobs.append((result, {'path': path, 'expected': item.get('expected')}))
+        verified = verifier.verify([job for _, job in jobs], data.get('algorithms'))
+    except FileError as e:
+        return _file_error_response(e)
+    for (result, _), outcome in zip(jobs, verified):
+        result.update(outcome)
+    return jsonify({
+        'results': results,
+        'matched': sum(1 for result in results if result['matches'] is True),
+        'mismatched': sum(1 for result in results if result['matches'] is False),
+        'failed': sum(1 for result in results if result['error'])
+    }), 200
+
+@bp.route('/files/uploads', methods=['POST'])
+def create_upload():
+    """Start a resumable upload; body {"name": ..., "size": ..., "content_type": ...}"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'message': 'Request must be a JSON object'}), 400
+    try:
+        upload = current_app.extensions['file_manager'].create_upload(
+            data.get('name'), data.get('size'), data.get('content_type')
+        )
+    except FileError as e:
+        return _file_error_response(e)
+    response, status = _upload_response(upload, 201)
+    response.headers['Location'] = f'{bp.url_prefix}/files/uploads/{upload.id}'
+    return response, status
+
+@bp.route('/files/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Get an upload's received offset, also sent as the Upload-Offset header"""
+    try:
+        upload = current_app.extensions['file_manager'].get_upload(upload_id)
+    except FileError as e:
+        return _file_error_response(e)
+    return _upload_response(upload)
+
+@bp.route('/files/uploads/<upload_id>', methods=['PATCH'])
+def write_upload_chunk(upload_id):
+    """Append the raw request body to an upload.
+
+    The Upload-Offset header must equal the upload's current offset;
+    otherwise the response is 409 with the offset to resume from.
+    """
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'message': 'Upload-Offset header must be an integer'}), 400
+    try:
+        upload = current_app.extensions['file_manager'].write_chunk(upload_id, offset, request.stream)
+    except FileError as e:
+        return _file_error_response(e)
+    return _upload_response(upload)
+
+@bp.route('/files/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Finish an upload and store it as a file; repeating it returns the same file"""
+    try:
+        stored_file = current_app.extensions['file_manager'].complete_upload(upload_id)
+    except FileError as e:
+        return _file_error_response(e)
+    return jsonify(_serialize_file(stored_file)), 201
+
+@bp.route('/files/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    """Abandon an upload and delete the bytes received so far"""
+    try:
+        current_app.extensions['file_manager'].abort_upload(upload_id)
+    except FileError as e:
+        return _file_error_response(e)
+    return '', 204
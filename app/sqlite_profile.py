@@ -0,0 +1,72 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Pragmas applied to every new SQLite connection; override with SQLITE_PRAGMAS
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 268435456,
+    'cache_size': -65536,
+    'temp_store': 'MEMORY'
+}
+
+# Pool settings for file databases; override with SQLITE_POOL_* settings
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 20
+DEFAULT_POOL_TIMEOUT = 30
+
+def _is_file_database(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+def sqlite_pragmas(config):
+    """Pragmas for the app, merging SQLITE_PRAGMAS over the defaults"""
+    return {**DEFAULT_SQLITE_PRAGMAS, **config.get('SQLITE_PRAGMAS', {})}
+
+def configure_sqlite_engine(app):
+    """Set pooled engine options for a file-backed SQLite database.
+
+    Must run before db.init_app, which creates the engine. SQLAlchemy 1.4
+    opens a new connection per checkout for file databases, so a QueuePool
+    keeps connections and their pragma setup alive between requests.
+    """
+    if not app.config.get('SQLITE_TUNING', True):
+        return
+    if not _is_file_database(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    pragmas = sqlite_pragmas(app.config)
+    options = {
+        'poolclass': QueuePool,
+        'pool_size': app.config.get('SQLITE_POOL_SIZE', DEFAULT_POOL_SIZE),
+        'max_overflow': app.config.get('SQLITE_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW),
+        'pool_timeout': app.config.get('SQLITE_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+        'connect_args': {
+            'check_same_thread': False,
+            'timeout': pragmas['busy_timeout'] / 1000
+        }
+    }
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def register_sqlite_pragmas(engine, pragmas):
+    """Run the pragmas on every new DBAPI connection of the engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+def apply_sqlite_pragmas(app, db):
+    """Register the pragma listener on the app's engine after db.init_app"""
+    if not app.config.get('SQLITE_TUNING', True):
+        return
+    with app.app_context():
+        register_sqlite_pragmas(db.engine, sqlite_pragmas(app.config))
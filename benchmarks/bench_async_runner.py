@@ -0,0 +1,49 @@
+"""Compare thread and async execution of I/O-bound transfers.
+
+Runs a batch of simulated transfers that each wait on a remote host,
+first as thread-mode tasks on 4 workers, then as async-mode coroutines.
+
+Usage: python benchmarks/bench_async_runner.py [tasks] [latency_ms]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.modules.tasks import TaskManager
+
+def thread_transfer(context):
+    time.sleep(context.payload['latency'])
+
+async def async_transfer(context):
+    await asyncio.sleep(context.payload['latency'])
+
+def run(mode, tasks, latency):
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(db_fd)
+    manager = TaskManager(database_uri=f'sqlite:///{db_path}', max_workers=4, async_host_limit=tasks)
+    manager.register_handler('transfer', async_transfer if mode == 'async' else thread_transfer, mode=mode)
+    ids = [
+        manager.create_task(title=f'Transfer {i}', task_type='transfer',
+                            payload={'latency': latency, 'host': f'10.0.0.{i % 16}'}).id
+        for i in range(tasks)
+    ]
+    started = time.perf_counter()
+    for task_id in ids:
+        manager.start_task(task_id)
+    while len(manager.list_tasks(status='completed')) < tasks:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    manager.shutdown()
+    os.unlink(db_path)
+    return elapsed
+
+if __name__ == '__main__':
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 100) / 1000
+    for mode in ('thread', 'async'):
+        elapsed = run(mode, tasks, latency)
+        print(f'{mode:7}: {tasks} transfers in {elapsed:.2f}s ({tasks / elapsed:.0f}/s)')
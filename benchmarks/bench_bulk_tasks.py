@@ -0,0 +1,48 @@
+"""Compare POST /tasks one task at a time against POST /tasks/bulk.
+
+Usage: python benchmarks/bench_bulk_tasks.py [count]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db
+
+def make_client():
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(db_fd)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    with app.app_context():
+        db.create_all()
+    return app.test_client(), db_path
+
+def bench_single(count):
+    client, db_path = make_client()
+    start = time.perf_counter()
+    for i in range(count):
+        client.post('/api/v1/tasks', json={'name': f'transfer-{i}'})
+    elapsed = time.perf_counter() - start
+    os.unlink(db_path)
+    return elapsed
+
+def bench_bulk(count):
+    client, db_path = make_client()
+    payload = [{'name': f'transfer-{i}'} for i in range(count)]
+    start = time.perf_counter()
+    response = client.post('/api/v1/tasks/bulk', json=payload)
+    elapsed = time.perf_counter() - start
+    assert response.json['created'] == count
+    os.unlink(db_path)
+    return elapsed
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    single = bench_single(count)
+    bulk = bench_bulk(count)
+    print(f'single inserts: {count} tasks in {single:.2f}s ({count / single:.0f} tasks/s)')
+    print(f'bulk insert:    {count} tasks in {bulk:.2f}s ({count / bulk:.0f} tasks/s)')
+    print(f'speedup:        {single / bulk:.1f}x')
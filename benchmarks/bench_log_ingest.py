@@ -0,0 +1,51 @@
+"""Measure sustained POST /logs/ingest throughput until rows are on disk.
+
+Usage: python benchmarks/bench_log_ingest.py [rows] [batch]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.ingest import log_ingest
+from app.models import Log, db
+
+def main(total, batch):
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(db_fd)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    payload = [{
+        'source_server_name': f'fs-{i % 8:02d}',
+        'source_server_ip': f'10.0.0.{i % 8}',
+        'source_server_file_path': '/data/outgoing',
+        'source_server_file_name': f'part-{i}.bin',
+        'error_message': 'timeout' if i % 50 == 0 else None
+    } for i in range(batch)]
+
+    start = time.perf_counter()
+    sent = 0
+    while sent < total:
+        response = client.post('/api/v1/logs/ingest', json=payload)
+        if response.status_code == 429:
+            time.sleep(0.01)
+            continue
+        sent += batch
+    log_ingest.flush()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        written = db.session.query(Log).count()
+    log_ingest.stop()
+    os.unlink(db_path)
+    print(f'ingested {written} rows in {elapsed:.2f}s ({written / elapsed:.0f} rows/s)')
+
+if __name__ == '__main__':
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    main(total, batch)
@@ -0,0 +1,48 @@
+"""Compare thread and process execution of CPU-bound tasks.
+
+Runs the same pure-Python parsing handler for a batch of tasks with
+mode='thread' and mode='process' and reports wall time for each.
+
+Usage: python benchmarks/bench_process_mode.py [tasks] [workers]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.modules.tasks import TaskManager
+
+RECORD = json.dumps({'path': '/data/file.bin', 'size': 1048576, 'chunks': list(range(50))})
+
+def parse_manifest(context):
+    """Holds the GIL throughout, like parsing a transfer manifest"""
+    for _ in range(context.payload['rounds']):
+        json.loads(RECORD)
+
+def run(mode, tasks, workers):
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(db_fd)
+    manager = TaskManager(database_uri=f'sqlite:///{db_path}', max_workers=workers,
+                          process_workers=workers)
+    manager.register_handler('parse', parse_manifest, mode=mode)
+    ids = [manager.create_task(title=f'Parse {i}', task_type='parse', payload={'rounds': 20000}).id
+           for i in range(tasks)]
+    started = time.perf_counter()
+    for task_id in ids:
+        manager.start_task(task_id)
+    while len(manager.list_tasks(status='completed')) < tasks:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    manager.shutdown()
+    os.unlink(db_path)
+    return elapsed
+
+if __name__ == '__main__':
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    print(f'{tasks} tasks, {workers} workers, {os.cpu_count()} cores')
+    for mode in ('thread', 'process'):
+        print(f'{mode:8}: {run(mode, tasks, workers):.2f}s')
@@ -0,0 +1,61 @@
+"""Compare high-priority start latency under a saturated queue.
+
+Floods 4 workers with low-priority jobs, then trickles in high-priority
+jobs and reports their start latency with a FIFO ThreadPoolExecutor versus
+the PriorityScheduler.
+
+Usage: python benchmarks/bench_scheduler.py [low_jobs] [high_jobs]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.modules.tasks.scheduler import PriorityScheduler
+
+WORKERS = 4
+JOB_SECONDS = 0.005
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def run(submit, low_jobs, high_jobs):
+    latencies = []
+    lock = threading.Lock()
+    done = threading.Semaphore(0)
+
+    def job(submitted_at=None):
+        if submitted_at is not None:
+            with lock:
+                latencies.append(time.perf_counter() - submitted_at)
+        time.sleep(JOB_SECONDS)
+        done.release()
+
+    for _ in range(low_jobs):
+        submit('low', job)
+    for _ in range(high_jobs):
+        submit('high', job, time.perf_counter())
+        time.sleep(JOB_SECONDS * 4)
+    for _ in range(low_jobs + high_jobs):
+        done.acquire()
+    return latencies
+
+if __name__ == '__main__':
+    low_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    high_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    executor = ThreadPoolExecutor(max_workers=WORKERS)
+    fifo = run(lambda priority, fn, *args: executor.submit(fn, *args), low_jobs, high_jobs)
+    executor.shutdown()
+
+    scheduler = PriorityScheduler(max_workers=WORKERS)
+    prioritized = run(scheduler.submit, low_jobs, high_jobs)
+    scheduler.shutdown()
+
+    for label, samples in (('fifo     ', fifo), ('priority ', prioritized)):
+        print(f'{label}: high-priority start latency p50 {percentile(samples, 0.5) * 1000:.1f}ms, '
+              f'p99 {percentile(samples, 0.99) * 1000:.1f}ms')
@@ -0,0 +1,77 @@
+"""Compare read/write concurrency with and without the SQLite tuning profile.
+
+Runs reader threads polling GET /logs while writer threads create tasks
+against a file database, first with SQLITE_TUNING off, then on.
+
+Usage: python benchmarks/bench_sqlite_profile.py [seconds] [readers] [writers]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.ingest import log_ingest
+from app.models import db
+
+def run(tuned, seconds, readers, writers):
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(db_fd)
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'SQLITE_TUNING': tuned,
+        'CACHE_ENABLED': False
+    })
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post('/api/v1/logs/ingest', json=[{'source_server_name': 'fs-01'}] * 5000)
+    log_ingest.flush()
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(kind):
+        local = app.test_client()
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            if kind == 'reads':
+                response = local.get('/api/v1/logs?limit=50')
+            else:
+                response = local.post('/api/v1/tasks', json={'name': 'bench'})
+            if response.status_code < 300:
+                done += 1
+            else:
+                errors += 1
+        with lock:
+            counts[kind] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=('reads',)) for _ in range(readers)]
+    threads += [threading.Thread(target=worker, args=('writes',)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    log_ingest.stop()
+    with app.app_context():
+        db.engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
+    return counts
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    for tuned in (False, True):
+        counts = run(tuned, seconds, readers, writers)
+        label = 'tuned  ' if tuned else 'default'
+        print(f"{label}: {counts['reads'] / seconds:.0f} reads/s, "
+              f"{counts['writes'] / seconds:.0f} writes/s, {counts['errors']} errors")
@@ -0,0 +1,30 @@
+"""Add task retry columns
+
+Revision ID: 2a7c5e9d4f60
+Revises: 9e0f4c3b8a12
+Create Date: 2026-10-18 17:26:43.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a7c5e9d4f60'
+down_revision = '9e0f4c3b8a12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('retry_policy', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_column('next_attempt_at')
+        batch_op.drop_column('retry_policy')
+        batch_op.drop_column('attempts')
@@ -0,0 +1,27 @@
+"""Add task keyset pagination indexes
+
+Revision ID: 3f1c9a7d2b45
+Revises: da311614107b
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b45'
+down_revision = 'da311614107b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_task_created_at_id', 'task', ['created_at', 'id'], unique=False)
+    op.create_index('ix_task_status_created_at_id', 'task', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_task_priority_created_at_id', 'task', ['priority', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_task_priority_created_at_id', table_name='task')
+    op.drop_index('ix_task_status_created_at_id', table_name='task')
+    op.drop_index('ix_task_created_at_id', table_name='task')
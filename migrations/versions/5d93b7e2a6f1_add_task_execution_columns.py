@@ -0,0 +1,44 @@
+"""Add task execution columns
+
+Revision ID: 5d93b7e2a6f1
+Revises: c47a0e9f15d3
+Create Date: 2026-10-18 13:40:52.310876
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d93b7e2a6f1'
+down_revision = 'c47a0e9f15d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('task_type', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('payload', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('progress', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('due_date', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('started_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('finished_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('owner', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('error_code', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('error_message', sa.String(length=500), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_column('error_message')
+        batch_op.drop_column('error_code')
+        batch_op.drop_column('owner')
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('finished_at')
+        batch_op.drop_column('started_at')
+        batch_op.drop_column('due_date')
+        batch_op.drop_column('progress')
+        batch_op.drop_column('payload')
+        batch_op.drop_column('task_type')
@@ -0,0 +1,35 @@
+"""Add task dependency table
+
+Revision ID: 6f1d8a3c2e97
+Revises: 2a7c5e9d4f60
+Create Date: 2026-10-18 18:41:27.093651
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f1d8a3c2e97'
+down_revision = '2a7c5e9d4f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_dependency',
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('depends_on_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['depends_on_id'], ['task.id'], ),
+    sa.ForeignKeyConstraint(['task_id'], ['task.id'], ),
+    sa.PrimaryKeyConstraint('task_id', 'depends_on_id')
+    )
+    with op.batch_alter_table('task_dependency', schema=None) as batch_op:
+        batch_op.create_index('ix_task_dependency_depends_on_id', ['depends_on_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task_dependency', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_dependency_depends_on_id')
+
+    op.drop_table('task_dependency')
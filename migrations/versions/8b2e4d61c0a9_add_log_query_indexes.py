@@ -0,0 +1,33 @@
+"""Add log query indexes
+
+Revision ID: 8b2e4d61c0a9
+Revises: 3f1c9a7d2b45
+Create Date: 2026-10-18 10:03:17.552931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d61c0a9'
+down_revision = '3f1c9a7d2b45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_log_task_time_id', 'log', ['task_time', 'id'], unique=False)
+    op.create_index('ix_log_task_id_task_time_id', 'log', ['task_id', 'task_time', 'id'], unique=False)
+    op.create_index('ix_log_server_name_task_time_id', 'log', ['source_server_name', 'task_time', 'id'], unique=False)
+    op.create_index('ix_log_server_ip_task_time_id', 'log', ['source_server_ip', 'task_time', 'id'], unique=False)
+    op.create_index('ix_log_errors_task_time_id', 'log', ['task_time', 'id'], unique=False,
+                    sqlite_where=sa.text('error_message IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_log_errors_task_time_id', table_name='log')
+    op.drop_index('ix_log_server_ip_task_time_id', table_name='log')
+    op.drop_index('ix_log_server_name_task_time_id', table_name='log')
+    op.drop_index('ix_log_task_id_task_time_id', table_name='log')
+    op.drop_index('ix_log_task_time_id', table_name='log')
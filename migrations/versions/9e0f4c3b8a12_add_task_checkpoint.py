@@ -0,0 +1,26 @@
+"""Add task checkpoint
+
+Revision ID: 9e0f4c3b8a12
+Revises: 5d93b7e2a6f1
+Create Date: 2026-10-18 15:02:11.742905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e0f4c3b8a12'
+down_revision = '5d93b7e2a6f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('checkpoint', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_column('checkpoint')
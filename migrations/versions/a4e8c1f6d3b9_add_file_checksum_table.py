@@ -0,0 +1,34 @@
+"""Add file checksum table
+
+Revision ID: a4e8c1f6d3b9
+Revises: f3b7d2c9e5a1
+Create Date: 2026-10-19 02:31:07.552168
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e8c1f6d3b9'
+down_revision = 'f3b7d2c9e5a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('file_checksum',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('path', sa.String(length=1024), nullable=False),
+    sa.Column('algorithm', sa.String(length=20), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+    sa.Column('digest', sa.String(length=128), nullable=False),
+    sa.Column('verified_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('path', 'algorithm', name='uq_file_checksum_path_algorithm')
+    )
+
+
+def downgrade():
+    op.drop_table('file_checksum')
@@ -0,0 +1,53 @@
+"""Add log full-text search index
+
+Revision ID: b3e8f2a9c6d4
+Revises: 6f1d8a3c2e97
+Create Date: 2026-10-18 21:05:12.418306
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8f2a9c6d4'
+down_revision = '6f1d8a3c2e97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The app creates the same table and triggers at startup when they are
+    # missing, so a database the app has already run against may have them
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING fts5("
+        "error_message, source_server_file_path, source_server_file_name, "
+        "content='log', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS log_fts_insert AFTER INSERT ON log BEGIN "
+        "INSERT INTO log_fts(rowid, error_message, source_server_file_path, source_server_file_name) "
+        "VALUES (new.id, new.error_message, new.source_server_file_path, new.source_server_file_name); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS log_fts_delete AFTER DELETE ON log BEGIN "
+        "INSERT INTO log_fts(log_fts, rowid, error_message, source_server_file_path, source_server_file_name) "
+        "VALUES ('delete', old.id, old.error_message, old.source_server_file_path, old.source_server_file_name); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS log_fts_update AFTER UPDATE OF "
+        "error_message, source_server_file_path, source_server_file_name ON log BEGIN "
+        "INSERT INTO log_fts(log_fts, rowid, error_message, source_server_file_path, source_server_file_name) "
+        "VALUES ('delete', old.id, old.error_message, old.source_server_file_path, old.source_server_file_name); "
+        "INSERT INTO log_fts(rowid, error_message, source_server_file_path, source_server_file_name) "
+        "VALUES (new.id, new.error_message, new.source_server_file_path, new.source_server_file_name); END"
+    )
+    op.execute("INSERT INTO log_fts(log_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 2.0)')")
+    # Index the rows that already exist
+    op.execute("INSERT INTO log_fts(log_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS log_fts_update')
+    op.execute('DROP TRIGGER IF EXISTS log_fts_delete')
+    op.execute('DROP TRIGGER IF EXISTS log_fts_insert')
+    op.execute('DROP TABLE IF EXISTS log_fts')
@@ -0,0 +1,44 @@
+"""Add dashboard rollup tables
+
+Revision ID: c47a0e9f15d3
+Revises: 8b2e4d61c0a9
+Create Date: 2026-10-18 11:26:05.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47a0e9f15d3'
+down_revision = '8b2e4d61c0a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_daily_stat',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('priority', sa.String(length=20), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status', 'priority')
+    )
+    op.create_table('task_completion_stat',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('log_daily_stat',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('source_server_name', sa.String(length=100), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('errors', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'source_server_name')
+    )
+
+
+def downgrade():
+    op.drop_table('log_daily_stat')
+    op.drop_table('task_completion_stat')
+    op.drop_table('task_daily_stat')
@@ -0,0 +1,28 @@
+"""Add transfer statistics to log
+
+Revision ID: d5a9b3c7e1f2
+Revises: c8d4e1f7a2b5
+Create Date: 2026-10-18 23:02:48.731245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a9b3c7e1f2'
+down_revision = 'c8d4e1f7a2b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('log', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('bytes_transferred', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('duration_ms', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('log', schema=None) as batch_op:
+        batch_op.drop_column('duration_ms')
+        batch_op.drop_column('bytes_transferred')
@@ -0,0 +1,51 @@
+"""Add content store tables
+
+Revision ID: e7c2f9a4b8d1
+Revises: d5a9b3c7e1f2
+Create Date: 2026-10-18 23:48:19.204577
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c2f9a4b8d1'
+down_revision = 'd5a9b3c7e1f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('content_object',
+    sa.Column('digest', sa.String(length=128), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('digest')
+    )
+    with op.batch_alter_table('content_object', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_content_object_last_used_at'), ['last_used_at'], unique=False)
+
+    op.create_table('content_source',
+    sa.Column('location', sa.String(length=500), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('version', sa.String(length=200), nullable=False),
+    sa.Column('digest', sa.String(length=128), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('location')
+    )
+    with op.batch_alter_table('content_source', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_content_source_digest'), ['digest'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('content_source', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_content_source_digest'))
+
+    op.drop_table('content_source')
+    with op.batch_alter_table('content_object', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_content_object_last_used_at'))
+
+    op.drop_table('content_object')
@@ -0,0 +1,39 @@
+"""Add file state index and task result
+
+Revision ID: f3b7d2c9e5a1
+Revises: e7c2f9a4b8d1
+Create Date: 2026-10-19 01:12:44.381920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b7d2c9e5a1'
+down_revision = 'e7c2f9a4b8d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('file_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('source_server_name', sa.String(length=100), nullable=False),
+    sa.Column('path', sa.String(length=1024), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+    sa.Column('digest', sa.String(length=128), nullable=False),
+    sa.Column('synced_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source_server_name', 'path', name='uq_file_state_server_path')
+    )
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('result', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_column('result')
+
+    op.drop_table('file_state')
@@ -1,7 +1,6 @@
 from .tasks import TaskManager
 from .users import UserManager
 from .logs import LogManager
-from .deployment import DeploymentManager
 from .settings import SettingsManager
 
-__all__ = ['TaskManager', 'UserManager', 'LogManager', 'DeploymentManager', 'SettingsManager']
+__all__ = ['TaskManager', 'UserManager', 'LogManager', 'SettingsManager']
@@ -0,0 +1,7 @@
+from .content_store import ContentStore
+from .file_manager import FileManager
+from .sync import DirectorySync
+from .transfer import TransferEngine
+from .verify import FileVerifier
+
+__all__ = ['ContentStore', 'DirectorySync', 'FileManager', 'FileVerifier', 'TransferEngine']
@@ -0,0 +1,223 @@
+from datetime import datetime
+import errno
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+from app.models import ContentObject, ContentSource
+
+# Hash naming every object in the store; BLAKE2b hashes faster than SHA-256
+DIGEST_ALGORITHM = 'blake2b'
+# Bytes hashed per read
+HASH_BUFFER_SIZE = 1024 * 1024
+# Store size kept after eviction
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024 * 1024
+# Ways of putting an object at a destination, tried in order
+LINK_MODES = ('reflink', 'hardlink', 'copy')
+# ioctl cloning a whole file on filesystems with copy-on-write extents (btrfs, XFS)
+FICLONE = 0x40049409
+# Errors meaning a link mode is unavailable here, so the next mode is tried
+_UNSUPPORTED = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV, errno.EPERM, errno.EMLINK}
+
+def new_hasher():
+    return hashlib.new(DIGEST_ALGORITHM)
+
+def hash_file(path):
+    """Streaming DIGEST_ALGORITHM hex digest of a file"""
+    hasher = new_hasher()
+    buffer = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            hasher.update(view[:count])
+    return hasher.hexdigest()
+
+def _reflink(source, destination):
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+class ContentStore:
+    """Content-addressed file store with least-recently-used eviction.
+
+    Objects live under ``<root>/<digest[:2]>/<digest>`` and are placed at
+    destinations as a reflink, a hard link or a copy, whichever
+    ``link_modes`` allows first on the filesystem. A source index maps a
+    location (a local path or a URL) with its size and version (mtime for
+    paths, ETag or Last-Modified for URLs) to a digest, so an unchanged
+    source is found without reading it. When the objects exceed
+    ``max_bytes`` the least recently used are evicted.
+
+    A hard-linked destination shares its inode with the object, so each
+    object's size and mtime are recorded and an object whose file no
+    longer matches them is dropped instead of being placed again.
+    """
+    def __init__(self, engine, root, max_bytes=DEFAULT_MAX_BYTES, link_modes=LINK_MODES):
+        unknown = set(link_modes) - set(LINK_MODES)
+        if unknown or not link_modes:
+            raise ValueError(f'link_modes must be taken from {", ".join(LINK_MODES)}')
+        self.engine = engine
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.link_modes = tuple(link_modes)
+        self.logger = logging.getLogger('content_store')
+
+    def object_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _temp_path(self, path):
+        return f'{path}.{uuid.uuid4().hex}.tmp'
+
+    def _place(self, source, destination):
+        """Put ``source`` at the new path ``destination``; returns the link mode used"""
+        for mode in self.link_modes:
+            try:
+                if mode == 'reflink':
+                    _reflink(source, destination)
+                elif mode == 'hardlink':
+                    os.link(source, destination)
+                else:
+                    shutil.copyfile(source, destination)
+                return mode
+            except OSError as e:
+                if os.path.lexists(destination):
+                    os.remove(destination)
+                if e.errno not in _UNSUPPORTED or mode == self.link_modes[-1]:
+                    raise
+
+    def file_digest(self, path):
+        """Digest of a local file, hashed only if its size or mtime changed"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        version = str(stat.st_mtime_ns)
+        digest = self._source_digest(path, stat.st_size, version)
+        if digest is None:
+            digest = hash_file(path)
+            self._record_source(path, stat.st_size, version, digest)
+        return digest
+
+    def _source_digest(self, location, size, version):
+        with self.Session() as session:
+            source = session.get(ContentSource, location)
+            if source is not None and source.size == size and source.version == version:
+                return source.digest
+        return None
+
+    def _record_source(self, location, size, version, digest):
+        with self.Session() as session:
+            session.merge(ContentSource(location=location, size=size, version=version, digest=digest))
+            session.commit()
+
+    def lookup(self, location, size, version):
+        """Digest of a stored object for ``location`` at this size and version, or None"""
+        if version is None:
+            return None
+        digest = self._source_digest(location, size, version)
+        if digest is None:
+            return None
+        with self.Session() as session:
+            return digest if session.get(ContentObject, digest) is not None else None
+
+    def add(self, path, digest=None, location=None, size=None, version=None):
+        """Store the content of ``path`` and return its digest.
+
+        ``digest`` skips hashing when the caller already has it. With a
+        ``location`` and ``version`` (and the source ``size``, defaulting
+        to the file's) the source is indexed for lookup. Files larger than
+        max_bytes are hashed but not stored.
+        """
+        stat = os.stat(path)
+        if digest is None:
+            digest = self.file_digest(path)
+        if location is not None and version is not None:
+            self._record_source(location, stat.st_size if size is None else size, version, digest)
+        if stat.st_size > self.max_bytes:
+            return digest
+        target = self.object_path(digest)
+        with self.Session() as session:
+            entry = session.get(ContentObject, digest)
+            if entry is None or not self._intact(entry):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                temp = self._temp_path(target)
+                self._place(path, temp)
+                os.replace(temp, target)
+                stat = os.stat(target)
+                entry = ContentObject(digest=digest, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            entry.last_used_at = datetime.utcnow()
+            session.merge(entry)
+            session.commit()
+        self.evict()
+        return digest
+
+    def _intact(self, entry):
+        try:
+            stat = os.stat(self.object_path(entry.digest))
+        except FileNotFoundError:
+            return False
+        return stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns
+
+    def materialize(self, digest, destination):
+        """Place object ``digest`` at ``destination``; returns the link mode or None.
+
+        None means the object is not in the store (anymore), and the caller
+        has to get the content elsewhere.
+        """
+        with self.Session() as session:
+            entry = session.get(ContentObject, digest)
+            if entry is None:
+                return None
+            if not self._intact(entry):
+                self.logger.warning(f'Object {digest} changed on disk, dropping it')
+                self._remove(session, entry)
+                session.commit()
+                return None
+            entry.last_used_at = datetime.utcnow()
+            session.commit()
+        temp = self._temp_path(destination)
+        try:
+            mode = self._place(self.object_path(digest), temp)
+        except FileNotFoundError:
+            # Evicted since the check above
+            return None
+        os.replace(temp, destination)
+        return mode
+
+    def _remove(self, session, entry):
+        try:
+            os.remove(self.object_path(entry.digest))
+        except FileNotFoundError:
+            pass
+        session.query(ContentSource).filter(ContentSource.digest == entry.digest).delete()
+        session.delete(entry)
+
+    def size(self):
+        """Total bytes of the stored objects"""
+        with self.Session() as session:
+            return session.execute(select(func.coalesce(func.sum(ContentObject.size), 0))).scalar()
+
+    def evict(self):
+        """Remove least recently used objects until the store fits max_bytes"""
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return 0
+        evicted = 0
+        with self.Session() as session:
+            entries = session.execute(
+                select(ContentObject).order_by(ContentObject.last_used_at, ContentObject.digest)
+            ).scalars().all()
+            for entry in entries:
+                if excess <= 0:
+                    break
+                excess -= entry.size
+                evicted += 1
+                self._remove(session, entry)
+            session.commit()
+        self.logger.info(f'Evicted {evicted} objects from the content store')
+        return evicted
@@ -0,0 +1,27 @@
+class FileError(Exception):
+    """Base class for file-related errors"""
+    def __init__(self, code, message):
+        self.code = code
+        self.message = message
+        super().__init__(self.message)
+
+class FileValidationError(FileError):
+    """Raised when a file or upload request is invalid"""
+    def __init__(self, code, message):
+        super().__init__(code, message)
+
+class StoredFileNotFoundError(FileError):
+    """Raised when a stored file is not found"""
+    def __init__(self, file_id):
+        super().__init__('FILE_NOT_FOUND', f'File {file_id} not found')
+
+class UploadNotFoundError(FileError):
+    """Raised when an upload session is not found"""
+    def __init__(self, upload_id):
+        super().__init__('UPLOAD_NOT_FOUND', f'Upload {upload_id} not found')
+
+class UploadConflictError(FileError):
+    """Raised when a chunk does not continue the upload or it is being written"""
+    def __init__(self, code, message, offset=None):
+        self.offset = offset
+        super().__init__(code, message)
@@ -0,0 +1,264 @@
+from datetime import datetime
+import fcntl
+import logging
+import os
+import tempfile
+import uuid
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+from app.models import FileUpload, StoredFile
+from .exceptions import (
+    FileValidationError, StoredFileNotFoundError, UploadConflictError, UploadNotFoundError
+)
+
+# Bytes read from the request and written to disk per step
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# Longest file name kept, matching StoredFile.name
+MAX_NAME_LENGTH = 255
+
+class FileManager:
+    """Stores uploaded files on disk and tracks them in the database.
+
+    Request bodies are copied to disk ``chunk_size`` bytes at a time, so
+    memory use does not depend on the file size. Resumable uploads write
+    to ``uploads/<id>.part``; each chunk must start at the upload's
+    recorded offset, which only advances after the bytes are fsynced, so
+    a client that lost its connection can ask for the offset and continue
+    from there. Completed files are renamed into the storage directory
+    under a random name.
+    """
+    def __init__(self, engine, storage_dir, chunk_size=DEFAULT_CHUNK_SIZE, max_size=None):
+        self.engine = engine
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.storage_dir = os.path.abspath(storage_dir)
+        self.upload_dir = os.path.join(self.storage_dir, 'uploads')
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.logger = logging.getLogger('file_manager')
+
+    def path(self, stored_file):
+        """Absolute path of a stored file's content"""
+        return os.path.join(self.storage_dir, stored_file.storage_name)
+
+    def part_path(self, upload_id):
+        return os.path.join(self.upload_dir, f'{upload_id}.part')
+
+    @staticmethod
+    def _validate_name(name):
+        if not isinstance(name, str) or not name.strip():
+            raise FileValidationError('INVALID_FILE_NAME', 'File name is required')
+        # Only the last path component is kept; content is stored under a random name
+        name = os.path.basename(name.replace('\\', '/')).strip()
+        if not name or len(name) > MAX_NAME_LENGTH:
+            raise FileValidationError('INVALID_FILE_NAME', f'File name must be 1-{MAX_NAME_LENGTH} characters')
+        return name
+
+    def get_file(self, file_id):
+        with self.Session() as session:
+            stored_file = session.get(StoredFile, file_id)
+            if stored_file is None:
+                raise StoredFileNotFoundError(file_id)
+            return stored_file
+
+    def delete_file(self, file_id):
+        with self.Session() as session:
+            stored_file = session.get(StoredFile, file_id)
+            if stored_file is None:
+                raise StoredFileNotFoundError(file_id)
+            session.delete(stored_file)
+            session.commit()
+        try:
+            os.remove(self.path(stored_file))
+        except FileNotFoundError:
+            self.logger.warning(f'Content of file {file_id} was already missing')
+
+    def new_temp_file(self):
+        """Open a temporary file on the storage volume for store_file"""
+        os.makedirs(self.upload_dir, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.upload_dir, suffix='.tmp', delete=False)
+
+    def store_file(self, path, name, content_type=None, upload_id=None):
+        """Move a complete file at ``path`` into storage and record it.
+
+        ``path`` must be on the storage volume (see new_temp_file), so the
+        move is a rename rather than a copy. With ``upload_id`` the upload
+        is deleted in the same transaction and the file remembers it.
+        """
+        name = self._validate_name(name)
+        size = os.path.getsize(path)
+        if self.max_size is not None and size > self.max_size:
+            os.remove(path)
+            raise FileValidationError('FILE_TOO_LARGE', f'Files are limited to {self.max_size} bytes')
+        storage_name = uuid.uuid4().hex
+        os.replace(path, os.path.join(self.storage_dir, storage_name))
+        with self.Session() as session:
+            stored_file = StoredFile(
+                name=name, storage_name=storage_name, size=size, content_type=content_type,
+                upload_id=upload_id
+            )
+            session.add(stored_file)
+            if upload_id is not None:
+                session.query(FileUpload).filter(FileUpload.id == upload_id).delete()
+            session.commit()
+            return stored_file
+
+    def save_stream(self, stream, name, content_type=None):
+        """Store a whole file read from ``stream``"""
+        name = self._validate_name(name)
+        with self.new_temp_file() as f:
+            try:
+                self._copy(stream, f, self.max_size)
+                if self.max_size is not None and stream.read(1):
+                    raise FileValidationError('FILE_TOO_LARGE', f'Files are limited to {self.max_size} bytes')
+            except Exception:
+                f.close()
+                os.remove(f.name)
+                raise
+        return self.store_file(f.name, name, content_type)
+
+    def create_upload(self, name, size=None, content_type=None):
+        """Start a resumable upload of ``size`` bytes (None if unknown)"""
+        name = self._validate_name(name)
+        if size is not None and (not isinstance(size, int) or isinstance(size, bool) or size < 0):
+            raise FileValidationError('INVALID_FILE_SIZE', 'size must be a non-negative integer')
+        if size is not None and self.max_size is not None and size > self.max_size:
+            raise FileValidationError('FILE_TOO_LARGE', f'Files are limited to {self.max_size} bytes')
+        upload = FileUpload(id=uuid.uuid4().hex, name=name, size=size, offset=0, content_type=content_type)
+        os.makedirs(self.upload_dir, exist_ok=True)
+        open(self.part_path(upload.id), 'wb').close()
+        with self.Session() as session:
+            session.add(upload)
+            session.commit()
+            return upload
+
+    def get_upload(self, upload_id):
+        with self.Session() as session:
+            upload = session.get(FileUpload, upload_id)
+            if upload is None:
+                raise UploadNotFoundError(upload_id)
+            return upload
+
+    def _completed_file(self, upload_id):
+        """The StoredFile an upload was completed into, or None"""
+        with self.Session() as session:
+            return session.query(StoredFile).filter(StoredFile.upload_id == upload_id).one_or_none()
+
+    def _active_upload(self, upload_id):
+        """Like get_upload, but a completed upload is a conflict rather than missing"""
+        try:
+            return self.get_upload(upload_id)
+        except UploadNotFoundError:
+            if self._completed_file(upload_id) is not None:
+                raise UploadConflictError('UPLOAD_COMPLETED', f'Upload {upload_id} is already complete')
+            raise
+
+    def _open_part(self, upload_id):
+        """Open an upload's part file and take its lock without waiting.
+
+        Chunk writes, completion and abort all hold this lock, so none of
+        them can overlap another on the same upload.
+        """
+        try:
+            f = open(self.part_path(upload_id), 'r+b')
+        except FileNotFoundError:
+            # Completed or aborted since the caller looked the upload up
+            self._active_upload(upload_id)
+            raise UploadNotFoundError(upload_id)
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            raise UploadConflictError(
+                'UPLOAD_BUSY', f'Upload {upload_id} is busy with another request', self.get_upload(upload_id).offset
+            )
+        return f
+
+    def _copy(self, stream, f, limit):
+        """Copy up to ``limit`` bytes (None for all) from ``stream`` to ``f``"""
+        written = 0
+        while limit is None or written < limit:
+            size = self.chunk_size if limit is None else min(self.chunk_size, limit - written)
+            data = stream.read(size)
+            if not data:
+                break
+            f.write(data)
+            written += len(data)
+        return written
+
+    def write_chunk(self, upload_id, offset, stream):
+        """Append ``stream`` to an upload at ``offset``; returns the updated upload.
+
+        The offset must equal the upload's current offset. Bytes received
+        before the stream breaks off are kept and counted, so the client
+        resumes from the returned (or later queried) offset.
+        """
+        upload = self._active_upload(upload_id)
+        limit = upload.size if upload.size is not None else self.max_size
+        with self._open_part(upload_id) as f:
+            # Re-read under the lock in case a chunk or the completion finished since
+            upload = self._active_upload(upload_id)
+            if offset != upload.offset:
+                raise UploadConflictError(
+                    'UPLOAD_OFFSET_MISMATCH', f'Upload {upload_id} continues at offset {upload.offset}',
+                    upload.offset
+                )
+            # Drop bytes past the recorded offset left by an interrupted write
+            f.truncate(offset)
+            f.seek(offset)
+            try:
+                self._copy(stream, f, None if limit is None else limit - offset)
+                overflow = limit is not None and stream.read(1)
+            finally:
+                f.flush()
+                os.fsync(f.fileno())
+                upload.offset = self._record_offset(upload_id, offset, f.tell())
+        if overflow:
+            raise FileValidationError(
+                'UPLOAD_TOO_LARGE', f'Upload {upload_id} is limited to {limit} bytes'
+            )
+        return upload
+
+    def _record_offset(self, upload_id, old_offset, new_offset):
+        with self.Session() as session:
+            session.execute(
+                update(FileUpload)
+                .where(FileUpload.id == upload_id, FileUpload.offset == old_offset)
+                .values(offset=new_offset, updated_at=datetime.utcnow())
+            )
+            session.commit()
+        return new_offset
+
+    def complete_upload(self, upload_id):
+        """Turn a fully received upload into a StoredFile.
+
+        Completing an upload again returns the file it was stored as.
+        """
+        try:
+            f = self._open_part(upload_id)
+        except UploadConflictError as e:
+            if e.code != 'UPLOAD_COMPLETED':
+                raise
+            return self._completed_file(upload_id)
+        with f:
+            try:
+                upload = self._active_upload(upload_id)
+            except UploadConflictError:
+                # Completed by another request after the part file was opened
+                return self._completed_file(upload_id)
+            if upload.size is not None and upload.offset != upload.size:
+                raise UploadConflictError(
+                    'UPLOAD_INCOMPLETE', f'Upload {upload_id} has {upload.offset} of {upload.size} bytes',
+                    upload.offset
+                )
+            f.truncate(upload.offset)
+            # Renamed while still locked, so no chunk can be written to it meanwhile
+            return self.store_file(f.name, upload.name, upload.content_type, upload_id=upload_id)
+
+    def abort_upload(self, upload_id):
+        self._active_upload(upload_id)
+        with self._open_part(upload_id):
+            self._active_upload(upload_id)
+            with self.Session() as session:
+                session.query(FileUpload).filter(FileUpload.id == upload_id).delete()
+                session.commit()
+            os.remove(self.part_path(upload_id))
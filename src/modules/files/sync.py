@@ -0,0 +1,354 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+import logging
+import os
+import socket
+import threading
+import time
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker
+from app.models import FileState, Log
+from src.modules.tasks.exceptions import TaskError
+from .content_store import new_hasher
+from .exceptions import FileError, FileValidationError
+
+# Threads listing directories; each lists one directory at a time
+DEFAULT_SCAN_WORKERS = 8
+# Files copied at the same time
+DEFAULT_COPY_WORKERS = 4
+# Bytes read and written per system call while copying
+COPY_BUFFER_SIZE = 1024 * 1024
+# Copied files whose index rows are written together
+INDEX_BATCH_SIZE = 500
+# Seconds between index writes and checkpoints while copying
+CHECKPOINT_INTERVAL = 1.0
+# Failed files listed by name in a sync result
+MAX_REPORTED_ERRORS = 20
+
+def _scan_dir(path, rel):
+    """List one directory: (files, subdirectories, error)"""
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = f'{rel}/{entry.name}' if rel else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append((entry.path, name))
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    files.append((name, stat.st_size, stat.st_mtime_ns))
+    except OSError as e:
+        return files, dirs, f'{path}: {e.strerror or e}'
+    return files, dirs, None
+
+def scan_tree(root, workers=DEFAULT_SCAN_WORKERS):
+    """Regular files below ``root`` as ({relative path: (size, mtime_ns)}, errors).
+
+    Directories are listed concurrently, one ``os.scandir`` per
+    directory, so stat calls on slow or network filesystems overlap.
+    Symlinks and special files are skipped.
+    """
+    files = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan') as executor:
+        pending = {executor.submit(_scan_dir, root, '')}
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                found, dirs, error = future.result()
+                files.update((name, (size, mtime_ns)) for name, size, mtime_ns in found)
+                if error:
+                    errors.append(error)
+                pending.update(executor.submit(_scan_dir, path, name) for path, name in dirs)
+    return files, errors
+
+def _resolve(root, path, code, label):
+    if not isinstance(path, str) or not path:
+        raise FileValidationError(code, f'{label} is required')
+    if root is None:
+        return os.path.abspath(path)
+    # Resolve symlinks so a link inside root cannot lead outside it
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([resolved, root]) != root:
+        raise FileValidationError(code, f'{label} must be inside {root}')
+    return resolved
+
+class SyncResult:
+    """Counts of one directory sync"""
+    __slots__ = ('source', 'destination', 'files_scanned', 'files_copied', 'files_unchanged',
+                 'files_deleted', 'files_failed', 'dirs_failed', 'bytes_copied', 'bytes_saved',
+                 'duration', 'errors')
+
+    def __init__(self, source, destination):
+        self.source = source
+        self.destination = destination
+        self.files_scanned = 0
+        self.files_copied = 0
+        self.files_unchanged = 0
+        self.files_deleted = 0
+        self.files_failed = 0
+        self.dirs_failed = 0
+        self.bytes_copied = 0
+        self.bytes_saved = 0
+        self.duration = 0.0
+        self.errors = []
+
+    def to_dict(self):
+        result = {name: getattr(self, name) for name in self.__slots__}
+        result['duration'] = round(self.duration, 3)
+        return result
+
+class DirectorySync:
+    """Copies the files of a directory tree that changed since the last sync.
+
+    The file_state table remembers the size, mtime and digest of every
+    file last copied from each source server. A sync lists the source and
+    destination trees in parallel, skips files whose size and mtime match
+    their index row and whose destination copy has that size, and copies
+    only the rest, hashing them on the way. Index rows are written every
+    INDEX_BATCH_SIZE files or CHECKPOINT_INTERVAL, so a paused or
+    interrupted sync picks up where it stopped. With ``delete`` the
+    destination files missing from the source are removed, unless part of
+    the source could not be listed. Sources are resolved below
+    ``source_root`` with symlinks followed, so a sync cannot read outside
+    it; without a root any directory is accepted.
+    """
+    def __init__(self, engine=None, destination_root=None, source_root=None,
+                 scan_workers=DEFAULT_SCAN_WORKERS, copy_workers=DEFAULT_COPY_WORKERS):
+        self.Session = sessionmaker(bind=engine, expire_on_commit=False) if engine is not None else None
+        self.destination_root = os.path.realpath(destination_root) if destination_root else None
+        self.source_root = os.path.realpath(source_root) if source_root else None
+        self.scan_workers = scan_workers
+        self.copy_workers = copy_workers
+        self.logger = logging.getLogger('directory_sync')
+
+    def _load_index(self, server, source):
+        """{relative path: (size, mtime_ns)} of the indexed files below ``source``"""
+        if self.Session is None:
+            return {}
+        prefix = source.rstrip('/') + '/'
+        with self.Session() as session:
+            rows = session.execute(
+                select(FileState.path, FileState.size, FileState.mtime_ns)
+                .where(FileState.source_server_name == server,
+                       FileState.path >= prefix, FileState.path < prefix[:-1] + '0')
+            )
+            return {path[len(prefix):]: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+    def _save_index(self, server, source, states, removed=()):
+        if self.Session is None or not states and not removed:
+            return
+        table = FileState.__table__
+        now = datetime.utcnow()
+        with self.Session() as session:
+            if states:
+                stmt = sqlite_insert(table)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.source_server_name, table.c.path],
+                    set_={
+                        'size': stmt.excluded.size,
+                        'mtime_ns': stmt.excluded.mtime_ns,
+                        'digest': stmt.excluded.digest,
+                        'synced_at': stmt.excluded.synced_at
+                    }
+                )
+                session.execute(stmt, [
+                    {'source_server_name': server, 'path': os.path.join(source, name), 'size': size,
+                     'mtime_ns': mtime_ns, 'digest': digest, 'synced_at': now}
+                    for name, size, mtime_ns, digest in states
+                ])
+            removed = [os.path.join(source, name) for name in removed]
+            for start in range(0, len(removed), INDEX_BATCH_SIZE):
+                session.execute(delete(table).where(
+                    table.c.source_server_name == server,
+                    table.c.path.in_(removed[start:start + INDEX_BATCH_SIZE])
+                ))
+            session.commit()
+
+    @staticmethod
+    def _copy_file(source, destination, stop):
+        """Copy one file through ``<destination>.part``; returns (size, mtime_ns, digest) or None.
+
+        None means the source changed while it was read; the copy is kept
+        but not indexed, so the next sync copies it again.
+        """
+        before = os.stat(source)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        hasher = new_hasher()
+        buffer = bytearray(COPY_BUFFER_SIZE)
+        view = memoryview(buffer)
+        temp = destination + '.part'
+        try:
+            with open(source, 'rb', buffering=0) as src, open(temp, 'wb', buffering=0) as dst:
+                while not stop.is_set():
+                    count = src.readinto(buffer)
+                    if not count:
+                        break
+                    hasher.update(view[:count])
+                    dst.write(view[:count])
+            if stop.is_set():
+                raise FileError('SYNC_STOPPED', 'Sync stopped')
+            os.utime(temp, ns=(before.st_atime_ns, before.st_mtime_ns))
+            os.replace(temp, destination)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        after = os.stat(source)
+        if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+            return None
+        return before.st_size, before.st_mtime_ns, hasher.hexdigest()
+
+    def sync(self, source, destination, source_server_name=None, delete=False, task_id=None, context=None):
+        """Bring ``destination`` up to date with the ``source`` directory; returns a SyncResult.
+
+        With a TaskContext as ``context`` progress is reported by bytes
+        copied and pause/cancel is honoured between files.
+        """
+        source = _resolve(self.source_root, source, 'INVALID_SOURCE', 'source')
+        destination = _resolve(self.destination_root, destination, 'INVALID_DESTINATION', 'destination')
+        if not os.path.isdir(source):
+            raise FileValidationError('INVALID_SOURCE', f'Source directory {source} does not exist')
+        if os.path.commonpath([source, destination]) in (source, destination):
+            raise FileValidationError('INVALID_DESTINATION', 'source and destination must not contain each other')
+        server = source_server_name or socket.gethostname()
+        started = time.monotonic()
+        result = SyncResult(source, destination)
+
+        source_files, scan_errors = scan_tree(source, self.scan_workers)
+        destination_files = scan_tree(destination, self.scan_workers)[0] if os.path.isdir(destination) else {}
+        index = self._load_index(server, source)
+        result.files_scanned = len(source_files)
+        result.dirs_failed = len(scan_errors)
+        result.errors.extend(scan_errors[:MAX_REPORTED_ERRORS])
+
+        changed = []
+        for name, (size, mtime_ns) in source_files.items():
+            if index.get(name) == (size, mtime_ns) and destination_files.get(name, (None,))[0] == size:
+                result.files_unchanged += 1
+                result.bytes_saved += size
+            else:
+                changed.append(name)
+        try:
+            self._copy_changed(server, source, destination, changed, source_files, result, context)
+        finally:
+            result.duration = time.monotonic() - started
+
+        # A source directory that could not be listed would look deleted
+        removed = [name for name in index if name not in source_files] if not scan_errors else []
+        self._save_index(server, source, [], removed)
+        if delete and not scan_errors:
+            for name in destination_files:
+                if name not in source_files:
+                    try:
+                        os.remove(os.path.join(destination, name))
+                        result.files_deleted += 1
+                    except OSError as e:
+                        self._failed(result, name, e)
+        result.duration = time.monotonic() - started
+        self._record(server, source, task_id, result)
+        self.logger.info(
+            f'Synced {source} to {destination}: {result.files_copied} copied, '
+            f'{result.files_unchanged} unchanged, {result.files_deleted} deleted, '
+            f'{result.files_failed} failed in {result.duration:.2f}s'
+        )
+        return result
+
+    def _failed(self, result, name, error):
+        result.files_failed += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(f'{name}: {getattr(error, "strerror", None) or error}')
+
+    def _copy_changed(self, server, source, destination, changed, source_files, result, context):
+        """Copy ``changed`` files in parallel, writing index rows in batches"""
+        if not changed:
+            return
+        total = sum(source_files[name][0] for name in changed) or 1
+        stop = threading.Event()
+        states = []
+        last_checkpoint = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.copy_workers, thread_name_prefix='sync') as executor:
+            futures = {
+                executor.submit(self._copy_file, os.path.join(source, name), os.path.join(destination, name), stop): name
+                for name in changed
+            }
+            try:
+                while futures:
+                    finished, _ = wait(futures, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name = futures.pop(future)
+                        try:
+                            state = future.result()
+                        except OSError as e:
+                            self._failed(result, name, e)
+                            continue
+                        result.files_copied += 1
+                        if state is not None:
+                            result.bytes_copied += state[0]
+                            states.append((name,) + state)
+                        else:
+                            self.logger.warning(f'{name} changed while it was copied; it is copied again next sync')
+                    if len(states) >= INDEX_BATCH_SIZE or time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                        self._save_index(server, source, states)
+                        states = []
+                        last_checkpoint = time.monotonic()
+                        if context is not None:
+                            context.checkpoint(progress=min(result.bytes_copied * 100 // total, 99))
+            except BaseException:
+                stop.set()
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                self._save_index(server, source, states)
+
+    def _record(self, server, source, task_id, result):
+        """Write one Log row summarizing the sync"""
+        if self.Session is None:
+            return
+        error_message = None
+        if result.errors:
+            error_message = (
+                f'{result.files_failed} files and {result.dirs_failed} directories failed: '
+                + '; '.join(result.errors)
+            )
+        with self.Session() as session:
+            session.add(Log(
+                task_id=task_id,
+                source_server_name=server[:100],
+                source_server_file_path=source[:200],
+                source_server_file_name=os.path.basename(source)[:100],
+                task_time=datetime.utcnow(),
+                error_message=error_message[:500] if error_message else None,
+                bytes_transferred=result.bytes_copied,
+                duration_ms=int(result.duration * 1000)
+            ))
+            session.commit()
+
+    def run_task(self, context):
+        """Task handler for ``file_sync`` tasks.
+
+        Payload: ``source`` and ``destination`` directories, and optionally
+        ``source_server_name`` and ``delete``. The counts are stored as the
+        task result; a sync that could not read or copy everything fails
+        with SYNC_INCOMPLETE after recording them.
+        """
+        payload = context.payload or {}
+        try:
+            result = self.sync(
+                payload.get('source'), payload.get('destination'),
+                source_server_name=payload.get('source_server_name'),
+                delete=bool(payload.get('delete')),
+                task_id=context.task_id,
+                context=context
+            )
+        except FileError as e:
+            raise TaskError(e.code, e.message)
+        context.set_result(result.to_dict())
+        if result.files_failed or result.dirs_failed:
+            raise TaskError(
+                'SYNC_INCOMPLETE',
+                f'{result.files_failed} files and {result.dirs_failed} directories could not be synced'
+            )
+        context.report_progress(100)
@@ -0,0 +1,451 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime
+import hashlib
+import http.client
+import logging
+import os
+import posixpath
+import queue
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+from sqlalchemy.orm import sessionmaker
+from app.models import Log
+from src.modules.tasks.exceptions import TaskCancelledError, TaskError, TaskPausedError
+from .content_store import DIGEST_ALGORITHM, new_hasher
+from .exceptions import FileError, FileValidationError
+
+# Bytes fetched per ranged request
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+# Parallel ranged requests, each on its own pooled keep-alive connection
+DEFAULT_CONNECTIONS = 4
+DEFAULT_TIMEOUT = 30.0
+# Tries per part before the transfer fails, and the first retry delay
+DEFAULT_PART_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 0.5
+# Bytes read from a response or the file per system call
+READ_BUFFER_SIZE = 256 * 1024
+# Seconds between progress/checkpoint updates of a transfer task
+CHECKPOINT_INTERVAL = 1.0
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, at most ``size`` open at a time"""
+    def __init__(self, scheme, host, port, size, timeout):
+        self.connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it is closed instead of reused if the block raises"""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self.connection_class(self.host, self.port, timeout=self.timeout)
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+class TransferResult:
+    """Outcome of one completed transfer"""
+    __slots__ = ('path', 'size', 'checksum', 'algorithm', 'duration', 'parts', 'log_id')
+
+    def __init__(self, path, size, checksum, algorithm, duration, parts, log_id=None):
+        self.path = path
+        self.size = size
+        self.checksum = checksum
+        self.algorithm = algorithm
+        self.duration = duration
+        self.parts = parts
+        self.log_id = log_id
+
+    @property
+    def throughput(self):
+        """Bytes per second"""
+        return self.size / self.duration if self.duration else 0.0
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'size': self.size,
+            'checksum': self.checksum,
+            'algorithm': self.algorithm,
+            'duration': round(self.duration, 3),
+            'throughput': round(self.throughput),
+            'parts': self.parts
+        }
+
+class _Transfer:
+    """State of one copy shared by the part workers and the coordinating thread"""
+    def __init__(self, fd, size, part_size, done):
+        self.fd = fd
+        self.size = size
+        self.parts = [
+            (start, min(start + part_size, size) - 1) for start in range(0, size, part_size)
+        ] or [(0, -1)]
+        self.done = set(done)
+        self.received = sum(self.parts[index][1] - self.parts[index][0] + 1 for index in self.done)
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.peer_ip = None
+
+class TransferEngine:
+    """Copies remote files over HTTP with parallel ranged requests.
+
+    A file larger than ``part_size`` whose server accepts ranges is split
+    into parts fetched concurrently over up to ``max_connections`` pooled
+    keep-alive connections. Each part is written with ``os.pwrite`` at its
+    offset into a preallocated ``<destination>.part`` file, so parts can
+    finish in any order without seeking or locking. Completed parts are
+    hashed in file order while later parts are still downloading; the
+    file is renamed into place only if the checksum matches. Every
+    finished or failed transfer is recorded as one Log row with its byte
+    count and duration.
+
+    With a ContentStore as ``content_store`` each copied file is added to
+    the store, hashed in the same pass as the checksum. A later copy of
+    the same URL whose size and ETag (or Last-Modified) are unchanged is
+    placed from the store without downloading it.
+    """
+    def __init__(self, engine=None, destination_root=None, part_size=DEFAULT_PART_SIZE,
+                 max_connections=DEFAULT_CONNECTIONS, timeout=DEFAULT_TIMEOUT,
+                 part_attempts=DEFAULT_PART_ATTEMPTS, retry_delay=DEFAULT_RETRY_DELAY, content_store=None):
+        self.Session = sessionmaker(bind=engine, expire_on_commit=False) if engine is not None else None
+        self.destination_root = os.path.abspath(destination_root) if destination_root else None
+        self.part_size = part_size
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.part_attempts = part_attempts
+        self.retry_delay = retry_delay
+        self.content_store = content_store
+        self.logger = logging.getLogger('transfer_engine')
+
+    def resolve_destination(self, destination):
+        """Absolute destination path, which must stay inside destination_root"""
+        if not isinstance(destination, str) or not destination:
+            raise FileValidationError('INVALID_DESTINATION', 'destination is required')
+        if self.destination_root is None:
+            return os.path.abspath(destination)
+        path = os.path.abspath(os.path.join(self.destination_root, destination))
+        if os.path.commonpath([path, self.destination_root]) != self.destination_root or path == self.destination_root:
+            raise FileValidationError('INVALID_DESTINATION', 'destination must be inside the transfer directory')
+        return path
+
+    @staticmethod
+    def _parse_url(url):
+        parts = urlsplit(url or '')
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise FileValidationError('INVALID_SOURCE_URL', 'url must be an http or https URL')
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        return parts, path
+
+    def _probe(self, pool, path):
+        """Return (size, accepts_ranges, version) from a one-byte ranged GET"""
+        with pool.connection() as conn:
+            conn.request('GET', path, headers={'Range': 'bytes=0-0'})
+            response = conn.getresponse()
+            if response.status == 200:
+                # Ranges are ignored and the whole body is coming; drop the connection
+                conn.close()
+            else:
+                response.read()
+            version = response.getheader('ETag') or response.getheader('Last-Modified')
+            if response.status == 206:
+                total = response.getheader('Content-Range', '').rpartition('/')[2]
+                if total.isdigit():
+                    return int(total), True, version
+            if response.status == 200:
+                length = response.getheader('Content-Length')
+                return (int(length) if length and length.isdigit() else None), False, version
+            if response.status == 416:
+                return 0, False, version
+            raise FileError('TRANSFER_FAILED', f'Source answered {response.status} {response.reason}')
+
+    def _fetch_part(self, pool, path, transfer, index, ranged):
+        """Download one part into place, retrying on connection errors"""
+        start, end = transfer.parts[index]
+        buffer = bytearray(READ_BUFFER_SIZE)
+        view = memoryview(buffer)
+        for attempt in range(1, self.part_attempts + 1):
+            offset = start
+            try:
+                with pool.connection() as conn:
+                    headers = {'Range': f'bytes={start}-{end}'} if ranged else {}
+                    conn.request('GET', path, headers=headers)
+                    response = conn.getresponse()
+                    if response.status != (206 if ranged else 200):
+                        response.read()
+                        raise FileError('TRANSFER_FAILED', f'Source answered {response.status} {response.reason}')
+                    if transfer.peer_ip is None and conn.sock is not None:
+                        transfer.peer_ip = conn.sock.getpeername()[0]
+                    while not transfer.stop.is_set():
+                        count = response.readinto(buffer)
+                        if not count:
+                            break
+                        os.pwrite(transfer.fd, view[:count], offset)
+                        offset += count
+                        with transfer.lock:
+                            transfer.received += count
+                    if transfer.stop.is_set():
+                        raise FileError('TRANSFER_STOPPED', 'Transfer stopped')
+                    if ranged and offset != end + 1 or not ranged and transfer.size is not None and offset != transfer.size:
+                        raise FileError('TRANSFER_FAILED', f'Part {index} ended at byte {offset}')
+                with transfer.lock:
+                    transfer.done.add(index)
+                    if not ranged:
+                        transfer.size = offset
+                return
+            except (OSError, http.client.HTTPException, FileError) as e:
+                with transfer.lock:
+                    transfer.received -= offset - start
+                if transfer.stop.is_set() or attempt == self.part_attempts:
+                    raise
+                self.logger.warning(f'Part {index} attempt {attempt} failed, retrying: {e}')
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    @staticmethod
+    def _preallocate(fd, size):
+        if size and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return
+            except OSError:
+                pass
+        os.ftruncate(fd, size)
+
+    @staticmethod
+    def _hash_range(hashers, fd, start, end):
+        offset = start
+        while offset <= end:
+            data = os.pread(fd, min(READ_BUFFER_SIZE, end + 1 - offset), offset)
+            if not data:
+                break
+            for hasher in hashers:
+                hasher.update(data)
+            offset += len(data)
+
+    def copy(self, url, destination, checksum=None, algorithm='sha256', task_id=None,
+             source_server_name=None, context=None):
+        """Copy ``url`` to ``destination`` and return a TransferResult.
+
+        ``checksum`` is the expected hex digest under ``algorithm``. With a
+        TaskContext as ``context`` the copy reports progress, checkpoints
+        the finished parts and honours pause/cancel; a resumed task only
+        fetches the parts it is missing.
+        """
+        if algorithm not in hashlib.algorithms_guaranteed:
+            raise FileValidationError('INVALID_CHECKSUM_ALGORITHM', f'Unsupported checksum algorithm {algorithm}')
+        parts, path = self._parse_url(url)
+        destination = self.resolve_destination(destination)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        pool = ConnectionPool(parts.scheme, parts.hostname, parts.port, self.max_connections, self.timeout)
+        started = time.monotonic()
+        transfer = None
+        try:
+            size, ranged, version = self._probe(pool, path)
+            cached = self._from_store(url, destination, size, version, checksum, algorithm)
+            if cached is not None:
+                pool.close()
+                duration = time.monotonic() - started
+                result = TransferResult(destination, size, *cached, duration, 0)
+                result.log_id = self._record(url, task_id, source_server_name, None, duration, None)
+                self.logger.info(f'Placed {url} at {destination} from the content store')
+                return result
+            ranged = ranged and size > self.part_size
+            state = (context.state if context is not None else None) or {}
+            resume = ranged and state.get('size') == size and os.path.exists(destination + '.part')
+            fd = os.open(destination + '.part', os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if not resume:
+                    os.ftruncate(fd, 0)
+                    if size is not None:
+                        self._preallocate(fd, size)
+                transfer = _Transfer(
+                    fd, size or 0, self.part_size if ranged else max(size or 0, 1),
+                    state.get('parts_done', []) if resume else []
+                )
+                if not ranged:
+                    transfer.size = size
+                digest, store_digest = self._run(pool, path, transfer, ranged, algorithm, context)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except Exception as e:
+            pool.close()
+            if isinstance(e, TaskPausedError):
+                raise
+            if isinstance(e, TaskCancelledError):
+                self._discard(destination)
+                raise
+            self._discard(destination)
+            message = e.message if isinstance(e, (FileError, TaskError)) else str(e)
+            self._record(url, task_id, source_server_name, transfer, time.monotonic() - started, message)
+            raise
+        pool.close()
+        duration = time.monotonic() - started
+
+        if checksum is not None and digest != checksum.lower():
+            self._discard(destination)
+            message = f'Checksum mismatch: expected {checksum}, got {digest}'
+            self._record(url, task_id, source_server_name, transfer, duration, message)
+            raise FileError('CHECKSUM_MISMATCH', message)
+        os.replace(destination + '.part', destination)
+        self._add_to_store(destination, store_digest, url, version)
+        result = TransferResult(destination, transfer.size or 0, digest, algorithm, duration, len(transfer.parts))
+        result.log_id = self._record(url, task_id, source_server_name, transfer, duration, None)
+        self.logger.info(
+            f'Copied {url} to {destination}: {result.size} bytes in {duration:.2f}s '
+            f'({result.throughput / 1024 / 1024:.1f} MiB/s, {result.parts} parts)'
+        )
+        return result
+
+    def _run(self, pool, path, transfer, ranged, algorithm, context):
+        """Fetch the missing parts in parallel, hashing finished ones in order.
+
+        Returns the ``algorithm`` digest and, with a content store, the
+        store's digest (None otherwise).
+        """
+        hasher = hashlib.new(algorithm)
+        hashers = [hasher]
+        if self.content_store is not None and algorithm != DIGEST_ALGORITHM:
+            hashers.append(new_hasher())
+        next_part = 0
+        last_checkpoint = 0.0
+        pending = [index for index in range(len(transfer.parts)) if index not in transfer.done]
+        workers = min(self.max_connections, len(pending)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transfer') as executor:
+            futures = {executor.submit(self._fetch_part, pool, path, transfer, index, ranged) for index in pending}
+            try:
+                while True:
+                    finished, futures = wait(futures, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        future.result()
+                    with transfer.lock:
+                        done = set(transfer.done)
+                    while next_part in done and ranged:
+                        start, end = transfer.parts[next_part]
+                        self._hash_range(hashers, transfer.fd, start, end)
+                        next_part += 1
+                    if context is not None and (not futures or time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL):
+                        last_checkpoint = time.monotonic()
+                        progress = transfer.received * 100 // transfer.size if transfer.size else 0
+                        context.checkpoint(
+                            progress=min(progress, 99),
+                            state={'size': transfer.size, 'parts_done': sorted(done)} if ranged else None
+                        )
+                    if not futures:
+                        break
+            except BaseException:
+                transfer.stop.set()
+                raise
+        if not ranged:
+            self._hash_range(hashers, transfer.fd, 0, (transfer.size or 0) - 1)
+        if self.content_store is None:
+            return hasher.hexdigest(), None
+        return hasher.hexdigest(), hashers[-1].hexdigest()
+
+    def _from_store(self, url, destination, size, version, checksum, algorithm):
+        """Place a stored copy of ``url`` at destination; returns (checksum, algorithm) or None.
+
+        The stored copy is only re-hashed under ``algorithm`` to verify an
+        expected ``checksum``; otherwise the store's digest is returned.
+        """
+        if self.content_store is None or size is None:
+            return None
+        digest = self.content_store.lookup(url, size, version)
+        if digest is None or self.content_store.materialize(digest, destination) is None:
+            return None
+        if checksum is None or algorithm == DIGEST_ALGORITHM:
+            found, algorithm = digest, DIGEST_ALGORITHM
+        else:
+            hasher = hashlib.new(algorithm)
+            fd = os.open(destination, os.O_RDONLY)
+            try:
+                self._hash_range([hasher], fd, 0, size - 1)
+            finally:
+                os.close(fd)
+            found = hasher.hexdigest()
+        if checksum is not None and found != checksum.lower():
+            # The stored copy is not what the caller expects; download instead
+            self.logger.warning(f'Stored copy of {url} does not match {checksum}, downloading it')
+            os.remove(destination)
+            return None
+        return found, algorithm
+
+    def _add_to_store(self, path, digest, url, version):
+        if self.content_store is None:
+            return
+        try:
+            self.content_store.add(path, digest=digest, location=url, version=version)
+        except OSError as e:
+            # The copy itself succeeded; only later copies miss the store
+            self.logger.warning(f'Could not add {path} to the content store: {e}')
+
+    @staticmethod
+    def _discard(destination):
+        try:
+            os.remove(destination + '.part')
+        except FileNotFoundError:
+            pass
+
+    def _record(self, url, task_id, source_server_name, transfer, duration, error_message):
+        """Write the transfer's Log row; returns its id"""
+        if self.Session is None:
+            return None
+        parts = urlsplit(url)
+        directory, name = posixpath.split(unquote(parts.path))
+        with self.Session() as session:
+            log = Log(
+                task_id=task_id,
+                source_server_name=source_server_name or parts.hostname,
+                source_server_ip=(transfer.peer_ip if transfer else None),
+                source_server_file_path=directory[:200] or '/',
+                source_server_file_name=name[:100],
+                task_time=datetime.utcnow(),
+                error_message=error_message[:500] if error_message else None,
+                bytes_transferred=transfer.received if transfer else 0,
+                duration_ms=int(duration * 1000)
+            )
+            session.add(log)
+            session.commit()
+            return log.id
+
+    def run_task(self, context):
+        """Task handler for ``file_copy`` tasks.
+
+        Payload: ``url``, ``destination`` and optionally ``checksum``,
+        ``algorithm`` and ``source_server_name``.
+        """
+        payload = context.payload or {}
+        try:
+            self.copy(
+                payload.get('url'), payload.get('destination'),
+                checksum=payload.get('checksum'),
+                algorithm=payload.get('algorithm', 'sha256'),
+                task_id=context.task_id,
+                source_server_name=payload.get('source_server_name'),
+                context=context
+            )
+        except FileError as e:
+            raise TaskError(e.code, e.message)
+        context.report_progress(100)
@@ -0,0 +1,207 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import hashlib
+import logging
+import mmap
+import os
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker
+from app.models import FileChecksum
+from .exceptions import FileValidationError
+
+# Files hashed at the same time; hashlib releases the GIL while hashing
+DEFAULT_VERIFY_WORKERS = 4
+# Bytes of the mapping fed to every hasher before moving on, small
+# enough to stay in the CPU cache between the hashers of one pass
+HASH_SLICE_SIZE = 1024 * 1024
+# Algorithms computed when a request names none
+DEFAULT_ALGORITHMS = ('sha256',)
+# Files accepted per verify call
+MAX_VERIFY_BATCH = 100
+# Fixed-length algorithms that can be requested; shake_* need a length
+SUPPORTED_ALGORITHMS = frozenset(
+    name for name in hashlib.algorithms_guaranteed if not name.startswith('shake_')
+)
+
+def hash_mapped(path, algorithms):
+    """Hex digests of ``path`` under every algorithm, from one pass over an mmap.
+
+    The file is mapped read-only and each slice is fed to all hashers in
+    turn, so it is read from disk once whatever the number of
+    algorithms. Returns (digests, size, mtime_ns) as of opening the file.
+    """
+    hashers = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mapped) as view:
+                    for start in range(0, stat.st_size, HASH_SLICE_SIZE):
+                        with view[start:start + HASH_SLICE_SIZE] as data:
+                            for hasher in hashers.values():
+                                hasher.update(data)
+    digests = {algorithm: hasher.hexdigest() for algorithm, hasher in hashers.items()}
+    return digests, stat.st_size, stat.st_mtime_ns
+
+def validate_algorithms(algorithms):
+    """Normalized tuple of requested algorithm names"""
+    if algorithms is None:
+        return DEFAULT_ALGORITHMS
+    if not isinstance(algorithms, (list, tuple)) or not algorithms or not all(
+        isinstance(algorithm, str) for algorithm in algorithms
+    ):
+        raise FileValidationError('INVALID_CHECKSUM_ALGORITHM', 'algorithms must be a list of names')
+    normalized = tuple(dict.fromkeys(algorithm.lower() for algorithm in algorithms))
+    unknown = [algorithm for algorithm in normalized if algorithm not in SUPPORTED_ALGORITHMS]
+    if unknown:
+        raise FileValidationError(
+            'INVALID_CHECKSUM_ALGORITHM', f'Unsupported checksum algorithm {", ".join(unknown)}'
+        )
+    return normalized
+
+class FileVerifier:
+    """Computes and checks file checksums in batches.
+
+    Files of a batch are hashed concurrently on a pool of ``workers``
+    threads with hash_mapped. Every digest is stored in the file_checksum
+    table with the file's size and mtime, and reused while both are
+    unchanged, so verifying a file again costs a stat.
+
+    A mapped file that is truncated while it is hashed kills the process
+    with SIGBUS, so ``.part`` files that are still being written are
+    refused.
+    """
+    def __init__(self, engine=None, root=None, workers=DEFAULT_VERIFY_WORKERS):
+        self.Session = sessionmaker(bind=engine, expire_on_commit=False) if engine is not None else None
+        self.root = os.path.realpath(root) if root else None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='verify')
+        self.logger = logging.getLogger('file_verifier')
+
+    def resolve(self, path):
+        """Absolute path of a file below root"""
+        if not isinstance(path, str) or not path:
+            raise FileValidationError('INVALID_FILE_PATH', 'path is required')
+        if path.endswith('.part'):
+            raise FileValidationError('INVALID_FILE_PATH', f'{path} is still being written')
+        if self.root is None:
+            return os.path.abspath(path)
+        # Resolve symlinks so a link inside root cannot lead outside it
+        resolved = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([resolved, self.root]) != self.root or resolved == self.root:
+            raise FileValidationError('INVALID_FILE_PATH', 'path must be inside the transfer directory')
+        return resolved
+
+    def _stored(self, paths, algorithms):
+        """{(path, algorithm): (size, mtime_ns, digest)} of stored checksums"""
+        if self.Session is None or not paths:
+            return {}
+        stored = {}
+        paths = list(paths)
+        with self.Session() as session:
+            for start in range(0, len(paths), MAX_VERIFY_BATCH):
+                rows = session.execute(
+                    select(FileChecksum.path, FileChecksum.algorithm, FileChecksum.size,
+                           FileChecksum.mtime_ns, FileChecksum.digest)
+                    .where(FileChecksum.path.in_(paths[start:start + MAX_VERIFY_BATCH]),
+                           FileChecksum.algorithm.in_(algorithms))
+                )
+                for path, algorithm, size, mtime_ns, digest in rows:
+                    stored[path, algorithm] = (size, mtime_ns, digest)
+        return stored
+
+    def _save(self, rows):
+        if self.Session is None or not rows:
+            return
+        table = FileChecksum.__table__
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.path, table.c.algorithm],
+            set_={
+                'size': stmt.excluded.size,
+                'mtime_ns': stmt.excluded.mtime_ns,
+                'digest': stmt.excluded.digest,
+                'verified_at': stmt.excluded.verified_at
+            }
+        )
+        with self.Session() as session:
+            session.execute(stmt, rows)
+            session.commit()
+
+    @staticmethod
+    def _checksums(path, algorithms, stored):
+        """Digests of one file, hashing only the algorithms without a current stored digest"""
+        stat = os.stat(path)
+        checksums = {}
+        for algorithm in algorithms:
+            entry = stored.get((path, algorithm))
+            if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+                checksums[algorithm] = entry[2]
+        missing = [algorithm for algorithm in algorithms if algorithm not in checksums]
+        if not missing:
+            return checksums, stat.st_size, stat.st_mtime_ns, True
+        digests, size, mtime_ns = hash_mapped(path, missing)
+        if (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            # Replaced between the stat and the open; hash everything again
+            digests, size, mtime_ns = hash_mapped(path, algorithms)
+            return digests, size, mtime_ns, False
+        checksums.update(digests)
+        return checksums, size, mtime_ns, False
+
+    def verify(self, files, algorithms=None):
+        """Checksum a batch of files and compare them with expected digests.
+
+        ``files`` is a list of dicts with an absolute ``path`` and an
+        optional ``expected`` mapping of algorithm to hex digest; expected
+        algorithms are computed along with ``algorithms``. Returns one
+        dict per file, in order, with ``checksums``, ``matches`` (None
+        without expectations), ``cached`` and ``error``.
+        """
+        algorithms = validate_algorithms(algorithms)
+        if len(files) > MAX_VERIFY_BATCH:
+            raise FileValidationError('VERIFY_BATCH_TOO_LARGE', f'At most {MAX_VERIFY_BATCH} files per batch')
+        jobs = []
+        for item in files:
+            expected = item.get('expected') or {}
+            if not isinstance(expected, dict) or not all(isinstance(value, str) for value in expected.values()):
+                raise FileValidationError('INVALID_CHECKSUM', 'expected must map algorithm names to hex digests')
+            if expected:
+                validate_algorithms(list(expected))
+                expected = {algorithm.lower(): digest for algorithm, digest in expected.items()}
+            jobs.append((item['path'], tuple(dict.fromkeys(algorithms + tuple(expected))), expected))
+
+        stored = self._stored({path for path, _, _ in jobs}, list({a for _, names, _ in jobs for a in names}))
+        futures = [
+            self.executor.submit(self._checksums, path, names, stored) for path, names, _ in jobs
+        ]
+        results = []
+        rows = []
+        now = datetime.utcnow()
+        for (path, names, expected), future in zip(jobs, futures):
+            result = {'checksums': None, 'matches': None, 'cached': False, 'error': None}
+            try:
+                checksums, size, mtime_ns, cached = future.result()
+            except FileNotFoundError:
+                result['error'] = {'code': 'FILE_NOT_FOUND', 'message': 'File not found'}
+            except OSError as e:
+                result['error'] = {'code': 'FILE_UNREADABLE', 'message': e.strerror or str(e)}
+            else:
+                result.update(size=size, checksums=checksums, cached=cached)
+                if expected:
+                    result['matches'] = all(
+                        checksums[algorithm] == digest.lower() for algorithm, digest in expected.items()
+                    )
+                if not cached:
+                    rows.extend(
+                        {'path': path, 'algorithm': algorithm, 'size': size, 'mtime_ns': mtime_ns,
+                         'digest': digest, 'verified_at': now}
+                        for algorithm, digest in checksums.items()
+                    )
+            results.append(result)
+        self._save(rows)
+        return results
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
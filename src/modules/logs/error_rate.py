@@ -0,0 +1,63 @@
+from collections import deque
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+class RateWindow:
+    """Events of one type seen in the last ``seconds``, alerting at ``threshold``"""
+    __slots__ = ('seconds', 'threshold', 'times')
+
+    def __init__(self, seconds: float, threshold: int):
+        self.seconds = seconds
+        self.threshold = threshold
+        self.times = deque()
+
+    def record(self, now: float) -> bool:
+        """Add an event at ``now``; True when it takes the count up to the threshold"""
+        cutoff = now - self.seconds
+        times = self.times
+        while times and times[0] <= cutoff:
+            times.popleft()
+        was_below = len(times) < self.threshold
+        times.append(now)
+        return was_below and len(times) >= self.threshold
+
+class ErrorRateDetector:
+    """Sliding-window event counters updated as events are logged.
+
+    ``windows`` maps an event type to ``(seconds, threshold)`` pairs. Each
+    pair keeps a deque of event times, so recording an event costs O(1)
+    amortized per window. A window alerts once when its count reaches the
+    threshold and again only after the count has dropped below it.
+    """
+    def __init__(self, windows: Dict[str, List[Tuple[float, int]]], clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._windows = {
+            event_type: [RateWindow(seconds, threshold) for seconds, threshold in pairs]
+            for event_type, pairs in windows.items()
+        }
+
+    def record(self, event_type: str) -> List[Tuple[int, float]]:
+        """Count one event; returns ``(count, seconds)`` for each window that crossed its threshold"""
+        windows = self._windows.get(event_type)
+        if not windows:
+            return []
+        with self._lock:
+            now = self.clock()
+            return [(len(window.times), window.seconds) for window in windows if window.record(now)]
+
+    def counts(self, event_type: str) -> Dict[float, int]:
+        """Events of ``event_type`` currently inside each window"""
+        with self._lock:
+            now = self.clock()
+            return {
+                window.seconds: sum(1 for t in window.times if t > now - window.seconds)
+                for window in self._windows.get(event_type, [])
+            }
+
+    def reset(self):
+        with self._lock:
+            for windows in self._windows.values():
+                for window in windows:
+                    window.times.clear()
@@ -1,22 +1,72 @@
 import logging
-from datetime import datetime
-import json
-from typing import List, Dict, Callable
-import threading
+import smtplib
+from email.message import EmailMessage
+from typing import List, Dict, Callable, Tuple, Union
+from src.modules.settings.settings_manager import SMTPConfig, get_settings_manager
+from .error_rate import ErrorRateDetector
+from .log_store import DEFAULT_CAPACITY, LogStore
+from .notifications import NotificationDispatcher
 
 class NotificationHandler:
     """Base class for notification handlers"""
     def send(self, message: str):
         raise NotImplementedError()
 
+    def send_batch(self, messages: List[str]):
+        """Deliver several messages; the default sends them as one digest"""
+        if len(messages) == 1:
+            self.send(messages[0])
+        else:
+            self.send(_digest(messages))
+
+def _digest(messages: List[str]) -> str:
+    return f"{len(messages)} notifications:\n" + "\n".join(f"- {message}" for message in messages)
+
+def current_smtp_config() -> SMTPConfig:
+    """SMTP settings currently held by the shared SettingsManager"""
+    return get_settings_manager().smtp_config
+
 class EmailNotificationHandler(NotificationHandler):
-    """Email notification handler"""
-    def __init__(self, email: str):
-        self.email = email
-        
+    """Email notification handler sending through SMTP.
+
+    ``smtp_config`` may be an SMTPConfig or a callable returning one. It
+    defaults to current_smtp_config, which is read on every delivery so
+    SMTP settings changes apply without rebuilding the handler.
+    """
+    def __init__(self, email: Union[str, List[str]], smtp_config=None, timeout: float = 10):
+        self.recipients = [email] if isinstance(email, str) else list(email)
+        self.smtp_config = smtp_config or current_smtp_config
+        self.timeout = timeout
+
+    @property
+    def email(self):
+        return ', '.join(self.recipients)
+
+    def _config(self) -> SMTPConfig:
+        return self.smtp_config() if callable(self.smtp_config) else self.smtp_config
+
     def send(self, message: str):
-        # Implement email sending logic
-        print(f"Sending email to {self.email}: {message}")
+        self._deliver('System notification', message)
+
+    def send_batch(self, messages: List[str]):
+        if len(messages) == 1:
+            self.send(messages[0])
+        else:
+            self._deliver(f'{len(messages)} system notifications', _digest(messages))
+
+    def _deliver(self, subject: str, body: str):
+        config = self._config()
+        email = EmailMessage()
+        email['Subject'] = subject
+        email['From'] = config.from_email
+        email['To'] = self.email
+        email.set_content(body)
+        with smtplib.SMTP(config.host, config.port, timeout=self.timeout) as smtp:
+            if config.use_tls:
+                smtp.starttls()
+            if config.username:
+                smtp.login(config.username, config.password)
+            smtp.send_message(email)
 
 class LogError(Exception):
     """Base class for log-related errors"""
@@ -30,81 +80,80 @@ class LogNotFoundError(LogError):
     def __init__(self, log_id):
         super().__init__('LOG_NOT_FOUND', f'Log {log_id} not found')
 
+# Default alert: 5 errors within 60 seconds
+DEFAULT_ERROR_WINDOWS = {'error': [(60, 5)]}
+
 class LogManager:
-    def __init__(self):
+    """In-memory event log with error-rate alerts.
+
+    Keeps at most ``capacity`` entries; older ones are passed to ``sink``
+    (e.g. FileLogSink or LogTableSink) as they are evicted.
+    """
+    def __init__(self, error_windows: Dict[str, List[Tuple[float, int]]] = None,
+                 capacity: int = DEFAULT_CAPACITY, sink: Callable = None):
         self.logger = logging.getLogger('log_manager')
-        self.logs = []
+        self.store = LogStore(capacity=capacity, sink=sink)
         self.notification_handlers: List[NotificationHandler] = []
-        self.monitoring_thread = None
+        self.dispatcher = NotificationDispatcher()
         self.monitoring_active = False
-        self.error_threshold = 5  # Number of errors before notification
-        self.error_window = 60  # Seconds to track errors
+        self.configure_error_windows(error_windows or DEFAULT_ERROR_WINDOWS)
+
+    def configure_error_windows(self, error_windows: Dict[str, List[Tuple[float, int]]]):
+        """Set the (seconds, threshold) alert windows per event type, e.g. {'error': [(60, 5), (3600, 50)]}"""
+        self.error_windows = error_windows
+        self.error_rate = ErrorRateDetector(error_windows)
         
-    def add_notification_handler(self, handler: NotificationHandler):
-        """Add a notification handler"""
+    def add_notification_handler(self, handler: NotificationHandler, **options):
+        """Add a notification handler.
+
+        ``options`` set its batching, rate limit and retries; see
+        NotificationDispatcher.add_handler.
+        """
         self.notification_handlers.append(handler)
+        self.dispatcher.add_handler(handler, **options)
         
     def start_monitoring(self):
         """Start real-time log monitoring"""
-        if self.monitoring_thread is not None:
+        if self.monitoring_active:
             return
-            
+        self.error_rate.reset()
         self.monitoring_active = True
-        self.monitoring_thread = threading.Thread(target=self._monitor_logs)
-        self.monitoring_thread.daemon = True
-        self.monitoring_thread.start()
         
     def stop_monitoring(self):
         """Stop real-time log monitoring"""
         self.monitoring_active = False
-        if self.monitoring_thread:
-            self.monitoring_thread.join()
-            self.monitoring_thread = None
             
-    def _monitor_logs(self):
-        """Internal method for monitoring logs"""
-        error_count = 0
-        last_error_time = datetime.now()
-        
-        while self.monitoring_active:
-            recent_errors = [
-                log for log in self.logs
-                if log['event_type'] == 'error' and 
-                (datetime.now() - datetime.fromisoformat(log['timestamp'])).total_seconds() < self.error_window
-            ]
-            
-            if len(recent_errors) >= self.error_threshold:
-                if error_count < self.error_threshold:
-                    self._notify_admins(
-                        f"High error rate detected: {len(recent_errors)} errors in last {self.error_window} seconds"
-                    )
-                error_count = len(recent_errors)
-            else:
-                error_count = 0
-                
-            threading.Event().wait(10)  # Check every 10 seconds
+    def _check_error_rate(self, event_type):
+        """Count the event and alert on every window whose threshold it reaches"""
+        for count, seconds in self.error_rate.record(event_type):
+            self._notify_admins(
+                f"High {event_type} rate detected: {count} {event_type} events in last {seconds:g} seconds"
+            )
             
     def _notify_admins(self, message: str):
-        """Notify all registered notification handlers"""
-        for handler in self.notification_handlers:
-            try:
-                handler.send(message)
-            except Exception as e:
-                self.logger.error(f"Failed to send notification: {str(e)}")
+        """Queue a message for all registered notification handlers"""
+        if self.notification_handlers:
+            self.dispatcher.submit(message)
+
+    def flush_notifications(self, timeout: float = 10.0) -> bool:
+        """Deliver queued notifications now; False if they did not drain in time"""
+        return self.dispatcher.flush(timeout)
         
+    @property
+    def logs(self):
+        """All stored entries as dicts, oldest first"""
+        return [record.to_dict() for record in self.store.find()]
+
     def log_event(self, event_type, message, metadata=None):
-        log_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'event_type': event_type,
-            'message': message,
-            'metadata': metadata or {}
-        }
-        self.logs.append(log_entry)
-        self.logger.info(json.dumps(log_entry))
+        record = self.store.append(event_type, message, metadata or {})
+        # Encoded by the logging pipeline's JSON formatter, off this thread
+        self.logger.info(message, extra={'event_type': event_type, 'metadata': record.metadata})
         
         # Check if this is an error and notify if needed
-        if event_type == 'error' and self.monitoring_active:
-            self._notify_admins(f"Error logged: {message}")
+        if self.monitoring_active:
+            if event_type == 'error':
+                self._notify_admins(f"Error logged: {message}")
+            self._check_error_rate(event_type)
             
         return True
 
@@ -113,15 +162,16 @@ class LogManager:
             return self.logs
             
         try:
-            filtered_logs = [log for log in self.logs 
-                          if all(log.get(k) == v for k, v in filter_params.items())]
+            filtered_logs = [record.to_dict() for record in self.store.find(filter_params)]
             if not filtered_logs:
                 raise LogNotFoundError('filtered')
             return filtered_logs
+        except LogNotFoundError:
+            raise
         except Exception as e:
             self.logger.error(f'Error filtering logs: {str(e)}')
             raise LogError('LOG_FILTER_ERROR', f'Error filtering logs: {str(e)}')
 
     def clear_logs(self):
-        self.logs = []
+        self.store.clear()
         return True
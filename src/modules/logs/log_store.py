@@ -0,0 +1,195 @@
+from collections import deque
+from datetime import datetime
+import json
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import insert
+from app import rollups
+from app.cache import cache
+from app.models import Log
+
+# Entries kept in memory before the oldest are evicted
+DEFAULT_CAPACITY = 100000
+# Evicted entries handed to the sink per write
+DEFAULT_SPILL_BATCH = 500
+# Filter keys that address the entry itself rather than its metadata
+RECORD_FIELDS = ('timestamp', 'event_type', 'message', 'metadata')
+
+logger = logging.getLogger(__name__)
+
+class LogRecord:
+    """One log entry; slots keep per-entry overhead well below a dict"""
+    __slots__ = ('timestamp', 'event_type', 'message', 'metadata', 'index_keys')
+
+    def __init__(self, timestamp: datetime, event_type: str, message: str, metadata: dict):
+        self.timestamp = timestamp
+        self.event_type = event_type
+        self.message = message
+        self.metadata = metadata
+        # Hashable (key, value) metadata pairs this record is indexed under
+        self.index_keys = [
+            (key, value) for key, value in metadata.items() if _is_hashable(value)
+        ]
+
+    def to_dict(self) -> dict:
+        return {
+            'timestamp': self.timestamp.isoformat(),
+            'event_type': self.event_type,
+            'message': self.message,
+            'metadata': self.metadata
+        }
+
+    def matches(self, key, value) -> bool:
+        if key == 'timestamp':
+            return self.timestamp.isoformat() == value
+        if key in RECORD_FIELDS:
+            return getattr(self, key) == value
+        return key in self.metadata and self.metadata[key] == value
+
+def _is_hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+class FileLogSink:
+    """Append evicted entries to a file as JSON lines"""
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, records: List[LogRecord]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record.to_dict(), default=str) + '\n')
+
+class LogTableSink:
+    """Write evicted entries to the ``log`` table.
+
+    Metadata keys named like Log columns fill those columns and the
+    message of an error entry becomes its error_message. Like the ingest
+    queue, it updates log_daily_stat in the same transaction and
+    invalidates the cached log responses.
+    """
+    COLUMNS = ('task_id', 'source_server_name', 'source_server_ip',
+               'source_server_file_path', 'source_server_file_name')
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __call__(self, records: List[LogRecord]):
+        rows = []
+        for record in records:
+            row = {column: record.metadata.get(column) for column in self.COLUMNS}
+            row['task_time'] = record.timestamp
+            row['error_message'] = record.message[:500] if record.event_type == 'error' else None
+            rows.append(row)
+        with self.engine.begin() as connection:
+            connection.execute(insert(Log.__table__), rows)
+            rollups.apply_log_deltas(connection, rollups.log_deltas(rows))
+        cache.invalidate_models(Log)
+
+class LogStore:
+    """Bounded ring buffer of LogRecords with secondary indexes.
+
+    Records are indexed by event_type and by every hashable metadata
+    (key, value) pair. Because the oldest record is always evicted first,
+    it is also at the front of each index deque it is in, so eviction and
+    index upkeep are O(1) per key. Filtered lookups start from the
+    smallest matching index and only check the other conditions on it.
+
+    Evicted records are collected and passed to ``sink`` in batches of
+    ``spill_batch``; without a sink they are dropped, and a batch the
+    sink fails to write is logged and dropped.
+    """
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, sink: Optional[Callable[[List[LogRecord]], None]] = None,
+                 spill_batch: int = DEFAULT_SPILL_BATCH):
+        self.capacity = capacity
+        self.sink = sink
+        self.spill_batch = spill_batch
+        self._records = deque()
+        self._by_type: Dict[str, deque] = {}
+        self._by_metadata: Dict[tuple, deque] = {}
+        self._evicted: List[LogRecord] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def append(self, event_type: str, message: str, metadata: dict, timestamp: datetime = None) -> LogRecord:
+        record = LogRecord(timestamp or datetime.now(), event_type, message, metadata)
+        with self._lock:
+            self._records.append(record)
+            self._by_type.setdefault(event_type, deque()).append(record)
+            for pair in record.index_keys:
+                self._by_metadata.setdefault(pair, deque()).append(record)
+            while len(self._records) > self.capacity:
+                self._evict()
+            spill = len(self._evicted) >= self.spill_batch
+        if spill:
+            self.flush()
+        return record
+
+    def _evict(self):
+        record = self._records.popleft()
+        self._pop_index(self._by_type, record.event_type)
+        for pair in record.index_keys:
+            self._pop_index(self._by_metadata, pair)
+        if self.sink is not None:
+            self._evicted.append(record)
+
+    @staticmethod
+    def _pop_index(index, key):
+        entries = index[key]
+        entries.popleft()
+        if not entries:
+            del index[key]
+
+    def flush(self):
+        """Hand pending evicted records to the sink"""
+        with self._lock:
+            evicted, self._evicted = self._evicted, []
+        if not evicted:
+            return
+        try:
+            self.sink(evicted)
+        except Exception as e:
+            # Never fail the caller's log_event; retrying a batch the sink
+            # rejected (e.g. a bad task_id) would only grow the backlog
+            logger.error(f'Log sink dropped {len(evicted)} evicted entries: {e}')
+
+    def _candidates(self, filter_params: dict) -> Iterable[LogRecord]:
+        """Smallest indexed record set that can satisfy ``filter_params``"""
+        candidates = self._records
+        for key, value in filter_params.items():
+            if key == 'event_type':
+                entries = self._by_type.get(value, ())
+            elif key not in RECORD_FIELDS and _is_hashable(value):
+                entries = self._by_metadata.get((key, value), ())
+            else:
+                continue
+            if len(entries) < len(candidates):
+                candidates = entries
+        return candidates
+
+    def find(self, filter_params: dict = None) -> List[LogRecord]:
+        """Records matching every filter key, oldest first.
+
+        ``event_type``, ``message``, ``timestamp`` and ``metadata`` compare
+        the record fields; any other key compares that metadata entry.
+        """
+        with self._lock:
+            if not filter_params:
+                return list(self._records)
+            return [
+                record for record in self._candidates(filter_params)
+                if all(record.matches(key, value) for key, value in filter_params.items())
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._by_type.clear()
+            self._by_metadata.clear()
+            self._evicted = []
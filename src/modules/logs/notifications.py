@@ -0,0 +1,200 @@
+from collections import deque
+import logging
+import threading
+import time
+from typing import Dict, List
+
+# Seconds messages are collected before a handler receives them as one batch
+DEFAULT_BATCH_WINDOW = 30.0
+# Most messages coalesced into one batch
+DEFAULT_MAX_BATCH = 100
+# Batches a handler may send per minute (None for no limit); extra messages
+# wait and coalesce
+DEFAULT_MAX_PER_MINUTE = 6
+# Attempts per batch before it is dropped, and the first retry delay
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 5.0
+# Messages waiting per handler before the oldest are dropped
+DEFAULT_MAX_PENDING = 10000
+
+class _HandlerQueue:
+    """Pending messages and send budget of one notification handler"""
+    def __init__(self, handler, batch_window, max_batch, max_per_minute, max_attempts, retry_delay, max_pending):
+        self.handler = handler
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.pending = deque(maxlen=max_pending)
+        self.first_pending_at = None
+        self.retry_batch = None
+        self.attempts = 0
+        self.retry_at = 0.0
+        # Token bucket refilled at max_per_minute / 60 tokens per second
+        self.rate = max_per_minute / 60.0 if max_per_minute else None
+        self.capacity = max(1, max_per_minute or 1)
+        self.tokens = float(self.capacity)
+        self.refilled_at = time.monotonic()
+        self.dropped = 0
+
+    def add(self, message, now):
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        if not self.pending:
+            self.first_pending_at = now
+        self.pending.append(message)
+
+    def due_at(self, now, force=False):
+        """Monotonic time the next batch may be sent, or None if nothing is pending"""
+        if self.retry_batch is not None:
+            ready = self.retry_at
+        elif self.pending:
+            ready = self.first_pending_at + self.batch_window
+            if len(self.pending) >= self.max_batch:
+                ready = now
+        else:
+            return None
+        if force:
+            return now
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.refilled_at) * self.rate)
+            self.refilled_at = now
+            if self.tokens < 1:
+                ready = max(ready, now + (1 - self.tokens) / self.rate)
+        return ready
+
+    def take_batch(self, now):
+        if self.rate is not None:
+            self.tokens = max(0.0, self.tokens - 1)
+        if self.retry_batch is not None:
+            return self.retry_batch
+        batch = [self.pending.popleft() for _ in range(min(self.max_batch, len(self.pending)))]
+        self.first_pending_at = now if self.pending else None
+        return batch
+
+class NotificationDispatcher:
+    """Background delivery of notifications to handlers.
+
+    ``submit`` only appends to in-memory queues, so callers never wait on a
+    handler. A worker thread gives each handler the messages collected over
+    its ``batch_window`` as one ``send_batch`` call, at most
+    ``max_per_minute`` times a minute; messages held back by the limit join
+    the next batch. Failed batches are retried with exponential backoff up
+    to ``max_attempts`` times.
+    """
+    def __init__(self):
+        self._queues: List[_HandlerQueue] = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._force = False
+        self._sending = 0
+        self.logger = logging.getLogger('notification_dispatcher')
+
+    def add_handler(self, handler, batch_window=DEFAULT_BATCH_WINDOW, max_batch=DEFAULT_MAX_BATCH,
+                    max_per_minute=DEFAULT_MAX_PER_MINUTE, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                    retry_delay=DEFAULT_RETRY_DELAY, max_pending=DEFAULT_MAX_PENDING):
+        with self._condition:
+            self._queues.append(_HandlerQueue(
+                handler, batch_window, max_batch, max_per_minute, max_attempts, retry_delay, max_pending
+            ))
+
+    def submit(self, message: str):
+        """Queue ``message`` for every handler; never blocks on delivery"""
+        with self._condition:
+            now = time.monotonic()
+            for queue in self._queues:
+                queue.add(message, now)
+            self._condition.notify()
+        self._ensure_started()
+
+    def _ensure_started(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        """Wait for the next due batch; returns (queue, batch) or None when stopped"""
+        with self._condition:
+            while True:
+                if not self._running:
+                    return None
+                now = time.monotonic()
+                due = [(queue.due_at(now, self._force), index) for index, queue in enumerate(self._queues)]
+                due = [(at, index) for at, index in due if at is not None]
+                if not due:
+                    self._force = False
+                    self._condition.notify_all()
+                    self._condition.wait()
+                    continue
+                at, index = min(due)
+                if at <= now:
+                    queue = self._queues[index]
+                    self._sending += 1
+                    return queue, queue.take_batch(now)
+                self._condition.wait(at - now)
+
+    def _run(self):
+        while True:
+            item = self._next_batch()
+            if item is None:
+                return
+            queue, batch = item
+            try:
+                queue.handler.send_batch(batch)
+                failed = None
+            except Exception as e:
+                failed = e
+            with self._condition:
+                self._sending -= 1
+                if failed is None:
+                    queue.retry_batch = None
+                    queue.attempts = 0
+                else:
+                    queue.attempts += 1
+                    if queue.attempts < queue.max_attempts:
+                        queue.retry_batch = batch
+                        queue.retry_at = time.monotonic() + queue.retry_delay * 2 ** (queue.attempts - 1)
+                        self.logger.warning(f"Notification batch failed, retrying: {failed}")
+                    else:
+                        queue.retry_batch = None
+                        queue.attempts = 0
+                        self.logger.error(f"Dropped {len(batch)} notifications after retries: {failed}")
+                self._condition.notify_all()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Send everything pending now, ignoring windows and rate limits.
+
+        Returns False if the queues did not drain within ``timeout``.
+        """
+        deadline = time.monotonic() + timeout
+        self._ensure_started()
+        with self._condition:
+            self._force = True
+            self._condition.notify_all()
+            while self._sending or any(queue.pending or queue.retry_batch for queue in self._queues):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._force = True
+                self._condition.wait(remaining)
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                'pending': sum(len(queue.pending) for queue in self._queues),
+                'dropped': sum(queue.dropped for queue in self._queues)
+            }
+
+    def stop(self):
+        with self._condition:
+            thread = self._thread
+            self._running = False
+            self._thread = None
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout=5)
@@ -1,6 +1,7 @@
 import json
 import os
 import logging
+import threading
 from typing import Dict, Optional
 from pydantic import BaseModel, validator, Field
 
@@ -109,3 +110,14 @@ class SettingsManager:
         except Exception as e:
             self.logger.error(f"Settings validation failed: {str(e)}")
             raise SettingsError('VALIDATION_FAILED', f'Settings validation failed: {str(e)}')
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_settings_manager() -> SettingsManager:
+    """Process-wide SettingsManager, loaded on first use"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SettingsManager()
+        return _shared
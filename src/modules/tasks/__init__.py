@@ -1,3 +1,4 @@
 from .task_manager import TaskManager
+from .context import TaskContext
 
-__all__ = ['TaskManager']
+__all__ = ['TaskManager', 'TaskContext']
@@ -0,0 +1,204 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+import logging
+import threading
+from .context import TaskControl
+from .exceptions import TaskError, TaskCancelledError, TaskPausedError
+
+# Coroutine tasks allowed to run at once across all hosts
+DEFAULT_MAX_CONCURRENCY = 1000
+# Concurrent tasks per remote host unless overridden in ``host_limits``
+DEFAULT_HOST_LIMIT = 8
+
+class AsyncTaskControl(TaskControl):
+    """TaskControl that also wakes coroutines waiting on the event loop"""
+    def __init__(self, loop):
+        super().__init__()
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def request_cancel(self):
+        super().request_cancel()
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    def request_pause(self):
+        super().request_pause()
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    def clear_pause(self):
+        super().clear_pause()
+        if not self.cancel_requested:
+            self.loop.call_soon_threadsafe(self.event.clear)
+
+class AsyncTaskContext:
+    """Coroutine-friendly view of a TaskContext.
+
+    Progress and checkpoint writes run in the loop's thread pool so a slow
+    database never blocks other transfers; ``wait`` sleeps on the loop and
+    wakes as soon as the task is paused or cancelled.
+    """
+    def __init__(self, context):
+        self._context = context
+        self.task_id = context.task_id
+        self.payload = context.payload
+        self.control = context.control
+
+    @property
+    def state(self):
+        return self._context.state
+
+    @property
+    def progress(self):
+        return self._context.progress
+
+    @property
+    def cancelled(self):
+        return self.control.cancel_requested
+
+    async def report_progress(self, progress):
+        await asyncio.to_thread(self._context.report_progress, progress)
+
+    async def checkpoint(self, progress=None, state=None):
+        await asyncio.to_thread(self._context.checkpoint, progress, state)
+
+    async def set_result(self, result):
+        await asyncio.to_thread(self._context.set_result, result)
+
+    async def check(self):
+        if self.control.cancel_requested or self.control.pause_requested:
+            await asyncio.to_thread(self._context.check)
+
+    async def wait(self, seconds):
+        """Sleep for ``seconds``, waking early to honour pause/cancel"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+        while True:
+            await self.check()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self.control.event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+async def run_async_handler(handler, context):
+    """Await a coroutine handler; returns the same outcome tuple as run_handler"""
+    try:
+        await handler(context)
+        return 'completed', None, None
+    except (TaskCancelledError, TaskPausedError):
+        return 'stopped', None, None
+    except TaskError as e:
+        return 'failed', e.code, e.message
+    except Exception as e:
+        return 'failed', 'TASK_UNKNOWN_ERROR', str(e)
+
+class AsyncTaskRunner:
+    """Event loop on a background thread for I/O-bound coroutine tasks.
+
+    ``max_concurrency`` caps running coroutines overall and ``host_limit``
+    (or ``host_limits[host]``) caps those talking to one remote host.
+    ``submit`` may be called from any thread; the loop starts on first use.
+    """
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, host_limit=DEFAULT_HOST_LIMIT, host_limits=None):
+        self.max_concurrency = max_concurrency
+        self.host_limit = host_limit
+        self.host_limits = host_limits or {}
+        self.loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._semaphore = None
+        self._host_semaphores = {}
+        self._waiting = 0
+        self._running = 0
+        self._host_running = defaultdict(int)
+        self.logger = logging.getLogger('task_async_runner')
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self.loop is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._thread = threading.Thread(target=self.loop.run_forever, name='task-async-loop', daemon=True)
+            self._thread.start()
+
+    def control(self):
+        """Create the control token of a task about to run on the loop"""
+        self._ensure_started()
+        return AsyncTaskControl(self.loop)
+
+    def submit(self, coroutine):
+        """Schedule ``coroutine`` on the loop; returns a concurrent.futures.Future"""
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def _log_failure(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.error(f'Async task runner job failed: {future.exception()}')
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the ``max_concurrency`` slots"""
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._running += 1
+        try:
+            yield
+        finally:
+            self._running -= 1
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def host_slot(self, host):
+        """Hold a connection slot for ``host``; a no-op when host is None"""
+        if host is None:
+            yield
+            return
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(
+                self.host_limits.get(host, self.host_limit)
+            )
+        async with semaphore:
+            self._host_running[host] += 1
+            try:
+                yield
+            finally:
+                self._host_running[host] -= 1
+
+    def metrics(self):
+        return {
+            'max_concurrency': self.max_concurrency,
+            'running': self._running,
+            'waiting': self._waiting,
+            'hosts': {host: count for host, count in self._host_running.items() if count}
+        }
+
+    async def _cancel_pending(self):
+        current = asyncio.current_task()
+        pending = [task for task in asyncio.all_tasks() if task is not current]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def shutdown(self, wait=True):
+        """Cancel running coroutines and stop the loop"""
+        with self._start_lock:
+            if self.loop is None:
+                return
+            future = asyncio.run_coroutine_threadsafe(self._cancel_pending(), self.loop)
+            if wait:
+                future.result(timeout=10)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=10)
+            if not self.loop.is_running():
+                self.loop.close()
+            self.loop = None
@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from .exceptions import TaskError, TaskCancelledError, TaskPausedError
+
+# Minimum seconds between persisted progress updates of one task
+PROGRESS_INTERVAL = 0.5
+
+class TaskControl:
+    """Cooperative pause/cancel token shared by the manager and a running task"""
+    def __init__(self):
+        self.cancel_requested = False
+        self.pause_requested = False
+        self.stopped = False
+        self.wakeup = threading.Event()
+
+    def request_cancel(self):
+        self.cancel_requested = True
+        self.wakeup.set()
+
+    def request_pause(self):
+        self.pause_requested = True
+        self.wakeup.set()
+
+    def clear_pause(self):
+        self.pause_requested = False
+        if not self.cancel_requested:
+            self.wakeup.clear()
+
+    def resume_in_place(self):
+        """Clear a pause the task has not reached yet; False once it stopped"""
+        if self.stopped:
+            return False
+        self.clear_pause()
+        return True
+
+class TaskContext:
+    """Handle passed to task handlers while they run.
+
+    Long-running handlers should call ``checkpoint`` (or ``check``) between
+    units of work and use ``wait`` instead of ``time.sleep``; both raise
+    TaskPausedError or TaskCancelledError when the task was paused or
+    cancelled, which ends the handler and frees its worker slot. A resumed
+    task is run again with ``state`` set to its last checkpoint.
+    """
+    def __init__(self, manager, task_id, payload, control=None, state=None, progress=0):
+        self.manager = manager
+        self.task_id = task_id
+        self.payload = payload
+        self.control = control or TaskControl()
+        self.state = state
+        self.progress = progress
+        self._last_progress_write = 0.0
+
+    @property
+    def cancelled(self):
+        return self.control.cancel_requested
+
+    def report_progress(self, progress):
+        """Record progress (0-100); writes are throttled to PROGRESS_INTERVAL"""
+        self.progress = max(0, min(100, int(progress)))
+        self.manager._set_runtime(self.task_id, progress=self.progress)
+        now = time.monotonic()
+        if self.progress == 100 or now - self._last_progress_write >= PROGRESS_INTERVAL:
+            self._last_progress_write = now
+            self.manager._persist(self.task_id, progress=self.progress)
+
+    def checkpoint(self, progress=None, state=None):
+        """Persist progress and resumable state, then honour pause/cancel"""
+        if progress is not None:
+            self.progress = max(0, min(100, int(progress)))
+            self.manager._set_runtime(self.task_id, progress=self.progress)
+        if state is not None:
+            self.state = state
+        self.manager._persist(
+            self.task_id,
+            progress=self.progress,
+            checkpoint=json.dumps(self.state) if self.state is not None else None
+        )
+        self._last_progress_write = time.monotonic()
+        self.check()
+
+    def set_result(self, result):
+        """Store a JSON-serializable summary of the run, served as the task's result"""
+        self.manager._persist(self.task_id, result=json.dumps(result))
+
+    def check(self):
+        """Raise if the task has been cancelled or paused"""
+        with self.manager._lock:
+            if self.control.cancel_requested:
+                self.control.stopped = True
+                raise TaskCancelledError(self.task_id)
+            if not self.control.pause_requested:
+                return
+            self.control.stopped = True
+        self.manager._persist(self.task_id, progress=self.progress)
+        raise TaskPausedError(self.task_id)
+
+    def wait(self, seconds):
+        """Sleep for ``seconds``, waking early to honour pause/cancel"""
+        deadline = time.monotonic() + seconds
+        while True:
+            self.check()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self.control.wakeup.wait(remaining)
+
+def run_handler(handler, context):
+    """Run a handler and describe how it ended.
+
+    Returns ``(outcome, error_code, error_message)`` where outcome is
+    'completed', 'stopped' (paused or cancelled at a checkpoint) or 'failed'.
+    """
+    try:
+        handler(context)
+        return 'completed', None, None
+    except (TaskCancelledError, TaskPausedError):
+        return 'stopped', None, None
+    except TaskError as e:
+        return 'failed', e.code, e.message
+    except Exception as e:
+        return 'failed', 'TASK_UNKNOWN_ERROR', str(e)
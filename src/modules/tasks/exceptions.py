@@ -19,3 +19,13 @@ class TaskAlreadyRunningError(TaskError):
     """Raised when trying to start an already running task"""
     def __init__(self, task_id):
         super().__init__('TASK_ALREADY_RUNNING', f'Task {task_id} is already running')
+
+class TaskCancelledError(TaskError):
+    """Raised inside a task body when the task has been cancelled"""
+    def __init__(self, task_id):
+        super().__init__('TASK_CANCELLED', f'Task {task_id} was cancelled')
+
+class TaskPausedError(TaskError):
+    """Raised inside a task body when the task has been paused"""
+    def __init__(self, task_id):
+        super().__init__('TASK_PAUSED', f'Task {task_id} was paused')
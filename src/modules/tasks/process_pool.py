@@ -0,0 +1,253 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from sqlalchemy import update
+from app.models import Task
+from .context import TaskContext, run_handler
+
+# Tasks a worker process runs before it is replaced, bounding its memory
+DEFAULT_MAX_TASKS_PER_PROCESS = 100
+# Seconds between pause/cancel checks while a process task waits
+POLL_INTERVAL = 0.1
+# ProcessPoolExecutor's max_tasks_per_child is new in Python 3.11; older
+# versions replace the whole pool instead (see ProcessTaskRunner)
+NATIVE_MAX_TASKS_PER_CHILD = sys.version_info >= (3, 11)
+
+# Everything a worker process needs to run one task; all fields are picklable
+TaskSpec = namedtuple('TaskSpec', [
+    'task_id', 'handler', 'payload', 'state', 'progress',
+    'control', 'database_uri', 'updates', 'lock'
+])
+
+class _PollingWakeup:
+    """Stand-in for TaskControl.wakeup that sleeps in short slices"""
+    def wait(self, timeout):
+        time.sleep(min(timeout, POLL_INTERVAL))
+
+class SharedTaskControl:
+    """Pause/cancel token readable from a worker process.
+
+    The flags live in a multiprocessing manager dict keyed by task id and
+    are only changed while holding the manager lock, which a worker process
+    also takes in TaskContext.check.
+    """
+    wakeup = _PollingWakeup()
+
+    def __init__(self, flags, lock, task_id):
+        self.flags = flags
+        self.lock = lock
+        self.task_id = task_id
+
+    def _get(self, name):
+        return self.flags.get(self.task_id, {}).get(name, False)
+
+    def _set(self, **values):
+        flags = self.flags.get(self.task_id, {})
+        flags.update(values)
+        self.flags[self.task_id] = flags
+
+    @property
+    def cancel_requested(self):
+        return self._get('cancel')
+
+    @property
+    def pause_requested(self):
+        return self._get('pause')
+
+    @property
+    def stopped(self):
+        return self._get('stopped')
+
+    @stopped.setter
+    def stopped(self, value):
+        # Only set from TaskContext.check, which already holds the lock
+        self._set(stopped=value)
+
+    def request_cancel(self):
+        with self.lock:
+            self._set(cancel=True)
+
+    def request_pause(self):
+        with self.lock:
+            self._set(pause=True)
+
+    def clear_pause(self):
+        with self.lock:
+            self._set(pause=False)
+
+    def resume_in_place(self):
+        with self.lock:
+            if self._get('stopped'):
+                return False
+            self._set(pause=False)
+            return True
+
+class _WorkerBridge:
+    """Manager-side calls of TaskContext as seen from a worker process.
+
+    Progress goes back to the parent through the updates queue; progress
+    and checkpoints are also written straight to the task row so a pause
+    never loses state that is still in flight.
+    """
+    def __init__(self, engine, updates, lock):
+        self.engine = engine
+        self.updates = updates
+        self._lock = lock
+
+    def _set_runtime(self, task_id, **state):
+        self.updates.put((task_id, state))
+
+    def _persist(self, task_id, **fields):
+        with self.engine.begin() as connection:
+            connection.execute(update(Task).where(Task.id == task_id).values(
+                updated_at=datetime.utcnow(), **fields
+            ))
+
+_worker_engines = {}
+
+def _worker_engine(database_uri):
+    """One engine per database for the lifetime of a worker process"""
+    if database_uri not in _worker_engines:
+        from .task_manager import TaskManager
+        _worker_engines[database_uri] = TaskManager._create_engine(database_uri)
+    return _worker_engines[database_uri]
+
+def run_task_spec(spec):
+    """Worker process entry point; returns the run_handler outcome"""
+    bridge = _WorkerBridge(_worker_engine(spec.database_uri), spec.updates, spec.lock)
+    context = TaskContext(
+        bridge, spec.task_id, spec.payload,
+        control=spec.control, state=spec.state, progress=spec.progress
+    )
+    return run_handler(spec.handler, context)
+
+class ProcessTaskRunner:
+    """Runs task handlers in a pool of worker processes.
+
+    Workers are started with 'spawn', so handlers must be importable
+    module-level functions. Each worker is replaced after
+    ``max_tasks_per_process`` tasks; before Python 3.11 the whole pool is
+    replaced after ``max_tasks_per_process`` tasks per worker instead. The
+    pool, the manager process holding the shared control flags and the
+    thread forwarding progress updates are all started on first use.
+    """
+    def __init__(self, database_uri, max_workers=None, max_tasks_per_process=DEFAULT_MAX_TASKS_PER_PROCESS,
+                 on_update=None):
+        self.database_uri = database_uri
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_tasks_per_process = max_tasks_per_process
+        self.on_update = on_update
+        self.executor = None
+        self._start_lock = threading.Lock()
+        self.logger = logging.getLogger('task_process_pool')
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self.executor is not None:
+                return
+            context = multiprocessing.get_context('spawn')
+            self._manager = context.Manager()
+            self._flags = self._manager.dict()
+            self._lock = self._manager.Lock()
+            self._updates = self._manager.Queue()
+            self._listener = threading.Thread(target=self._forward_updates, name='task-process-updates',
+                                              daemon=True)
+            self._listener.start()
+            self.executor = self._new_executor(context)
+
+    def _new_executor(self, context):
+        self._submitted = 0
+        if not NATIVE_MAX_TASKS_PER_CHILD:
+            return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            max_tasks_per_child=self.max_tasks_per_process
+        )
+
+    def _executor_for_task(self):
+        """The pool to submit the next task to.
+
+        Without native max_tasks_per_child the pool is replaced once it has
+        been given ``max_tasks_per_process`` tasks per worker; the old one
+        finishes its running tasks and its processes exit.
+        """
+        with self._start_lock:
+            if (not NATIVE_MAX_TASKS_PER_CHILD
+                    and self._submitted >= self.max_tasks_per_process * self.max_workers):
+                self.executor.shutdown(wait=False)
+                self.executor = self._new_executor(multiprocessing.get_context('spawn'))
+            self._submitted += 1
+            return self.executor
+
+    def _forward_updates(self):
+        while True:
+            try:
+                message = self._updates.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            task_id, state = message
+            if self.on_update is not None:
+                self.on_update(task_id, state)
+
+    def control(self, task_id):
+        """Create the shared control token of a task about to run"""
+        self._ensure_started()
+        self._flags[task_id] = {}
+        return SharedTaskControl(self._flags, self._lock, task_id)
+
+    def run(self, handler, context):
+        """Run ``handler`` for ``context`` in a worker and wait for the outcome.
+
+        A cancelled task returns 'stopped' within POLL_INTERVAL, freeing the
+        calling thread, while the worker process carries on until the
+        handler's next check. The task's control flags are released once
+        the worker is done with them.
+        """
+        self._ensure_started()
+        spec = TaskSpec(
+            context.task_id, handler, context.payload, context.state, context.progress,
+            context.control, self.database_uri, self._updates, self._lock
+        )
+        try:
+            future = self._executor_for_task().submit(run_task_spec, spec)
+            future.add_done_callback(lambda _: self._release(context.task_id))
+            while True:
+                try:
+                    return future.result(timeout=POLL_INTERVAL)
+                except TimeoutError:
+                    if context.control.cancel_requested:
+                        return 'stopped', None, None
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed for memory); start a fresh pool
+            self.logger.error(f'Worker process died running task {context.task_id}: {e}')
+            with self._start_lock:
+                self.executor = self._new_executor(multiprocessing.get_context('spawn'))
+            return 'failed', 'TASK_WORKER_CRASHED', str(e) or 'Worker process terminated'
+
+    def _release(self, task_id):
+        """Forget the control flags of a finished task"""
+        try:
+            self._flags.pop(task_id, None)
+        except (EOFError, OSError):
+            # The manager process is already shut down
+            pass
+
+    def shutdown(self, wait=True):
+        with self._start_lock:
+            if self.executor is None:
+                return
+            self.executor.shutdown(wait=wait)
+            self._updates.put(None)
+            self._listener.join(timeout=5)
+            self._manager.shutdown()
+            self.executor = None
@@ -0,0 +1,112 @@
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from .exceptions import TaskValidationError
+
+class RetryPolicy:
+    """How often and how soon a failed task is tried again.
+
+    The delay before attempt ``n + 1`` is ``base_delay * multiplier ** (n - 1)``
+    capped at ``max_delay``; ``jitter`` (0-1) randomly shortens it by up to
+    that fraction so tasks failing together do not retry together.
+    ``retryable_codes`` limits retries to those TaskError codes; None
+    retries every failure.
+    """
+    FIELDS = ['max_attempts', 'base_delay', 'max_delay', 'multiplier', 'jitter', 'retryable_codes']
+
+    def __init__(self, max_attempts=1, base_delay=1.0, max_delay=300.0, multiplier=2.0, jitter=1.0,
+                 retryable_codes=None):
+        if not isinstance(max_attempts, int) or max_attempts < 1:
+            raise TaskValidationError('INVALID_RETRY_POLICY', 'max_attempts must be a positive integer')
+        if base_delay < 0 or max_delay < 0 or multiplier < 1 or not 0 <= jitter <= 1:
+            raise TaskValidationError('INVALID_RETRY_POLICY',
+                'Delays must be non-negative, multiplier at least 1 and jitter within 0-1')
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.retryable_codes = list(retryable_codes) if retryable_codes is not None else None
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise TaskValidationError('INVALID_RETRY_POLICY', 'Retry policy must be an object')
+        unknown = [key for key in data if key not in cls.FIELDS]
+        if unknown:
+            raise TaskValidationError('INVALID_RETRY_POLICY', f'Unknown retry policy fields: {unknown}')
+        return cls(**data)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text)) if text else None
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def should_retry(self, attempts, error_code):
+        """Whether a task that failed ``attempts`` times with ``error_code`` gets another try"""
+        if attempts >= self.max_attempts:
+            return False
+        return self.retryable_codes is None or error_code in self.retryable_codes
+
+    def delay(self, attempts):
+        """Seconds to wait after the ``attempts``-th failed attempt"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempts - 1))
+        return delay * (1 - self.jitter * random.random())
+
+class RetryTimer:
+    """Single background thread firing callbacks at their due time.
+
+    Waiting retries cost one heap entry each instead of a sleeping worker.
+    """
+    def __init__(self, callback):
+        self.callback = callback
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.logger = logging.getLogger('task_retry_timer')
+
+    def schedule(self, delay, *args):
+        """Call ``callback(*args)`` after ``delay`` seconds"""
+        with self._condition:
+            if self._stopped:
+                return
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), args))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='task-retry-timer', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def pending(self):
+        with self._condition:
+            return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                _, _, args = heapq.heappop(self._heap)
+            try:
+                self.callback(*args)
+            except Exception as e:
+                self.logger.error(f'Retry callback failed for {args}: {e}')
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._heap.clear()
+            thread = self._thread
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout=5)
@@ -0,0 +1,118 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+PRIORITY_ORDER = ['high', 'medium', 'low']
+# Number of recent dispatches kept per priority for wait-time percentiles
+WAIT_SAMPLES = 1000
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+class PriorityScheduler:
+    """Priority queue in front of a fixed number of worker slots.
+
+    Each priority has its own heap ordered by a virtual start time: the
+    enqueue time plus ``aging`` seconds per priority level below 'high'.
+    A low-priority job therefore outranks high-priority jobs that arrive
+    more than ``2 * aging`` seconds after it, so nothing starves. Quotas cap
+    how many slots a priority may hold at once.
+
+    Work is dispatched from ``submit`` and from completion callbacks, so no
+    dispatcher thread is needed and the executor never queues work itself.
+    """
+    def __init__(self, max_workers=4, quotas=None, aging=30.0, name='default'):
+        self.max_workers = max_workers
+        self.quotas = quotas or {}
+        self.aging = aging
+        self.name = name
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'task-{name}')
+        self._queues = {priority: [] for priority in PRIORITY_ORDER}
+        self._running = {priority: 0 for priority in PRIORITY_ORDER}
+        self._dispatched = {priority: 0 for priority in PRIORITY_ORDER}
+        self._waits = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITY_ORDER}
+        self._sequence = itertools.count()
+        # Reentrant: a job that finishes immediately releases from inside _dispatch
+        self._lock = threading.RLock()
+        self._shutdown = False
+        self.logger = logging.getLogger('task_scheduler')
+
+    def submit(self, priority, fn, *args):
+        """Queue ``fn(*args)`` to run when a slot is free for ``priority``"""
+        if priority not in self._queues:
+            priority = 'medium'
+        now = time.monotonic()
+        key = now + PRIORITY_ORDER.index(priority) * self.aging
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('Scheduler has been shut down')
+            heapq.heappush(self._queues[priority], (key, next(self._sequence), now, fn, args))
+            self._dispatch()
+
+    def _has_quota(self, priority):
+        quota = self.quotas.get(priority)
+        return quota is None or self._running[priority] < quota
+
+    def _dispatch(self):
+        """Start queued work while slots are free; caller holds the lock"""
+        while sum(self._running.values()) < self.max_workers:
+            candidates = [
+                (queue[0][0], queue[0][1], priority)
+                for priority, queue in self._queues.items()
+                if queue and self._has_quota(priority)
+            ]
+            if not candidates:
+                return
+            _, _, priority = min(candidates)
+            _, _, enqueued_at, fn, args = heapq.heappop(self._queues[priority])
+            self._running[priority] += 1
+            self._dispatched[priority] += 1
+            self._waits[priority].append(time.monotonic() - enqueued_at)
+            future = self.executor.submit(fn, *args)
+            future.add_done_callback(lambda f, p=priority: self._release(p, f))
+
+    def _release(self, priority, future):
+        if future.exception() is not None:
+            self.logger.error(f'Scheduled job failed: {future.exception()}')
+        with self._lock:
+            self._running[priority] -= 1
+            if not self._shutdown:
+                self._dispatch()
+
+    def metrics(self):
+        """Queue depth, running count and recent start latency per priority"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'quotas': dict(self.quotas),
+                'priorities': {
+                    priority: {
+                        'queued': len(self._queues[priority]),
+                        'running': self._running[priority],
+                        'dispatched': self._dispatched[priority],
+                        'wait_p50': _percentile(self._waits[priority], 0.5),
+                        'wait_p99': _percentile(self._waits[priority], 0.99),
+                        'oldest_wait': (
+                            time.monotonic() - min(entry[2] for entry in self._queues[priority])
+                            if self._queues[priority] else 0.0
+                        )
+                    }
+                    for priority in PRIORITY_ORDER
+                }
+            }
+
+    def shutdown(self, wait=True):
+        """Drop queued work and stop the worker threads"""
+        with self._lock:
+            self._shutdown = True
+            for queue in self._queues.values():
+                queue.clear()
+        self.executor.shutdown(wait=wait)
@@ -1,124 +1,734 @@
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta
+import inspect
+import json
 import logging
-import time
+import os
+import pickle
+import socket
+import threading
+from sqlalchemy import create_engine, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.models import Task, TaskDependency
+from app.sqlite_profile import DEFAULT_SQLITE_PRAGMAS, register_sqlite_pragmas
+from .async_runner import (
+    DEFAULT_HOST_LIMIT, DEFAULT_MAX_CONCURRENCY, AsyncTaskContext, AsyncTaskRunner, run_async_handler
+)
+from .context import TaskControl, TaskContext, run_handler
+from .process_pool import DEFAULT_MAX_TASKS_PER_PROCESS, ProcessTaskRunner
+from .retry import RetryPolicy, RetryTimer
+from .scheduler import PriorityScheduler
+from .exceptions import (
+    TaskValidationError, TaskNotFoundError, TaskAlreadyRunningError
+)
 
-class TaskError(Exception):
-    """Base class for task-related errors"""
-    def __init__(self, code, message):
-        self.code = code
-        self.message = message
-        super().__init__(self.message)
+DEFAULT_DATABASE_URI = 'sqlite:///system.db'
+TASK_PRIORITIES = ['high', 'medium', 'low']
+# Statuses a task can no longer leave
+TERMINAL_STATUSES = ['completed', 'cancelled']
+# Statuses of tasks that hold or wait for a worker slot or their parents
+ACTIVE_STATUSES = ['queued', 'running', 'retrying', 'waiting']
+# Statuses from which a task can be paused or cancelled
+PAUSABLE_STATUSES = ['pending', 'queued', 'running', 'retrying', 'waiting']
+CANCELLABLE_STATUSES = ['pending', 'queued', 'running', 'paused', 'retrying', 'dead_letter', 'waiting']
+# Parent statuses that keep a dependent task from ever running
+FAILED_PARENT_STATUSES = ['failed', 'dead_letter', 'cancelled', 'skipped']
+# Statuses of descendants skipped when a parent fails; a pending task
+# would otherwise never end, leaving its own waiting children stuck
+SKIPPABLE_STATUSES = ['pending', 'waiting']
+# Statuses whose attempt count restarts when the task is started again
+RESTARTABLE_STATUSES = ['failed', 'dead_letter']
+UPDATABLE_FIELDS = [
+    'title', 'name', 'description', 'priority', 'due_date', 'task_type', 'payload', 'retry_policy', 'depends_on'
+]
+# Where a handler runs: a pool thread, a worker process for CPU-bound work,
+# or the event loop for I/O-bound coroutines
+EXECUTION_MODES = ['thread', 'process', 'async']
+def _simulate_task(context):
+    """Default handler for tasks without a registered type"""
+    context.wait(context.payload.get('duration', 2))
 
-class TaskNotFoundError(TaskError):
-    """Raised when a task is not found"""
-    def __init__(self, task_id):
-        super().__init__('TASK_NOT_FOUND', f'Task {task_id} not found')
+class TaskManager:
+    """Task manager backed by the ``task`` table.
 
-class TaskAlreadyRunningError(TaskError):
-    """Raised when trying to start an already running task"""
-    def __init__(self, task_id):
-        super().__init__('TASK_ALREADY_RUNNING', f'Task {task_id} is already running')
+    Every state transition is committed before the next one starts, so a
+    restarted node can pick up where it stopped with ``recover()``. Worker
+    slots are claimed with a write-locked read of the task row, which keeps
+    a task from being executed twice.
 
-class TaskManager:
-    def __init__(self):
-        self.executor = ThreadPoolExecutor(max_workers=4)
-        self.tasks = {}
+    ``pools`` maps pool names to worker counts; each pool dispatches queued
+    tasks by priority through a PriorityScheduler using ``quotas`` and
+    ``aging``. Handlers registered with ``mode='process'`` still take a pool
+    slot but run in a ProcessTaskRunner of ``process_workers`` processes.
+    Coroutine handlers registered with ``mode='async'`` bypass the pools and
+    run on an AsyncTaskRunner limited by ``async_concurrency`` overall and
+    ``async_host_limit``/``async_host_limits`` per ``payload['host']``.
+
+    Failed attempts are retried after a backoff when the task's RetryPolicy
+    (or its type's) allows it; tasks out of attempts go to ``dead_letter``.
+
+    Tasks may declare ``depends_on`` parents. A started task whose parents
+    have not all completed is ``waiting`` and is queued by the last parent
+    to complete; if a parent fails instead, pending and waiting
+    descendants are ``skipped``.
+    """
+    def __init__(self, engine=None, database_uri=None, max_workers=4, pools=None, node_id=None,
+                 quotas=None, aging=30.0, process_workers=None,
+                 max_tasks_per_process=DEFAULT_MAX_TASKS_PER_PROCESS,
+                 async_concurrency=DEFAULT_MAX_CONCURRENCY, async_host_limit=DEFAULT_HOST_LIMIT,
+                 async_host_limits=None):
+        self.engine = engine or self._create_engine(
+            database_uri or os.environ.get('TASK_DATABASE_URI', DEFAULT_DATABASE_URI)
+        )
+        Task.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.pools = pools or {'default': max_workers}
+        self.schedulers = {
+            name: PriorityScheduler(max_workers=workers, quotas=quotas, aging=aging, name=name)
+            for name, workers in self.pools.items()
+        }
+        self.handlers = {}
+        self.retry_policies = {}
+        self.retry_timer = RetryTimer(self._retry_due)
+        self.tasks = {}  # runtime state of tasks executing on this node
+        self.process_runner = ProcessTaskRunner(
+            self.engine.url.render_as_string(hide_password=False),
+            max_workers=process_workers,
+            max_tasks_per_process=max_tasks_per_process,
+            on_update=self._update_runtime
+        )
+        self.async_runner = AsyncTaskRunner(
+            max_concurrency=async_concurrency,
+            host_limit=async_host_limit,
+            host_limits=async_host_limits
+        )
+        self._lock = threading.Lock()
+        self.node_id = node_id or socket.gethostname()
         self.logger = logging.getLogger('task_manager')
-        
-    def create_task(self, title, description=None, due_date=None):
-        task_id = str(datetime.now().timestamp())
-        self.tasks[task_id] = {
-            'id': task_id,
-            'title': title,
+
+    @staticmethod
+    def _create_engine(database_uri):
+        url = make_url(database_uri)
+        if url.get_backend_name() != 'sqlite':
+            return create_engine(database_uri)
+        if url.database in (None, '', ':memory:'):
+            return create_engine(
+                database_uri,
+                poolclass=StaticPool,
+                connect_args={'check_same_thread': False}
+            )
+        engine = create_engine(database_uri, connect_args={'check_same_thread': False})
+        register_sqlite_pragmas(engine, DEFAULT_SQLITE_PRAGMAS)
+        return engine
+
+    def register_handler(self, task_type, handler, pool='default', mode='thread', retry=None):
+        """Register the callable run for tasks of ``task_type``.
+
+        The handler receives a TaskContext; its return value is ignored and
+        raising TaskError marks the task failed with the error's code.
+        Process-mode handlers must be picklable module-level functions and
+        need a database the worker processes can open. Async-mode handlers
+        are coroutine functions receiving an AsyncTaskContext. ``retry`` is the
+        RetryPolicy of tasks of this type that do not set their own.
+        """
+        if pool not in self.schedulers:
+            raise TaskValidationError('INVALID_POOL', f'Unknown worker pool: {pool}')
+        if mode not in EXECUTION_MODES:
+            raise TaskValidationError('INVALID_MODE',
+                f'Invalid execution mode: {mode}. Must be one of {EXECUTION_MODES}')
+        if mode == 'process':
+            if self.engine.url.database in (None, '', ':memory:'):
+                raise TaskValidationError('INVALID_MODE',
+                    'Process mode needs a database shared with worker processes')
+            try:
+                pickle.dumps(handler)
+            except (pickle.PicklingError, AttributeError, TypeError):
+                raise TaskValidationError('INVALID_HANDLER',
+                    f'Handler for {task_type} must be a module-level function in process mode')
+        if (mode == 'async') != inspect.iscoroutinefunction(handler):
+            raise TaskValidationError('INVALID_HANDLER',
+                f'Handler for {task_type} must be a coroutine function exactly when mode is async')
+        self.handlers[task_type] = (handler, pool, mode)
+        if retry is not None:
+            self.retry_policies[task_type] = retry
+
+    @staticmethod
+    def _coerce_id(task_id):
+        try:
+            return int(task_id)
+        except (TypeError, ValueError):
+            raise TaskNotFoundError(task_id)
+
+    def _locked_task(self, session, task_id):
+        """Load a task after taking the database write lock on its row.
+
+        Touching the row first makes the following read consistent with any
+        concurrent transition, so read-modify-write sequences are atomic.
+        """
+        task_id = self._coerce_id(task_id)
+        result = session.execute(
+            update(Task).where(Task.id == task_id).values(updated_at=datetime.utcnow())
+        )
+        if result.rowcount == 0:
+            raise TaskNotFoundError(task_id)
+        return session.get(Task, task_id, populate_existing=True, with_for_update=True)
+
+    def _validate_fields(self, fields):
+        title = fields.get('name')
+        if 'name' in fields and (not isinstance(title, str) or not title.strip() or len(title) > 100):
+            raise TaskValidationError('INVALID_TITLE', 'Task title must be 1-100 characters')
+        if fields.get('priority') is not None and fields['priority'] not in TASK_PRIORITIES:
+            raise TaskValidationError('INVALID_PRIORITY',
+                f"Invalid priority: {fields['priority']}. Must be one of {TASK_PRIORITIES}")
+        due_date = fields.get('due_date')
+        if due_date is not None and due_date < datetime.utcnow():
+            raise TaskValidationError('INVALID_DUE_DATE', 'Due date must be in the future')
+
+    @staticmethod
+    def _dump_retry_policy(retry_policy):
+        if retry_policy is None:
+            return None
+        if not isinstance(retry_policy, RetryPolicy):
+            retry_policy = RetryPolicy.from_dict(retry_policy)
+        return json.dumps(retry_policy.to_dict())
+
+    def _check_dependencies(self, session, task_id, parent_ids):
+        """Validate parents exist and that depending on them creates no cycle"""
+        parent_ids = {self._coerce_id(parent_id) for parent_id in parent_ids}
+        found = {row.id for row in session.query(Task.id).filter(Task.id.in_(parent_ids))}
+        missing = sorted(parent_ids - found)
+        if missing:
+            raise TaskValidationError('INVALID_DEPENDENCY', f'Unknown parent tasks: {missing}')
+        # Walk the ancestors of the new parents; meeting task_id closes a cycle
+        seen = set()
+        frontier = set(parent_ids)
+        while frontier:
+            if task_id in frontier:
+                raise TaskValidationError('DEPENDENCY_CYCLE',
+                    f'Task {task_id} cannot depend on its own descendants')
+            seen |= frontier
+            frontier = {
+                row.depends_on_id for row in session.query(TaskDependency.depends_on_id).filter(
+                    TaskDependency.task_id.in_(frontier)
+                )
+            } - seen
+        return sorted(parent_ids)
+
+    def _set_dependencies(self, session, task, parent_ids):
+        parent_ids = self._check_dependencies(session, task.id, parent_ids)
+        session.query(TaskDependency).filter(TaskDependency.task_id == task.id).delete()
+        session.add_all([TaskDependency(task_id=task.id, depends_on_id=parent_id) for parent_id in parent_ids])
+
+    def get_dependencies(self, task_id):
+        """Ids of the tasks ``task_id`` depends on"""
+        task_id = self._coerce_id(task_id)
+        with self.Session() as session:
+            return [row.depends_on_id for row in session.query(TaskDependency.depends_on_id).filter(
+                TaskDependency.task_id == task_id
+            ).order_by(TaskDependency.depends_on_id)]
+
+    def create_task(self, title, description=None, due_date=None, priority='medium',
+                    task_type=None, payload=None, retry_policy=None, depends_on=None):
+        fields = {
+            'name': title,
             'description': description,
             'due_date': due_date,
-            'status': 'pending',
-            'progress': 0,
-            'created_at': datetime.now()
+            'priority': priority,
+            'task_type': task_type,
+            'payload': json.dumps(payload) if payload is not None else None,
+            'retry_policy': self._dump_retry_policy(retry_policy)
         }
-        return task_id
+        self._validate_fields(fields)
+        with self.Session() as session:
+            task = Task(status='pending', progress=0, **fields)
+            session.add(task)
+            if depends_on:
+                session.flush()
+                self._set_dependencies(session, task, depends_on)
+            session.commit()
+            return task
 
     def get_task(self, task_id):
-        if task_id not in self.tasks:
-            raise TaskNotFoundError(task_id)
-        return self.tasks[task_id]
+        task_id = self._coerce_id(task_id)
+        with self.Session() as session:
+            task = session.get(Task, task_id)
+            if task is None:
+                raise TaskNotFoundError(task_id)
+            return task
 
     def start_task(self, task_id):
-        if task_id not in self.tasks:
-            raise TaskNotFoundError(task_id)
-            
-        if self.tasks[task_id]['status'] == 'running':
-            raise TaskAlreadyRunningError(task_id)
-            
-        def task_runner():
-            try:
-                self.tasks[task_id]['status'] = 'running'
-                # Simulate task execution
-                time.sleep(2)  # Keep task running for 2 seconds
-                self.tasks[task_id]['status'] = 'completed'
-            except TaskError as e:
-                self.tasks[task_id]['status'] = 'failed'
-                self.tasks[task_id]['error'] = {
-                    'code': e.code,
-                    'message': e.message
-                }
-                self.logger.error(f'Task {task_id} failed: {e.code} - {e.message}')
-            except Exception as e:
-                self.tasks[task_id]['status'] = 'failed'
-                self.tasks[task_id]['error'] = {
-                    'code': 'TASK_UNKNOWN_ERROR',
-                    'message': str(e)
-                }
-                self.logger.error(f'Task {task_id} failed with unknown error: {str(e)}')
-
-        self.executor.submit(task_runner)
+        with self.Session() as session:
+            task = self._locked_task(session, task_id)
+            if task.status in ACTIVE_STATUSES:
+                raise TaskAlreadyRunningError(task.id)
+            if task.status in TERMINAL_STATUSES:
+                raise TaskValidationError('INVALID_TRANSITION',
+                    f'Task {task.id} is {task.status} and cannot be started')
+            status = self._ready_status(session, task)
+            if task.status in RESTARTABLE_STATUSES:
+                task.attempts = 0
+            task.status = status
+            task.owner = self.node_id
+            task.error_code = None
+            task.error_message = None
+            session.commit()
+            task_type = task.task_type
+            priority = task.priority
+            task_id = task.id
+
+        if status == 'queued':
+            self._submit(task_id, task_type, priority)
         return True
 
+    def _ready_status(self, session, task):
+        """'queued' once every parent completed, else 'waiting'"""
+        parents = session.query(Task.id, Task.status).join(
+            TaskDependency, TaskDependency.depends_on_id == Task.id
+        ).filter(TaskDependency.task_id == task.id).all()
+        failed = [parent.id for parent in parents if parent.status in FAILED_PARENT_STATUSES]
+        if failed:
+            raise TaskValidationError('DEPENDENCY_FAILED',
+                f'Task {task.id} depends on tasks that did not complete: {failed}')
+        return 'waiting' if any(parent.status != 'completed' for parent in parents) else 'queued'
+
+    def _queue_if_ready(self, task_id):
+        """Queue a waiting task whose parents have all completed"""
+        with self.Session() as session:
+            try:
+                task = self._locked_task(session, task_id)
+                if task.status != 'waiting' or self._ready_status(session, task) != 'queued':
+                    return
+            except TaskValidationError:
+                return
+            task.status = 'queued'
+            session.commit()
+            task_type = task.task_type
+            priority = task.priority
+
+        self._submit(task_id, task_type, priority)
+
+    def _waiting_children(self, session, task_ids, statuses=('waiting',)):
+        return [row.task_id for row in session.query(TaskDependency.task_id).join(
+            Task, Task.id == TaskDependency.task_id
+        ).filter(TaskDependency.depends_on_id.in_(task_ids), Task.status.in_(statuses)).distinct()]
+
+    def _release_dependents(self, task_id):
+        """Queue the children a completed task was the last parent of"""
+        with self.Session() as session:
+            children = self._waiting_children(session, [task_id])
+        for child_id in children:
+            self._queue_if_ready(child_id)
+
+    def _skip_dependents(self, task_id, status):
+        """Skip every pending or waiting descendant of a task that ended ``status``"""
+        with self.Session() as session:
+            frontier = [task_id]
+            while frontier:
+                children = self._waiting_children(session, frontier, SKIPPABLE_STATUSES)
+                for child in session.query(Task).filter(Task.id.in_(children)):
+                    child.status = 'skipped'
+                    child.finished_at = datetime.utcnow()
+                    child.error_code = 'DEPENDENCY_FAILED'
+                    child.error_message = f'Parent task {task_id} ended {status}'
+                session.commit()
+                frontier = children
+
+    def _submit(self, task_id, task_type, priority):
+        _, pool, mode = self.handlers.get(task_type, (None, 'default', 'thread'))
+        if mode == 'async':
+            self.async_runner.submit(self._execute_async(task_id))
+            return
+        scheduler = self.schedulers.get(pool) or next(iter(self.schedulers.values()))
+        scheduler.submit(priority, self._execute, task_id)
+
+    def _claim(self, task_id):
+        """Move a queued task to running; returns its handler, mode and TaskContext or None"""
+        with self.Session() as session:
+            try:
+                task = self._locked_task(session, task_id)
+            except TaskNotFoundError:
+                return None
+            if task.status != 'queued':
+                return None
+            task.status = 'running'
+            task.owner = self.node_id
+            task.started_at = task.started_at or datetime.utcnow()
+            task.attempts = (task.attempts or 0) + 1
+            task.result = None
+            session.commit()
+
+            handler, _, mode = self.handlers.get(task.task_type, (_simulate_task, 'default', 'thread'))
+            if mode == 'process':
+                control = self.process_runner.control(task.id)
+            elif mode == 'async':
+                control = self.async_runner.control()
+            else:
+                control = TaskControl()
+            self._set_runtime(task.id, status='running', progress=task.progress, control=control)
+            return handler, mode, TaskContext(
+                self, task.id,
+                json.loads(task.payload) if task.payload else {},
+                control=control,
+                state=json.loads(task.checkpoint) if task.checkpoint else None,
+                progress=task.progress
+            )
+
+    def _execute(self, task_id):
+        claimed = self._claim(task_id)
+        if claimed is None:
+            return
+        handler, mode, context = claimed
+        try:
+            if mode == 'process':
+                self._record_outcome(task_id, *self.process_runner.run(handler, context))
+            else:
+                self._record_outcome(task_id, *run_handler(handler, context))
+        finally:
+            self._clear_runtime(task_id, context.control)
+
+    async def _execute_async(self, task_id):
+        """Run an async-mode task on the runner's loop"""
+        async with self.async_runner.slot():
+            claimed = await asyncio.to_thread(self._claim, task_id)
+            if claimed is None:
+                return
+            handler, _, context = claimed
+            try:
+                async with self.async_runner.host_slot(context.payload.get('host')):
+                    outcome = await run_async_handler(handler, AsyncTaskContext(context))
+                await asyncio.to_thread(self._record_outcome, task_id, *outcome)
+            finally:
+                self._clear_runtime(task_id, context.control)
+
+    def _record_outcome(self, task_id, outcome, error_code, error_message):
+        if outcome == 'completed':
+            self._finish(task_id, 'completed', progress=100, checkpoint=None)
+            self._release_dependents(task_id)
+        elif outcome == 'stopped':
+            # The status was already recorded by cancel_task/pause_task
+            self.logger.info(f'Task {task_id} stopped at a checkpoint')
+        else:
+            self.logger.error(f'Task {task_id} failed: {error_code} - {error_message}')
+            self._fail(task_id, error_code, error_message[:500])
+
+    def _clear_runtime(self, task_id, control):
+        with self._lock:
+            if self.tasks.get(task_id, {}).get('control') is control:
+                del self.tasks[task_id]
+
+    def _finish(self, task_id, status, **fields):
+        """Record the outcome of a running task.
+
+        A task paused after its last checkpoint still records its outcome;
+        a cancelled one stays cancelled.
+        """
+        with self.Session() as session:
+            task = self._locked_task(session, task_id)
+            if task.status not in ('running', 'paused'):
+                return
+            task.status = status
+            task.finished_at = datetime.utcnow()
+            for key, value in fields.items():
+                setattr(task, key, value)
+            session.commit()
+
+    def _retry_policy(self, task):
+        return RetryPolicy.from_json(task.retry_policy) or self.retry_policies.get(task.task_type)
+
+    def _fail(self, task_id, error_code, error_message):
+        """Record a failed attempt: schedule a retry, dead-letter or fail the task"""
+        with self.Session() as session:
+            task = self._locked_task(session, task_id)
+            if task.status not in ('running', 'paused'):
+                return
+            task.error_code = error_code
+            task.error_message = error_message
+            policy = self._retry_policy(task)
+            if task.status == 'running' and policy is not None and policy.should_retry(task.attempts, error_code):
+                delay = policy.delay(task.attempts)
+                task.status = 'retrying'
+                task.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                session.commit()
+                self.retry_timer.schedule(delay, task.id)
+                self.logger.info(f'Task {task.id} retrying in {delay:.1f}s (attempt {task.attempts})')
+                return
+            retryable = policy is not None and policy.should_retry(0, error_code)
+            task.status = 'dead_letter' if retryable and policy.max_attempts > 1 else 'failed'
+            task.finished_at = datetime.utcnow()
+            session.commit()
+            status = task.status
+        self._skip_dependents(task_id, status)
+
+    def _retry_due(self, task_id):
+        """Timer callback queueing a task whose backoff has elapsed"""
+        with self.Session() as session:
+            try:
+                task = self._locked_task(session, task_id)
+            except TaskNotFoundError:
+                return
+            if task.status != 'retrying':
+                return
+            task.status = 'queued'
+            task.next_attempt_at = None
+            session.commit()
+            task_type = task.task_type
+            priority = task.priority
+
+        self._submit(task_id, task_type, priority)
+
+    def requeue_dead_letters(self, task_ids=None):
+        """Queue dead-lettered tasks again with a fresh attempt budget.
+
+        Requeues every dead-lettered task, or only those among ``task_ids``;
+        returns the ids that were queued.
+        """
+        with self.Session() as session:
+            query = session.query(Task.id).filter(Task.status == 'dead_letter')
+            if task_ids is not None:
+                query = query.filter(Task.id.in_([self._coerce_id(task_id) for task_id in task_ids]))
+            candidates = [row.id for row in query.order_by(Task.id)]
+
+        requeued = []
+        for task_id in candidates:
+            with self.Session() as session:
+                task = self._locked_task(session, task_id)
+                if task.status != 'dead_letter':
+                    continue
+                task.status = 'queued'
+                task.owner = self.node_id
+                task.attempts = 0
+                task.error_code = None
+                task.error_message = None
+                task.finished_at = None
+                session.commit()
+                task_type = task.task_type
+                priority = task.priority
+            self._submit(task_id, task_type, priority)
+            requeued.append(task_id)
+        return requeued
+
+    def _set_runtime(self, task_id, **state):
+        with self._lock:
+            self.tasks.setdefault(task_id, {}).update(state)
+
+    def _update_runtime(self, task_id, state):
+        """Apply progress reported by a worker process to a task still running here"""
+        with self._lock:
+            if task_id in self.tasks:
+                self.tasks[task_id].update(state)
+
+    def _persist(self, task_id, **fields):
+        with self.Session() as session:
+            session.execute(update(Task).where(Task.id == task_id).values(
+                updated_at=datetime.utcnow(), **fields
+            ))
+            session.commit()
+
+    def recover(self):
+        """Requeue this node's interrupted tasks after a restart.
+
+        Tasks left ``running`` by a crash are reset to ``queued`` and every
+        queued task owned by this node is submitted again; tasks waiting for
+        a retry get their timers back and waiting tasks whose parents are
+        done are queued. Returns the ids of the resubmitted
+        tasks.
+        """
+        with self.Session() as session:
+            # Through the ORM so the task_daily_stat flush hooks see the status change
+            interrupted = session.query(Task).filter(
+                Task.status == 'running', Task.owner == self.node_id
+            ).all()
+            for task in interrupted:
+                task.status = 'queued'
+                task.updated_at = datetime.utcnow()
+            session.commit()
+            queued = session.query(Task.id, Task.task_type, Task.priority).filter(
+                Task.status == 'queued', Task.owner == self.node_id
+            ).order_by(Task.id).all()
+            retrying = session.query(Task.id, Task.next_attempt_at).filter(
+                Task.status == 'retrying', Task.owner == self.node_id
+            ).all()
+            waiting = session.query(Task.id).filter(
+                Task.status == 'waiting', Task.owner == self.node_id
+            ).all()
+
+        # Parents may have completed while this node was down
+        for row in waiting:
+            self._queue_if_ready(row.id)
+
+        now = datetime.utcnow()
+        for task_id, next_attempt_at in retrying:
+            delay = (next_attempt_at - now).total_seconds() if next_attempt_at else 0
+            self.retry_timer.schedule(max(0.0, delay), task_id)
+
+        for task_id, task_type, priority in queued:
+            self._submit(task_id, task_type, priority)
+        if queued:
+            self.logger.info(f'Recovered {len(queued)} queued tasks')
+        return [row.id for row in queued]
+
     def get_task_status(self, task_id):
-        task = self.tasks.get(task_id)
-        if task:
-            return {
-                'title': task['title'],
-                'status': task['status']
-            }
-        return None
-
-    def list_tasks(self):
-        return [{
-            'title': task['title'],
-            'status': task['status']
-        } for task in self.tasks.values()]
+        try:
+            task = self.get_task(task_id)
+        except TaskNotFoundError:
+            return None
+        runtime = self.tasks.get(task.id, {})
+        return {
+            'title': task.title,
+            'status': task.status,
+            'progress': runtime.get('progress', task.progress)
+        }
+
+    def list_tasks(self, status=None):
+        with self.Session() as session:
+            query = session.query(Task)
+            if status:
+                query = query.filter(Task.status == status)
+            return query.order_by(Task.id).all()
 
     def update_task(self, task_id, updates):
-        task = self.get_task(task_id)
-        task.update(updates)
-        return task
+        invalid = [key for key in updates if key not in UPDATABLE_FIELDS]
+        if invalid:
+            raise TaskValidationError('INVALID_FIELD', f'Fields cannot be updated: {invalid}')
+        fields = {('name' if key == 'title' else key): value for key, value in updates.items()}
+        depends_on = fields.pop('depends_on', None)
+        if 'payload' in fields and fields['payload'] is not None:
+            fields['payload'] = json.dumps(fields['payload'])
+        if 'retry_policy' in fields:
+            fields['retry_policy'] = self._dump_retry_policy(fields['retry_policy'])
+        self._validate_fields(fields)
+
+        with self.Session() as session:
+            task = self._locked_task(session, task_id)
+            if depends_on is not None:
+                if task.status in ACTIVE_STATUSES:
+                    raise TaskAlreadyRunningError(task.id)
+                self._set_dependencies(session, task, depends_on)
+            for key, value in fields.items():
+                setattr(task, key, value)
+            session.commit()
+            return task
 
     def delete_task(self, task_id):
-        if task_id not in self.tasks:
-            raise TaskNotFoundError(task_id)
-        del self.tasks[task_id]
+        with self.Session() as session:
+            task = self._locked_task(session, task_id)
+            if task.status in ACTIVE_STATUSES:
+                raise TaskAlreadyRunningError(task.id)
+            children = self._waiting_children(session, [task.id])
+            session.query(TaskDependency).filter(
+                (TaskDependency.task_id == task.id) | (TaskDependency.depends_on_id == task.id)
+            ).delete(synchronize_session=False)
+            session.delete(task)
+            session.commit()
+        for child_id in children:
+            self._queue_if_ready(child_id)
         return True
 
     def change_task_status(self, task_id, new_status):
         valid_statuses = ['pending', 'in_progress', 'completed', 'failed']
         if new_status not in valid_statuses:
-            raise TaskValidationError('INVALID_STATUS', 
+            raise TaskValidationError('INVALID_STATUS',
                 f'Invalid status: {new_status}. Must be one of {valid_statuses}')
-        
-        task = self.get_task(task_id)
-        task['status'] = new_status
-        return task
+
+        with self.Session() as session:
+            task = self._locked_task(session, task_id)
+            if task.status in TERMINAL_STATUSES:
+                raise TaskValidationError('INVALID_TRANSITION',
+                    f'Cannot change status of {task.status} task {task.id}')
+            task.status = new_status
+            session.commit()
+            return task
+
+    def _runtime_control(self, task_id):
+        """Return the control token of a task executing on this node"""
+        return self.tasks.get(task_id, {}).get('control')
 
     def pause_task(self, task_id):
-        # Implement pause logic
-        pass
+        """Pause a task.
+
+        Waiting tasks are simply held back. A running task is told to stop
+        at its next checkpoint, which persists its progress and state.
+        """
+        with self.Session() as session:
+            task = self._locked_task(session, task_id)
+            if task.status == 'paused':
+                return True
+            if task.status not in PAUSABLE_STATUSES:
+                raise TaskValidationError('INVALID_TRANSITION',
+                    f'Task {task.id} is {task.status} and cannot be paused')
+            task.status = 'paused'
+            session.commit()
+            with self._lock:
+                control = self._runtime_control(task.id)
+                if control is not None:
+                    control.request_pause()
+        return True
 
     def resume_task(self, task_id):
-        # Implement resume logic
-        pass
+        """Resume a paused task from its last checkpoint"""
+        with self.Session() as session:
+            task = self._locked_task(session, task_id)
+            if task.status != 'paused':
+                raise TaskValidationError('INVALID_TRANSITION',
+                    f'Task {task.id} is {task.status} and cannot be resumed')
+            with self._lock:
+                control = self._runtime_control(task.id)
+                if control is not None and control.resume_in_place():
+                    # Still running on this node and has not reached a checkpoint
+                    task.status = 'running'
+                    session.commit()
+                    return True
+            status = self._ready_status(session, task)
+            task.status = status
+            task.owner = self.node_id
+            session.commit()
+            task_type = task.task_type
+            priority = task.priority
+            task_id = task.id
+
+        if status == 'queued':
+            self._submit(task_id, task_type, priority)
+        return True
 
     def cancel_task(self, task_id):
-        # Implement cancel logic
-        pass
+        """Cancel a task and skip its waiting descendants.
+
+        Cancelling is cooperative: a thread or async task keeps its slot
+        until its handler reaches the next checkpoint, check or wait. A
+        process task frees its pool slot within POLL_INTERVAL, but its
+        worker process only stops at the handler's next check.
+        """
+        with self.Session() as session:
+            task = self._locked_task(session, task_id)
+            if task.status == 'cancelled':
+                return True
+            if task.status not in CANCELLABLE_STATUSES:
+                raise TaskValidationError('INVALID_TRANSITION',
+                    f'Task {task.id} is {task.status} and cannot be cancelled')
+            task.status = 'cancelled'
+            task.finished_at = datetime.utcnow()
+            task.checkpoint = None
+            session.commit()
+            with self._lock:
+                control = self._runtime_control(task.id)
+                if control is not None:
+                    control.request_cancel()
+            task_id = task.id
+        self._skip_dependents(task_id, 'cancelled')
+        return True
+
+    def metrics(self):
+        """Scheduler queue and latency metrics of every worker pool and the async runner"""
+        metrics = {name: scheduler.metrics() for name, scheduler in self.schedulers.items()}
+        metrics['async'] = self.async_runner.metrics()
+        return metrics
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and release the worker pools"""
+        self.retry_timer.stop()
+        for scheduler in self.schedulers.values():
+            scheduler.shutdown(wait=wait)
+        self.process_runner.shutdown(wait=wait)
+        self.async_runner.shutdown(wait=wait)
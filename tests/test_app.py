@@ -1,9 +1,11 @@
 import pytest
 import tempfile
 from app import create_app
+from app.logging_setup import stop_logging
 from app.models import db
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import os
+import shutil
 
 @pytest.fixture
 def app():
@@ -15,6 +17,8 @@ def app():
     app = create_app({
         'TESTING': True,
         'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'FILE_STORAGE_DIR': os.path.join(tempfile.gettempdir(), f'files-{os.path.basename(db_path)}'),
+        'LOG_FILE': f'{db_path}.log',
         'WTF_CSRF_ENABLED': False
     })
 
@@ -25,6 +29,10 @@ def app():
     yield app
 
     # Clean up after testing
+    shutil.rmtree(app.config['FILE_STORAGE_DIR'], ignore_errors=True)
+    stop_logging()
+    if os.path.exists(app.config['LOG_FILE']):
+        os.unlink(app.config['LOG_FILE'])
     os.close(db_fd)
     os.unlink(db_path)
 
@@ -154,3 +162,704 @@ def test_unauthorized_task_access(client):
     # Try to access the task
     response = client.get(f'/tasks/{task_id}')
     assert response.status_code == 401
+
+def _seed_tasks(app, count, **overrides):
+    """Insert tasks with strictly increasing created_at values"""
+    from app.models import Task
+    base = datetime(2024, 1, 1)
+    with app.app_context():
+        for i in range(count):
+            fields = {
+                'name': f'Task {i}',
+                'status': 'pending',
+                'priority': 'medium',
+                'created_at': base + timedelta(minutes=i)
+            }
+            fields.update(overrides)
+            db.session.add(Task(**fields))
+        db.session.commit()
+
+def test_get_tasks_keyset_pagination(app, client):
+    """Test walking every task page with the next cursor"""
+    _seed_tasks(app, 25)
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/v1/tasks?limit=10' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url)
+        assert response.status_code == 200
+        seen.extend(task['id'] for task in response.json)
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+    assert seen == sorted(seen, reverse=True)
+
+def test_get_tasks_filters_and_fields(app, client):
+    """Test status filtering and column projection"""
+    _seed_tasks(app, 3)
+    _seed_tasks(app, 2, status='completed', priority='high')
+
+    response = client.get('/api/v1/tasks?status=completed&fields=id,priority')
+    assert response.status_code == 200
+    assert len(response.json) == 2
+    assert all(set(task) == {'id', 'priority'} for task in response.json)
+    assert all(task['priority'] == 'high' for task in response.json)
+
+    response = client.get('/api/v1/tasks?created_after=2024-01-01T00:01:00&created_before=2024-01-01T00:02:00')
+    assert [task['name'] for task in response.json] == ['Task 1', 'Task 1']
+
+def test_get_tasks_invalid_parameters(client):
+    """Test invalid pagination parameters are rejected"""
+    assert client.get('/api/v1/tasks?cursor=not-a-cursor').status_code == 400
+    assert client.get('/api/v1/tasks?limit=0').status_code == 400
+    assert client.get('/api/v1/tasks?fields=password').status_code == 400
+
+def _seed_logs(app, count, **overrides):
+    """Insert logs with strictly increasing task_time values"""
+    from app.models import Log
+    base = datetime(2024, 1, 1)
+    with app.app_context():
+        for i in range(count):
+            fields = {
+                'source_server_name': 'fs-01',
+                'source_server_ip': '10.0.0.1',
+                'task_time': base + timedelta(seconds=i)
+            }
+            fields.update(overrides)
+            db.session.add(Log(**fields))
+        db.session.commit()
+
+def test_get_logs_single_query_with_task_names(app, client):
+    """Test task names are joined in without one query per log"""
+    from sqlalchemy import event
+    _seed_tasks(app, 1)
+    _seed_logs(app, 5, task_id=1)
+    _seed_logs(app, 1)
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/api/v1/logs')
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    assert response.status_code == 200
+    assert len(response.json) == 6
+    assert len([s for s in statements if s.lstrip().upper().startswith('SELECT')]) == 1
+    names = [log['task_name'] for log in response.json]
+    assert names.count('Task 0') == 5
+    assert names.count(None) == 1
+
+def test_get_logs_pagination_and_filters(app, client):
+    """Test log filters combined with cursor pagination"""
+    _seed_logs(app, 15)
+    _seed_logs(app, 4, source_server_name='fs-02', error_message='timeout')
+
+    response = client.get('/api/v1/logs?has_error=true')
+    assert len(response.json) == 4
+    assert all(log['error_message'] == 'timeout' for log in response.json)
+
+    response = client.get('/api/v1/logs?source_server_name=fs-01&limit=10')
+    assert len(response.json) == 10
+    cursor = response.headers['X-Next-Cursor']
+    response = client.get(f'/api/v1/logs?source_server_name=fs-01&limit=10&cursor={cursor}')
+    assert len(response.json) == 5
+    assert 'X-Next-Cursor' not in response.headers
+
+    assert client.get('/api/v1/logs?has_error=maybe').status_code == 400
+
+def test_export_logs_ndjson(app, client):
+    """Test NDJSON export streams every matching row oldest first"""
+    import json
+    _seed_logs(app, 3)
+    _seed_logs(app, 2, source_server_name='fs-02')
+
+    response = client.get('/api/v1/logs/export?source_server_name=fs-01')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [record['id'] for record in records] == [1, 2, 3]
+
+def test_export_logs_csv(app, client):
+    """Test CSV export writes a header and one line per row"""
+    import csv
+    import io
+    _seed_logs(app, 4, error_message='disk full')
+
+    response = client.get('/api/v1/logs/export?format=csv&has_error=true')
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.data.decode())))
+    assert rows[0][0] == 'id'
+    assert len(rows) == 5
+    assert rows[1][-1] == 'disk full'
+
+    assert client.get('/api/v1/logs/export?format=xml').status_code == 400
+
+def test_search_logs(app, client, monkeypatch):
+    """Test FTS search ranks, highlights, pages and follows updates"""
+    from app import log_search
+    from app.models import Log
+    _seed_logs(app, 3, error_message='connection timeout to fs-02', source_server_file_path='/data/in')
+    _seed_logs(app, 2, error_message='disk full', source_server_file_name='timeout_report.csv')
+    _seed_logs(app, 5, source_server_file_path='/data/archive')
+
+    response = client.get('/api/v1/logs/search?q=timeout')
+    assert response.status_code == 200
+    results = response.json
+    assert len(results) == 5
+    # Error message hits outrank file name hits
+    assert [log['error_message'] for log in results[:3]] == ['connection timeout to fs-02'] * 3
+    assert results[0]['highlight']['error_message'] == 'connection <mark>timeout</mark> to fs-02'
+    assert results[-1]['highlight']['source_server_file_name'] == '<mark>timeout</mark>_report.csv'
+
+    response = client.get('/api/v1/logs/search?q=timeout&limit=3')
+    cursor = response.headers['X-Next-Cursor']
+    rest = client.get(f'/api/v1/logs/search?q=timeout&limit=3&cursor={cursor}').json
+    assert [log['id'] for log in response.json + rest] == [log['id'] for log in results]
+
+    response = client.get('/api/v1/logs/search?q="connection timeout"&order=recent')
+    assert [log['id'] for log in response.json] == [3, 2, 1]
+    assert len(client.get('/api/v1/logs/search?q=arch*').json) == 5
+
+    with app.app_context():
+        log = db.session.get(Log, 1)
+        log.error_message = 'checksum mismatch'
+        db.session.delete(db.session.get(Log, 2))
+        db.session.commit()
+    assert [log['id'] for log in client.get('/api/v1/logs/search?q=checksum').json] == [1]
+    assert len(client.get('/api/v1/logs/search?q=timeout').json) == 3
+
+    monkeypatch.setattr(log_search, 'RANK_WINDOW', 3)
+    response = client.get('/api/v1/logs/search?q=archive&limit=2')
+    assert response.headers['X-Search-Order'] == 'rank'
+    assert [log['id'] for log in response.json] == [8, 9]
+    cursor = response.headers['X-Next-Cursor']
+    response = client.get(f'/api/v1/logs/search?q=archive&limit=2&cursor={cursor}')
+    assert [log['id'] for log in response.json] == [10]
+    assert 'X-Next-Cursor' not in response.headers
+    response = client.get('/api/v1/logs/search?q=archive&order=recent&limit=4')
+    assert [log['id'] for log in response.json] == [10, 9, 8, 7]
+
+    assert client.get('/api/v1/logs/search').status_code == 400
+    assert client.get('/api/v1/logs/search?q=a&order=oldest').status_code == 400
+    assert client.get('/api/v1/logs/search?q=NEAR(%22x).%20AND').status_code == 200
+
+def test_search_highlight_escapes_log_text(app, client):
+    """Test highlights escape client-supplied text around the <mark> markers"""
+    _seed_logs(app, 1, error_message='<script>alert(1)</script> timeout & retry')
+    response = client.get('/api/v1/logs/search?q=timeout')
+    assert response.json[0]['highlight']['error_message'] == (
+        '&lt;script&gt;alert(1)&lt;/script&gt; <mark>timeout</mark> &amp; retry'
+    )
+
+def test_search_index_rebuild_command(app, runner):
+    """Test the rebuild command indexes rows written around the triggers"""
+    from sqlalchemy import text
+    _seed_logs(app, 2, error_message='permission denied')
+    with app.app_context():
+        db.session.execute(text("INSERT INTO log_fts(log_fts) VALUES ('delete-all')"))
+        db.session.commit()
+
+    result = runner.invoke(args=['log-search', 'rebuild'])
+    assert 'rebuilt' in result.output
+    with app.test_client() as client:
+        assert len(client.get('/api/v1/logs/search?q=denied').json) == 2
+
+def test_rollups_follow_task_writes(app):
+    """Test rollup counters track inserts, status changes and deletes"""
+    from app import rollups
+    from app.models import Task
+    _seed_tasks(app, 3)
+    with app.app_context():
+        assert rollups.task_status_totals() == {'pending': 3}
+
+        task = db.session.get(Task, 1)
+        task.status = 'completed'
+        db.session.delete(db.session.get(Task, 2))
+        db.session.commit()
+
+        assert rollups.task_status_totals() == {'pending': 1, 'completed': 1}
+        assert rollups.task_priority_totals() == {'medium': 2}
+
+def test_rollups_follow_task_recovery(app):
+    """Test recovering interrupted tasks keeps the status rollups in step"""
+    import threading
+    from app import rollups
+    from app.models import Task
+    task_manager = app.extensions['task_manager']
+    release = threading.Event()
+    task_manager.register_handler('hold', lambda context: release.wait(5))
+    task = task_manager.create_task(title='Interrupted', task_type='hold')
+    with app.app_context():
+        row = db.session.get(Task, task.id)
+        row.status = 'running'
+        row.owner = task_manager.node_id
+        db.session.commit()
+
+    assert task_manager.recover() == [task.id]
+    deadline = datetime.utcnow() + timedelta(seconds=5)
+    while task_manager.get_task(task.id).status != 'running':
+        assert datetime.utcnow() < deadline
+    with app.app_context():
+        assert rollups.task_status_totals() == {'running': 1}
+    release.set()
+
+def test_rollups_rebuild_command(app, runner):
+    """Test the rebuild command recomputes counters from the source tables"""
+    from app import rollups
+    from app.models import TaskDailyStat, LogDailyStat
+    _seed_tasks(app, 2, status='completed', priority='high')
+    _seed_logs(app, 3, error_message='timeout')
+    with app.app_context():
+        db.session.query(TaskDailyStat).delete()
+        db.session.query(LogDailyStat).delete()
+        db.session.commit()
+
+    result = runner.invoke(args=['rollups', 'rebuild'])
+    assert 'rebuilt' in result.output
+
+    with app.app_context():
+        assert rollups.task_status_totals() == {'completed': 2}
+        stat = db.session.query(LogDailyStat).one()
+        assert (stat.source_server_name, stat.total, stat.errors) == ('fs-01', 3, 3)
+
+def test_monthly_completions_use_completion_month(app, runner):
+    """Test completions are counted in the month tasks finished, not the month they were created"""
+    from app import rollups
+    from app.models import Task
+    _seed_tasks(app, 1, created_at=datetime(2024, 3, 30))
+    april = date(2024, 4, 15)
+    with app.app_context():
+        task = db.session.get(Task, 1)
+        task.status = 'completed'
+        task.finished_at = datetime(2024, 4, 2)
+        db.session.commit()
+        assert rollups.monthly_completions(2, today=april) == [(date(2024, 3, 1), 0), (date(2024, 4, 1), 1)]
+
+    runner.invoke(args=['rollups', 'rebuild'])
+    with app.app_context():
+        assert rollups.monthly_completions(2, today=april) == [(date(2024, 3, 1), 0), (date(2024, 4, 1), 1)]
+        db.session.delete(db.session.get(Task, 1))
+        db.session.commit()
+        assert rollups.monthly_completions(2, today=april)[1] == (date(2024, 4, 1), 0)
+
+def test_rollups_count_empty_error_messages_consistently(app, runner):
+    """Test an empty error message counts as an error before and after a rebuild"""
+    from app.models import LogDailyStat
+    _seed_logs(app, 2, error_message='')
+    with app.app_context():
+        assert db.session.query(LogDailyStat.errors).scalar() == 2
+    runner.invoke(args=['rollups', 'rebuild'])
+    with app.app_context():
+        assert db.session.query(LogDailyStat.errors).scalar() == 2
+
+def test_get_dashboard_charts(app, client):
+    """Test chart data is served from the rollup tables"""
+    _seed_tasks(app, 2, priority='high')
+    _seed_tasks(app, 1, status='completed', created_at=datetime.utcnow())
+
+    response = client.get('/api/v1/dashboard/charts')
+    assert response.status_code == 200
+    assert response.json['barChart']['datasets'][0]['data'] == [2, 1, 0]
+    assert response.json['pieChart']['labels'] == ['Pending', 'Completed']
+    assert response.json['lineChart']['datasets'][0]['data'][-1] == 1
+
+def test_response_cache_etag(app, client):
+    """Test cached responses carry an ETag and revalidate with 304"""
+    _seed_tasks(app, 2)
+
+    response = client.get('/api/v1/tasks')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+
+    response = client.get('/api/v1/tasks', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+def test_response_cache_invalidated_on_write(app, client):
+    """Test creating a task invalidates cached task listings"""
+    _seed_tasks(app, 1)
+    first = client.get('/api/v1/tasks')
+    assert len(first.json) == 1
+
+    assert client.post('/api/v1/tasks', json={'name': 'Another'}).status_code == 201
+
+    second = client.get('/api/v1/tasks', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert len(second.json) == 2
+
+def test_lru_cache_backend():
+    """Test LRU eviction and expiry"""
+    from app.cache import LRUCacheBackend
+    backend = LRUCacheBackend(max_entries=2)
+    backend.set('a', 1, 60)
+    backend.set('b', 2, 60)
+    backend.get('a')
+    backend.set('c', 3, 60)
+    assert backend.get('b') is None
+    assert backend.get('a') == 1
+
+    backend.set('d', 4, -1)
+    assert backend.get('d') is None
+
+def test_create_tasks_bulk(app, client):
+    """Test bulk creation returns ids and per-item errors"""
+    from app.models import Task
+    response = client.post('/api/v1/tasks/bulk', json=[
+        {'name': 'fetch'},
+        {'name': ''},
+        {'name': 'archive', 'priority': 'high'},
+        {'name': 'verify', 'priority': 'urgent'}
+    ])
+    assert response.status_code == 207
+    assert response.json['created'] == 2
+    results = response.json['results']
+    assert [r['index'] for r in results if 'errors' in r] == [1, 3]
+
+    with app.app_context():
+        for result in results:
+            if 'id' in result:
+                task = db.session.get(Task, result['id'])
+                assert task.name == ('fetch' if result['index'] == 0 else 'archive')
+
+def test_create_tasks_bulk_ndjson(app, client):
+    """Test bulk creation from an NDJSON stream spanning several chunks"""
+    from app import rollups
+    body = '\n'.join('{"name": "task-%d"}' % i for i in range(1200))
+    response = client.post('/api/v1/tasks/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 201
+    ids = [result['id'] for result in response.json['results']]
+    assert ids == list(range(1, 1201))
+
+    with app.app_context():
+        assert rollups.task_status_totals() == {'pending': 1200}
+
+def test_ingest_logs(app, client):
+    """Test ingested logs are written by the flusher"""
+    from app.ingest import log_ingest
+    from app.models import Log
+    body = '\n'.join(
+        '{"source_server_name": "fs-01", "source_server_ip": "10.0.0.1", "error_message": %s}'
+        % ('"timeout"' if i % 2 else 'null') for i in range(10)
+    )
+    response = client.post('/api/v1/logs/ingest', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 202
+    assert response.json['accepted'] == 10
+
+    log_ingest.flush()
+    with app.app_context():
+        assert db.session.query(Log).count() == 10
+        assert db.session.query(Log).filter(Log.error_message.isnot(None)).count() == 5
+
+def test_ingest_logs_validation_and_backpressure(app, client):
+    """Test invalid batches are rejected and a full queue returns 429"""
+    from app.ingest import log_ingest
+    response = client.post('/api/v1/logs/ingest', json=[{'source_server_ip': 'x' * 40}])
+    assert response.status_code == 400
+    assert response.json['results'][0]['index'] == 0
+
+    log_ingest.max_size = 5
+    response = client.post('/api/v1/logs/ingest', json=[{'source_server_name': 'fs-01'}] * 6)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+
+def test_ingest_stop_reports_rows_it_cannot_write(tmp_path, caplog):
+    """Test stop retries a locked database until its deadline, then reports the dropped rows"""
+    import sqlite3
+    import time
+    from app.ingest import log_ingest
+    from app.models import Log
+    db_path = tmp_path / 'ingest.db'
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'LOG_FILE': str(tmp_path / 'app.log'),
+        'SQLITE_PRAGMAS': {'busy_timeout': 50},
+        'LOG_INGEST_STOP_TIMEOUT_MS': 500
+    })
+    lock = sqlite3.connect(db_path)
+    lock.execute('BEGIN EXCLUSIVE')
+    try:
+        log_ingest.submit([{'source_server_name': 'fs-01', 'source_server_ip': '10.0.0.1'}] * 3)
+        started = time.monotonic()
+        log_ingest.stop()
+        assert time.monotonic() - started >= 0.5
+    finally:
+        lock.rollback()
+        lock.close()
+
+    assert 'Log ingest dropped 3 queued rows at shutdown' in caplog.text
+    assert log_ingest.depth() == 0
+    with app.app_context():
+        assert db.session.query(Log).count() == 0
+
+def test_sqlite_profile_pragmas(tmp_path):
+    """Test the tuning profile pools connections and applies its pragmas"""
+    from sqlalchemy.pool import QueuePool
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'tuned.db'}",
+        'LOG_FILE': str(tmp_path / 'app.log'),
+        'SQLITE_PRAGMAS': {'busy_timeout': 1234}
+    })
+    with app.app_context():
+        assert isinstance(db.engine.pool, QueuePool)
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert connection.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+            assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == 1234
+        db.engine.dispose()
+
+def test_task_control_routes(app, client):
+    """Test start, pause, resume and cancel through the API"""
+    _seed_tasks(app, 1)
+
+    response = client.post('/api/v1/tasks/1/pause')
+    assert response.status_code == 200
+    assert response.json['status'] == 'paused'
+
+    response = client.post('/api/v1/tasks/1/resume')
+    assert response.json['status'] in ('queued', 'running')
+    assert client.post('/api/v1/tasks/1/start').status_code == 409
+
+    response = client.post('/api/v1/tasks/1/cancel')
+    assert response.json['status'] == 'cancelled'
+    assert client.post('/api/v1/tasks/1/resume').status_code == 400
+    assert client.get('/api/v1/tasks/1').json['status'] == 'cancelled'
+    assert client.post('/api/v1/tasks/99/start').status_code == 404
+
+def test_create_task_dependency_chain(app, client):
+    """Test a dependency chain built over the API runs parents first"""
+    order = []
+    app.extensions['task_manager'].register_handler('step', lambda context: order.append(context.task_id))
+
+    fetch = client.post('/api/v1/tasks', json={'name': 'fetch', 'task_type': 'step', 'priority': 'high'})
+    assert fetch.status_code == 201
+    fetch_id = fetch.json['id']
+    archive = client.post('/api/v1/tasks', json={
+        'name': 'archive', 'task_type': 'step', 'payload': {'dest': '/archive'},
+        'retry_policy': {'max_attempts': 3}, 'depends_on': [fetch_id]
+    })
+    assert archive.status_code == 201
+    archive_id = archive.json['id']
+    assert archive.json['depends_on'] == [fetch_id]
+    assert archive.json['status'] == 'pending'
+
+    assert client.post(f'/api/v1/tasks/{archive_id}/start').json['status'] == 'waiting'
+    client.post(f'/api/v1/tasks/{fetch_id}/start')
+    deadline = datetime.utcnow() + timedelta(seconds=5)
+    while client.get(f'/api/v1/tasks/{archive_id}').json['status'] != 'completed':
+        assert datetime.utcnow() < deadline
+    assert order == [fetch_id, archive_id]
+
+def test_task_dependency_errors(app, client):
+    """Test unknown parents and cycles are rejected with 400"""
+    first = client.post('/api/v1/tasks', json={'name': 'first'}).json['id']
+    second = client.post('/api/v1/tasks', json={'name': 'second', 'depends_on': [first]}).json['id']
+
+    response = client.post('/api/v1/tasks', json={'name': 'orphan', 'depends_on': [99]})
+    assert response.status_code == 400
+    assert response.json['code'] == 'INVALID_DEPENDENCY'
+    response = client.patch(f'/api/v1/tasks/{first}', json={'depends_on': [second]})
+    assert response.status_code == 400
+    assert response.json['code'] == 'DEPENDENCY_CYCLE'
+    assert client.get(f'/api/v1/tasks/{first}').json['depends_on'] == []
+
+    assert client.post('/api/v1/tasks', json={'name': 'x', 'depends_on': 'all'}).status_code == 400
+    assert client.post('/api/v1/tasks', json={'name': 'x', 'owner': 'n1'}).status_code == 400
+    assert client.post('/api/v1/tasks', json={'description': 'no name'}).json['code'] == 'INVALID_TITLE'
+
+def test_dead_letter_routes(app, client):
+    """Test listing and requeueing tasks that ran out of retries"""
+    from src.modules.tasks.exceptions import TaskError
+    from src.modules.tasks.retry import RetryPolicy
+    runs = []
+
+    def handler(context):
+        runs.append(context.task_id)
+        if len(runs) <= 2:
+            raise TaskError('REMOTE_UNREACHABLE', 'Connection reset')
+
+    task_manager = app.extensions['task_manager']
+    task_manager.register_handler('fetch', handler, retry=RetryPolicy(max_attempts=2, base_delay=0.01))
+    task = task_manager.create_task(title='Fetch', task_type='fetch')
+    client.post(f'/api/v1/tasks/{task.id}/start')
+
+    deadline = datetime.utcnow() + timedelta(seconds=5)
+    while client.get(f'/api/v1/tasks/{task.id}').json['status'] != 'dead_letter':
+        assert datetime.utcnow() < deadline
+
+    response = client.get('/api/v1/tasks/dead-letter')
+    assert [item['id'] for item in response.json] == [task.id]
+    assert response.json[0]['attempts'] == 2
+    assert response.json[0]['error']['code'] == 'REMOTE_UNREACHABLE'
+
+    assert client.post('/api/v1/tasks/dead-letter/requeue', json={'ids': 'all'}).status_code == 400
+    response = client.post('/api/v1/tasks/dead-letter/requeue', json={'ids': [task.id]})
+    assert response.json == {'requeued': [task.id]}
+    while client.get(f'/api/v1/tasks/{task.id}').json['status'] != 'completed':
+        assert datetime.utcnow() < deadline + timedelta(seconds=5)
+
+def test_task_result_route(app, client):
+    """Test a handler's recorded result is served by /tasks/<id>/result"""
+    task_manager = app.extensions['task_manager']
+    task_manager.register_handler('summary', lambda context: context.set_result({'files_copied': 3}))
+    task = task_manager.create_task(title='Summary', task_type='summary')
+    response = client.get(f'/api/v1/tasks/{task.id}/result')
+    assert response.json == {'id': task.id, 'status': 'pending', 'result': None}
+
+    client.post(f'/api/v1/tasks/{task.id}/start')
+    deadline = datetime.utcnow() + timedelta(seconds=5)
+    while client.get(f'/api/v1/tasks/{task.id}').json['status'] != 'completed':
+        assert datetime.utcnow() < deadline
+    response = client.get(f'/api/v1/tasks/{task.id}/result')
+    assert response.json['result'] == {'files_copied': 3}
+    assert client.get('/api/v1/tasks/99/result').status_code == 404
+
+def test_logging_pipeline_json_rotation(tmp_path):
+    """Test records are written as JSON lines and rotated files are compressed"""
+    import gzip
+    import json
+    import logging
+    from app.logging_setup import configure_logging, stop_logging
+    log_file = tmp_path / 'app.log'
+    configure_logging({'LOG_FILE': str(log_file), 'LOG_MAX_BYTES': 2000, 'LOG_BACKUP_COUNT': 2})
+
+    logger = logging.getLogger('pipeline-test')
+    for i in range(40):
+        logger.info('Transfer %s done', i, extra={'task_id': i})
+    stop_logging()
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert entries[-1]['message'] == 'Transfer 39 done'
+    assert entries[-1]['task_id'] == 39
+    assert entries[-1]['logger'] == 'pipeline-test'
+    with gzip.open(tmp_path / 'app.log.1.gz', 'rt') as f:
+        assert json.loads(f.readline())['level'] == 'INFO'
+    assert not (tmp_path / 'app.log.3.gz').exists()
+
+def test_logging_pipeline_reports_dropped_records(tmp_path):
+    """Test records dropped on a full queue are counted and reported at shutdown"""
+    import json
+    import logging
+    import threading
+    from app import logging_setup
+    release = threading.Event()
+
+    class BlockingHandler(logging.Handler):
+        def emit(self, record):
+            release.wait(5)
+
+    log_file = tmp_path / 'app.log'
+    logging_setup.configure_logging({'LOG_FILE': str(log_file), 'LOG_QUEUE_SIZE': 1})
+    listener = logging_setup._pipeline.listener
+    listener.handlers = listener.handlers + (BlockingHandler(),)
+    logger = logging.getLogger('dropped-test')
+    for i in range(10):
+        logger.warning('Burst %s', i)
+    dropped = logging_setup.dropped_log_records()
+    assert dropped >= 8
+    release.set()
+    logging_setup.stop_logging()
+
+    last = json.loads(log_file.read_text().splitlines()[-1])
+    assert last['level'] == 'WARNING'
+    assert last['dropped'] == dropped
+
+def test_file_upload_download_range(app, client):
+    """Test multipart upload, listing, ranged download and delete"""
+    import io
+    content = bytes(range(256)) * 64
+    response = client.post('/api/v1/files', data={
+        'files': [(io.BytesIO(content), 'data.bin'), (io.BytesIO(b'hello'), 'hello.txt')]
+    }, content_type='multipart/form-data')
+    assert response.status_code == 201
+    file_id = response.json[0]['id']
+    assert response.json[0]['size'] == len(content)
+
+    files = client.get('/api/v1/files').json
+    assert sorted(f['name'] for f in files) == ['data.bin', 'hello.txt']
+
+    response = client.get(f'/api/v1/files/{file_id}', headers={'Range': 'bytes=100-199'})
+    assert response.status_code == 206
+    assert response.data == content[100:200]
+    assert response.headers['Content-Range'] == f'bytes 100-199/{len(content)}'
+    response = client.get(f'/api/v1/files/{file_id}')
+    assert response.status_code == 200
+    assert response.data == content
+    assert 'data.bin' in response.headers['Content-Disposition']
+
+    assert client.delete(f'/api/v1/files/{file_id}').status_code == 204
+    assert client.get(f'/api/v1/files/{file_id}').status_code == 404
+
+    response = client.post('/api/v1/files?name=raw.txt', data=b'raw body', content_type='text/plain')
+    assert response.status_code == 201
+    assert response.json[0]['size'] == 8
+
+def test_rejected_multipart_part_stores_nothing(app, client):
+    """Test that a multipart upload with an invalid part keeps none of its files"""
+    import io
+    response = client.post('/api/v1/files', data={
+        'files': [(io.BytesIO(b'first'), 'first.txt'), (io.BytesIO(b'second'), '   ')]
+    }, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.json['code'] == 'INVALID_FILE_NAME'
+    assert client.get('/api/v1/files').json == []
+    storage_dir = app.extensions['file_manager'].storage_dir
+    assert [name for name in os.listdir(storage_dir) if os.path.isfile(os.path.join(storage_dir, name))] == []
+
+def test_resumable_upload_routes(app, client):
+    """Test chunked upload with an offset conflict and completion"""
+    response = client.post('/api/v1/files/uploads', json={'name': 'big.bin', 'size': 10})
+    assert response.status_code == 201
+    upload_id = response.json['id']
+    location = response.headers['Location']
+
+    response = client.patch(location, data=b'abcd', headers={'Upload-Offset': '0'})
+    assert response.headers['Upload-Offset'] == '4'
+    response = client.patch(location, data=b'abcd', headers={'Upload-Offset': '0'})
+    assert response.status_code == 409
+    assert response.json['offset'] == 4
+    assert client.post(f'{location}/complete').status_code == 409
+
+    assert client.head(location).headers['Upload-Offset'] == '4'
+    client.patch(location, data=b'efghij', headers={'Upload-Offset': '4'})
+    response = client.post(f'{location}/complete')
+    assert response.status_code == 201
+    assert client.get(f"/api/v1/files/{response.json['id']}").data == b'abcdefghij'
+
+    assert client.get(f'/api/v1/files/uploads/{upload_id}').status_code == 404
+    assert client.post(f'{location}/complete').json['id'] == response.json['id']
+    response = client.patch(location, data=b'k', headers={'Upload-Offset': '10'})
+    assert response.status_code == 409
+    assert response.json['code'] == 'UPLOAD_COMPLETED'
+    assert client.patch(location, data=b'x', headers={'Upload-Offset': 'x'}).status_code == 400
+    assert client.post('/api/v1/files/uploads', json={'name': 'a', 'size': 'big'}).status_code == 400
+
+def test_verify_files(app, client):
+    """Test batch checksum verification of stored files"""
+    import hashlib
+    response = client.post('/api/v1/files', data=b'verify me', query_string={'name': 'v.txt'})
+    file_id = response.json[0]['id']
+    sha256 = hashlib.sha256(b'verify me').hexdigest()
+
+    response = client.post('/api/v1/files/verify', json={
+        'files': [{'file_id': file_id, 'expected': {'sha256': sha256}}, {'file_id': 999}],
+        'algorithms': ['md5']
+    })
+    assert response.status_code == 200
+    first, missing = response.json['results']
+    assert first['matches'] is True
+    assert first['checksums']['md5'] == hashlib.md5(b'verify me').hexdigest()
+    assert missing['error']['code'] == 'FILE_NOT_FOUND'
+    assert (response.json['matched'], response.json['failed']) == (1, 1)
+
+    response = client.post('/api/v1/files/verify', json={'files': [{'file_id': file_id}], 'algorithms': ['md5']})
+    assert response.json['results'][0]['cached'] is True
+    assert client.post('/api/v1/files/verify', json={'files': [{'path': '../x'}]}).status_code == 400
+    assert client.post('/api/v1/files/verify', json={'files': []}).status_code == 400
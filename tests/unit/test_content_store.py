@@ -0,0 +1,69 @@
+import os
+import pytest
+from sqlalchemy import create_engine
+from app.models import db
+from src.modules.files.content_store import ContentStore, hash_file
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'store.db'}")
+    db.metadata.create_all(engine)
+    return engine
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+def test_add_and_materialize(engine, tmp_path):
+    store = ContentStore(engine, str(tmp_path / 'store'))
+    source = _write(tmp_path / 'a.bin', b'x' * 5000)
+    digest = store.add(source, location='http://files/a.bin', version='"v1"')
+
+    assert digest == hash_file(source)
+    assert os.path.exists(store.object_path(digest))
+    assert store.lookup('http://files/a.bin', 5000, '"v1"') == digest
+    assert store.lookup('http://files/a.bin', 5000, '"v2"') is None
+
+    destination = str(tmp_path / 'out.bin')
+    assert store.materialize(digest, destination) in ('reflink', 'hardlink')
+    with open(destination, 'rb') as f:
+        assert f.read() == b'x' * 5000
+
+    copy_store = ContentStore(engine, str(tmp_path / 'store'), link_modes=('copy',))
+    assert copy_store.materialize(digest, str(tmp_path / 'copy.bin')) == 'copy'
+
+def test_file_digest_skips_unchanged_files(engine, tmp_path, monkeypatch):
+    store = ContentStore(engine, str(tmp_path / 'store'))
+    path = _write(tmp_path / 'a.bin', b'first')
+    digest = store.file_digest(path)
+
+    calls = []
+    monkeypatch.setattr('src.modules.files.content_store.hash_file', lambda p: calls.append(p) or 'rehashed')
+    assert store.file_digest(path) == digest
+    assert calls == []
+
+    _write(tmp_path / 'a.bin', b'second')
+    assert store.file_digest(path) == 'rehashed'
+
+def test_least_recently_used_objects_are_evicted(engine, tmp_path):
+    store = ContentStore(engine, str(tmp_path / 'store'), max_bytes=2500)
+    digests = [store.add(_write(tmp_path / f'{i}.bin', bytes([i]) * 1000)) for i in range(2)]
+    # Using the first object makes the second the least recently used
+    assert store.materialize(digests[0], str(tmp_path / 'used.bin'))
+    third = store.add(_write(tmp_path / '2.bin', b'\x02' * 1000))
+
+    assert store.size() == 2000
+    assert not os.path.exists(store.object_path(digests[1]))
+    assert store.materialize(digests[1], str(tmp_path / 'gone.bin')) is None
+    assert store.materialize(third, str(tmp_path / 'third.bin'))
+
+def test_changed_object_is_dropped(engine, tmp_path):
+    store = ContentStore(engine, str(tmp_path / 'store'), link_modes=('hardlink',))
+    source = _write(tmp_path / 'a.bin', b'original')
+    digest = store.add(source)
+    # The source shares its inode with the object; writing to it changes the object
+    _write(tmp_path / 'a.bin', b'modified!')
+
+    assert store.materialize(digest, str(tmp_path / 'out.bin')) is None
+    assert not os.path.exists(store.object_path(digest))
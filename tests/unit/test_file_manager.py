@@ -0,0 +1,108 @@
+import io
+import fcntl
+import os
+import pytest
+from sqlalchemy import create_engine
+from app.models import db
+from src.modules.files.file_manager import FileManager
+from src.modules.files.exceptions import (
+    FileValidationError, StoredFileNotFoundError, UploadConflictError, UploadNotFoundError
+)
+
+class BrokenStream(io.BytesIO):
+    """Yields its bytes, then fails like a dropped client connection"""
+    def read(self, size=-1):
+        data = super().read(size)
+        if not data:
+            raise ConnectionResetError('client went away')
+        return data
+
+@pytest.fixture
+def file_manager(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'files.db'}")
+    db.metadata.create_all(engine)
+    return FileManager(engine, str(tmp_path / 'storage'), chunk_size=4)
+
+def test_save_stream_and_delete(file_manager):
+    stored = file_manager.save_stream(io.BytesIO(b'hello world'), '../../etc/report.txt', 'text/plain')
+    assert stored.name == 'report.txt'
+    assert stored.size == 11
+    with open(file_manager.path(stored), 'rb') as f:
+        assert f.read() == b'hello world'
+
+    file_manager.delete_file(stored.id)
+    assert not os.path.exists(file_manager.path(stored))
+    with pytest.raises(StoredFileNotFoundError):
+        file_manager.get_file(stored.id)
+
+def test_resumable_upload(file_manager):
+    upload = file_manager.create_upload('data.bin', size=10)
+
+    # The connection drops after 6 bytes; they are kept and counted
+    with pytest.raises(ConnectionResetError):
+        file_manager.write_chunk(upload.id, 0, BrokenStream(b'abcdef'))
+    assert file_manager.get_upload(upload.id).offset == 6
+
+    with pytest.raises(UploadConflictError) as excinfo:
+        file_manager.write_chunk(upload.id, 4, io.BytesIO(b'efghij'))
+    assert excinfo.value.offset == 6
+    with pytest.raises(UploadConflictError):
+        file_manager.complete_upload(upload.id)
+
+    assert file_manager.write_chunk(upload.id, 6, io.BytesIO(b'ghij')).offset == 10
+    stored = file_manager.complete_upload(upload.id)
+    with open(file_manager.path(stored), 'rb') as f:
+        assert f.read() == b'abcdefghij'
+    with pytest.raises(UploadNotFoundError):
+        file_manager.get_upload(upload.id)
+
+def test_upload_limits(file_manager):
+    upload = file_manager.create_upload('data.bin', size=4)
+    with pytest.raises(FileValidationError) as excinfo:
+        file_manager.write_chunk(upload.id, 0, io.BytesIO(b'abcdef'))
+    assert excinfo.value.code == 'UPLOAD_TOO_LARGE'
+    assert file_manager.get_upload(upload.id).offset == 4
+
+    with pytest.raises(FileValidationError):
+        file_manager.create_upload('', size=1)
+    with pytest.raises(FileValidationError):
+        file_manager.create_upload('a.bin', size=-1)
+
+def test_concurrent_chunk_is_rejected(file_manager):
+    upload = file_manager.create_upload('data.bin')
+    with open(file_manager.part_path(upload.id), 'r+b') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        with pytest.raises(UploadConflictError) as excinfo:
+            file_manager.write_chunk(upload.id, 0, io.BytesIO(b'abc'))
+    assert excinfo.value.code == 'UPLOAD_BUSY'
+
+    file_manager.abort_upload(upload.id)
+    assert not os.path.exists(file_manager.part_path(upload.id))
+
+def test_completion_is_locked_and_idempotent(file_manager):
+    upload = file_manager.create_upload('data.bin', size=3)
+    file_manager.write_chunk(upload.id, 0, io.BytesIO(b'abc'))
+    with open(file_manager.part_path(upload.id), 'r+b') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        with pytest.raises(UploadConflictError) as excinfo:
+            file_manager.complete_upload(upload.id)
+    assert excinfo.value.code == 'UPLOAD_BUSY'
+
+    stored = file_manager.complete_upload(upload.id)
+    assert file_manager.complete_upload(upload.id).id == stored.id
+    with pytest.raises(UploadConflictError) as excinfo:
+        file_manager.write_chunk(upload.id, 3, io.BytesIO(b'd'))
+    assert excinfo.value.code == 'UPLOAD_COMPLETED'
+    with pytest.raises(UploadConflictError):
+        file_manager.abort_upload(upload.id)
+    with pytest.raises(UploadNotFoundError):
+        file_manager.complete_upload('0' * 32)
+
+def test_save_stream_stops_at_max_size(file_manager):
+    file_manager.max_size = 8
+    stream = io.BytesIO(b'x' * 1000)
+    with pytest.raises(FileValidationError) as excinfo:
+        file_manager.save_stream(stream, 'big.bin')
+    assert excinfo.value.code == 'FILE_TOO_LARGE'
+    assert stream.tell() == 9
+    assert os.listdir(file_manager.upload_dir) == []
@@ -0,0 +1,243 @@
+import json
+import pytest
+import socketserver
+import threading
+import time
+from sqlalchemy import create_engine, select
+from app.models import Log, LogDailyStat
+from src.modules.logs.log_manager import (
+    EmailNotificationHandler, LogManager, LogNotFoundError, NotificationHandler
+)
+from src.modules.logs.notifications import NotificationDispatcher
+from src.modules.settings import settings_manager
+from src.modules.settings.settings_manager import SMTPConfig
+from src.modules.logs.error_rate import ErrorRateDetector
+from src.modules.logs.log_store import FileLogSink, LogStore, LogTableSink
+
+class RecordingHandler(NotificationHandler):
+    def __init__(self, failures=0):
+        self.messages = []
+        self.batches = []
+        self.failures = failures
+
+    def send(self, message):
+        self.messages.append(message)
+
+    def send_batch(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('SMTP server unavailable')
+        self.batches.append(list(messages))
+        self.messages.extend(messages)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_detector_alerts_once_per_crossing(clock):
+    detector = ErrorRateDetector({'error': [(60, 3)]}, clock=clock)
+
+    assert detector.record('error') == []
+    assert detector.record('error') == []
+    assert detector.record('error') == [(3, 60)]
+    assert detector.record('error') == []
+    assert detector.record('warning') == []
+
+    # Once the old events leave the window the next crossing alerts again
+    clock.now += 61
+    assert detector.record('error') == []
+    assert detector.record('error') == []
+    assert detector.record('error') == [(3, 60)]
+    assert detector.counts('error') == {60: 3}
+
+def test_detector_multiple_windows(clock):
+    detector = ErrorRateDetector({'error': [(10, 2), (3600, 4)]}, clock=clock)
+    alerts = []
+    for _ in range(4):
+        alerts.extend(detector.record('error'))
+        clock.now += 20
+    assert alerts == [(4, 3600)]
+
+    clock.now += 1
+    alerts = detector.record('error')
+    assert alerts == []
+    assert detector.record('error') == [(2, 10)]
+
+def test_log_event_notifies_when_threshold_crossed():
+    manager = LogManager(error_windows={'error': [(60, 3)], 'login_failed': [(60, 2)]})
+    handler = RecordingHandler()
+    manager.add_notification_handler(handler)
+    manager.start_monitoring()
+
+    manager.log_event('login_failed', 'Bad password')
+    manager.log_event('login_failed', 'Bad password')
+    assert manager.flush_notifications()
+    assert handler.messages == ['High login_failed rate detected: 2 login_failed events in last 60 seconds']
+
+    handler.messages.clear()
+    for _ in range(3):
+        manager.log_event('error', 'Transfer failed')
+    assert manager.flush_notifications()
+    assert handler.messages[-1] == 'High error rate detected: 3 error events in last 60 seconds'
+    assert handler.messages.count('Error logged: Transfer failed') == 3
+
+    manager.stop_monitoring()
+    handler.messages.clear()
+    manager.log_event('error', 'Transfer failed')
+    assert manager.flush_notifications()
+    assert handler.messages == []
+
+def test_log_store_evicts_and_keeps_indexes_bounded(tmp_path):
+    sink = FileLogSink(str(tmp_path / 'spill.jsonl'))
+    store = LogStore(capacity=3, sink=sink, spill_batch=2)
+    for i in range(6):
+        store.append('error' if i % 2 else 'info', f'event {i}', {'task_id': i % 2})
+
+    assert len(store) == 3
+    assert [record.message for record in store.find({'event_type': 'error'})] == ['event 3', 'event 5']
+    assert [record.message for record in store.find({'task_id': 0})] == ['event 4']
+    assert sum(len(entries) for entries in store._by_metadata.values()) == 3
+
+    spilled = [json.loads(line) for line in (tmp_path / 'spill.jsonl').read_text().splitlines()]
+    assert [entry['message'] for entry in spilled] == ['event 0', 'event 1']
+    store.flush()
+    assert len((tmp_path / 'spill.jsonl').read_text().splitlines()) == 3
+
+def test_log_table_sink(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    Log.metadata.create_all(engine)
+    store = LogStore(capacity=1, sink=LogTableSink(engine), spill_batch=1)
+    store.append('error', 'Checksum mismatch', {'task_id': 7, 'source_server_name': 'fs-01'})
+    store.append('info', 'Done', {})
+
+    with engine.connect() as connection:
+        row = connection.execute(select(Log.task_id, Log.source_server_name, Log.error_message)).one()
+    assert tuple(row) == (7, 'fs-01', 'Checksum mismatch')
+    with engine.connect() as connection:
+        stat = connection.execute(select(LogDailyStat.total, LogDailyStat.errors)).one()
+    assert tuple(stat) == (1, 1)
+
+def test_log_store_survives_failing_sink():
+    def sink(records):
+        raise RuntimeError('database is locked')
+    store = LogStore(capacity=1, sink=sink, spill_batch=1)
+    store.append('info', 'first', {})
+    store.append('info', 'second', {})
+    assert [record.message for record in store.find()] == ['second']
+    assert store._evicted == []
+
+def test_log_manager_filters_through_store():
+    manager = LogManager(capacity=100)
+    manager.log_event('login', 'User signed in', {'user_id': 1})
+    manager.log_event('login', 'User signed in', {'user_id': 2})
+    manager.log_event('error', 'Upload failed', {'user_id': 1, 'tags': ['upload']})
+
+    assert [log['event_type'] for log in manager.get_logs({'user_id': 1})] == ['login', 'error']
+    assert manager.get_logs({'event_type': 'login', 'user_id': 2})[0]['metadata'] == {'user_id': 2}
+    assert len(manager.get_logs({'tags': ['upload']})) == 1
+    with pytest.raises(LogNotFoundError):
+        manager.get_logs({'event_type': 'logout'})
+    manager.clear_logs()
+    assert manager.logs == []
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('Condition not met in time')
+        time.sleep(0.01)
+
+def test_dispatcher_coalesces_and_rate_limits():
+    dispatcher = NotificationDispatcher()
+    handler = RecordingHandler()
+    dispatcher.add_handler(handler, batch_window=0.2, max_per_minute=1)
+
+    started = time.monotonic()
+    for i in range(50):
+        dispatcher.submit(f'Error {i}')
+    assert time.monotonic() - started < 0.1
+    wait_until(lambda: handler.batches)
+    assert handler.batches == [[f'Error {i}' for i in range(50)]]
+
+    # The per-minute budget is spent, so later messages wait for a flush
+    dispatcher.submit('Error 50')
+    time.sleep(0.3)
+    assert len(handler.batches) == 1
+    assert dispatcher.flush()
+    assert handler.batches[-1] == ['Error 50']
+    dispatcher.stop()
+
+def test_dispatcher_retries_failed_batches():
+    dispatcher = NotificationDispatcher()
+    handler = RecordingHandler(failures=2)
+    dispatcher.add_handler(handler, batch_window=0, max_per_minute=None, retry_delay=0.01)
+    dispatcher.submit('Disk full')
+
+    wait_until(lambda: handler.batches)
+    assert handler.batches == [['Disk full']]
+    dispatcher.stop()
+
+class SMTPStandIn(socketserver.StreamRequestHandler):
+    """Minimal SMTP server recording the DATA of each message"""
+    received = []
+
+    def handle(self):
+        self.wfile.write(b'220 localhost\r\n')
+        while True:
+            line = self.rfile.readline().decode()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == 'EHLO':
+                self.wfile.write(b'250 localhost\r\n')
+            elif command == 'DATA':
+                self.wfile.write(b'354 End with .\r\n')
+                data = []
+                while True:
+                    line = self.rfile.readline().decode()
+                    if line == '.\r\n':
+                        break
+                    data.append(line)
+                self.received.append(''.join(data))
+                self.wfile.write(b'250 OK\r\n')
+            elif command == 'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+def test_email_handler_sends_digest_over_smtp():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    SMTPStandIn.received.clear()
+    config = SMTPConfig(host='127.0.0.1', port=server.server_address[1], use_tls=False,
+                        from_email='alerts@example.com')
+    handler = EmailNotificationHandler(['ops@example.com', 'dev@example.com'], smtp_config=config)
+
+    handler.send_batch(['Error 1', 'Error 2'])
+    server.shutdown()
+    server.server_close()
+
+    message = SMTPStandIn.received[0]
+    assert 'Subject: 2 system notifications' in message
+    assert 'To: ops@example.com, dev@example.com' in message
+    assert '- Error 1' in message and '- Error 2' in message
+
+def test_email_handler_follows_settings_manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings_manager, '_shared', None)
+    handler = EmailNotificationHandler('ops@example.com')
+
+    settings_manager.get_settings_manager().update_smtp_settings(
+        {'host': 'mail.internal', 'port': 2525, 'from_email': 'alerts@internal'}
+    )
+
+    config = handler._config()
+    assert (config.host, config.port, config.from_email) == ('mail.internal', 2525, 'alerts@internal')
@@ -0,0 +1,64 @@
+import pytest
+import threading
+import time
+from src.modules.tasks.scheduler import PriorityScheduler
+
+@pytest.fixture
+def scheduler():
+    scheduler = PriorityScheduler(max_workers=1, aging=60.0)
+    yield scheduler
+    scheduler.shutdown()
+
+def blocker():
+    """Job holding a worker slot until released"""
+    release = threading.Event()
+    return release, lambda: release.wait(5)
+
+def test_higher_priority_runs_first(scheduler):
+    order = []
+    done = threading.Event()
+    release, block = blocker()
+    scheduler.submit('low', block)
+
+    scheduler.submit('low', order.append, 'low')
+    scheduler.submit('medium', order.append, 'medium')
+    scheduler.submit('high', order.append, 'high')
+    scheduler.submit('low', done.set)
+    release.set()
+
+    assert done.wait(5)
+    assert order == ['high', 'medium', 'low']
+
+def test_aging_prevents_starvation():
+    scheduler = PriorityScheduler(max_workers=1, aging=0.05)
+    order = []
+    done = threading.Event()
+    release, block = blocker()
+    scheduler.submit('high', block)
+
+    scheduler.submit('low', order.append, 'old-low')
+    time.sleep(0.15)
+    scheduler.submit('high', order.append, 'new-high')
+    scheduler.submit('low', done.set)
+    release.set()
+
+    assert done.wait(5)
+    assert order == ['old-low', 'new-high']
+    scheduler.shutdown()
+
+def test_priority_quotas_and_metrics():
+    scheduler = PriorityScheduler(max_workers=3, quotas={'low': 1})
+    release, block = blocker()
+    for _ in range(3):
+        scheduler.submit('low', block)
+
+    metrics = scheduler.metrics()['priorities']
+    assert metrics['low']['running'] == 1
+    assert metrics['low']['queued'] == 2
+    assert metrics['low']['wait_p99'] is not None
+
+    started = threading.Event()
+    scheduler.submit('high', started.set)
+    assert started.wait(5)
+    release.set()
+    scheduler.shutdown()
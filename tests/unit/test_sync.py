@@ -0,0 +1,91 @@
+import os
+import time
+import pytest
+from sqlalchemy import create_engine, select
+from app.models import FileState, Log, db
+from src.modules.files.exceptions import FileValidationError
+from src.modules.files.sync import DirectorySync, scan_tree
+from src.modules.tasks.task_manager import TaskManager
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sync.db'}")
+    db.metadata.create_all(engine)
+    return engine
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / 'source'
+    for name, size in (('a.txt', 10), ('sub/b.bin', 2000), ('sub/deep/c.bin', 3000)):
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(os.urandom(size))
+    return root
+
+@pytest.fixture
+def directory_sync(engine, tmp_path):
+    return DirectorySync(engine, destination_root=str(tmp_path / 'dest'), scan_workers=3, copy_workers=2)
+
+def test_scan_tree(source):
+    os.symlink(source / 'a.txt', source / 'link.txt')
+    files, errors = scan_tree(str(source))
+    assert sorted(files) == ['a.txt', 'sub/b.bin', 'sub/deep/c.bin']
+    assert files['sub/b.bin'][0] == 2000
+    assert errors == []
+
+def test_only_changed_files_are_copied(directory_sync, source, engine, tmp_path):
+    first = directory_sync.sync(str(source), 'mirror', source_server_name='fs-01')
+    assert (first.files_copied, first.bytes_copied, first.files_unchanged) == (3, 5010, 0)
+    assert (tmp_path / 'dest/mirror/sub/deep/c.bin').read_bytes() == (source / 'sub/deep/c.bin').read_bytes()
+
+    second = directory_sync.sync(str(source), 'mirror', source_server_name='fs-01')
+    assert (second.files_copied, second.files_unchanged, second.bytes_saved) == (0, 3, 5010)
+
+    (source / 'sub/b.bin').write_bytes(b'changed')
+    (source / 'a.txt').unlink()
+    third = directory_sync.sync(str(source), 'mirror', source_server_name='fs-01', delete=True)
+    assert (third.files_copied, third.bytes_copied, third.files_deleted) == (1, 7, 1)
+    assert (tmp_path / 'dest/mirror/sub/b.bin').read_bytes() == b'changed'
+    assert not (tmp_path / 'dest/mirror/a.txt').exists()
+
+    with engine.connect() as connection:
+        paths = sorted(row.path for row in connection.execute(select(FileState)))
+        assert paths == [str(source / 'sub/b.bin'), str(source / 'sub/deep/c.bin')]
+        assert len(connection.execute(select(Log)).fetchall()) == 3
+
+def test_missing_destination_copy_is_restored(directory_sync, source, tmp_path):
+    directory_sync.sync(str(source), 'mirror')
+    (tmp_path / 'dest/mirror/a.txt').unlink()
+    result = directory_sync.sync(str(source), 'mirror')
+    assert (result.files_copied, result.files_unchanged) == (1, 2)
+
+def test_invalid_paths(directory_sync, source, tmp_path):
+    with pytest.raises(FileValidationError):
+        directory_sync.sync(str(source), '../outside')
+    with pytest.raises(FileValidationError):
+        directory_sync.sync(str(tmp_path / 'missing'), 'mirror')
+
+def test_source_must_stay_inside_source_root(engine, source, tmp_path):
+    directory_sync = DirectorySync(engine, destination_root=str(tmp_path / 'dest'), source_root=str(source))
+    assert directory_sync.sync('sub', 'mirror').files_copied == 2
+    os.symlink(tmp_path, source / 'escape')
+    for outside in ('../', str(tmp_path), 'escape'):
+        with pytest.raises(FileValidationError):
+            directory_sync.sync(outside, 'mirror')
+
+def test_file_sync_task_result(directory_sync, source, engine):
+    task_manager = TaskManager(engine=engine)
+    try:
+        task_manager.register_handler('file_sync', directory_sync.run_task)
+        task = task_manager.create_task(title='Sync', task_type='file_sync', payload={
+            'source': str(source), 'destination': 'mirror'
+        })
+        task_manager.start_task(task.id)
+        deadline = time.monotonic() + 10
+        while task_manager.get_task(task.id).status != 'completed' and time.monotonic() < deadline:
+            time.sleep(0.02)
+        task = task_manager.get_task(task.id)
+        assert task.status == 'completed'
+        assert '"files_copied": 3' in task.result
+    finally:
+        task_manager.shutdown()
@@ -1,11 +1,20 @@
+import os
 import pytest
+import threading
+import time
 from datetime import datetime, timedelta
+from app.models import Task
+from src.modules.tasks.retry import RetryPolicy
 from src.modules.tasks.task_manager import TaskManager
-from src.modules.tasks.exceptions import TaskValidationError, TaskNotFoundError
+from src.modules.tasks.exceptions import (
+    TaskError, TaskValidationError, TaskNotFoundError, TaskAlreadyRunningError
+)
 
 @pytest.fixture
-def task_manager():
-    return TaskManager()
+def task_manager(tmp_path):
+    manager = TaskManager(database_uri=f"sqlite:///{tmp_path / 'tasks.db'}")
+    yield manager
+    manager.shutdown()
 
 def test_create_task(task_manager):
     task = task_manager.create_task(
@@ -102,3 +111,399 @@ def test_task_not_found(task_manager):
         
     with pytest.raises(TaskNotFoundError):
         task_manager.delete_task('non-existent-id')
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('Condition not met in time')
+        time.sleep(0.01)
+
+def wait_for_status(task_manager, task_id, statuses, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = task_manager.get_task(task_id).status
+        if status in statuses:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f'Task {task_id} did not reach {statuses}')
+
+def test_start_task_runs_handler(task_manager):
+    def handler(context):
+        context.report_progress(50)
+        context.report_progress(100)
+
+    task_manager.register_handler('copy', handler)
+    task = task_manager.create_task(title='Copy', task_type='copy', payload={'path': '/tmp/a'})
+    assert task_manager.start_task(task.id)
+
+    assert wait_for_status(task_manager, task.id, ['completed']) == 'completed'
+    finished = task_manager.get_task(task.id)
+    assert finished.progress == 100
+    assert finished.started_at is not None and finished.finished_at is not None
+
+def test_failed_task_records_error(task_manager):
+    def handler(context):
+        raise TaskError('REMOTE_UNREACHABLE', 'Server did not answer')
+
+    task_manager.register_handler('fetch', handler)
+    task = task_manager.create_task(title='Fetch', task_type='fetch')
+    task_manager.start_task(task.id)
+
+    assert wait_for_status(task_manager, task.id, ['failed']) == 'failed'
+    assert task_manager.get_task(task.id).error_code == 'REMOTE_UNREACHABLE'
+
+def test_start_task_twice_is_rejected(task_manager):
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def handler(context):
+        runs.append(context.task_id)
+        started.set()
+        release.wait(5)
+
+    task_manager.register_handler('slow', handler)
+    task = task_manager.create_task(title='Slow', task_type='slow')
+    task_manager.start_task(task.id)
+    started.wait(5)
+
+    with pytest.raises(TaskAlreadyRunningError):
+        task_manager.start_task(task.id)
+    release.set()
+    wait_for_status(task_manager, task.id, ['completed'])
+    assert runs == [task.id]
+
+def test_recover_requeues_interrupted_tasks(tmp_path):
+    database_uri = f"sqlite:///{tmp_path / 'tasks.db'}"
+    crashed = TaskManager(database_uri=database_uri, node_id='node-1')
+    task = crashed.create_task(title='Interrupted', task_type='copy')
+    crashed.update_task(task.id, {'payload': {'path': '/data'}})
+    with crashed.Session() as session:
+        session.get(Task, task.id).status = 'running'
+        session.get(Task, task.id).owner = 'node-1'
+        session.commit()
+    crashed.shutdown()
+
+    runs = []
+    restarted = TaskManager(database_uri=database_uri, node_id='node-1')
+    restarted.register_handler('copy', lambda context: runs.append(context.payload))
+    assert restarted.recover() == [task.id]
+    assert wait_for_status(restarted, task.id, ['completed']) == 'completed'
+    assert runs == [{'path': '/data'}]
+    restarted.shutdown()
+
+def chunked_copy(chunks, seen, gate=None, blocked=None):
+    """Handler processing ``chunks`` units, resuming from its checkpoint"""
+    def handler(context):
+        start = context.state['next_chunk'] if context.state else 0
+        for chunk in range(start, chunks):
+            if gate is not None:
+                if blocked is not None:
+                    blocked.append(chunk)
+                gate.acquire(timeout=5)
+            seen.append(chunk)
+            context.checkpoint(progress=(chunk + 1) * 100 // chunks, state={'next_chunk': chunk + 1})
+    return handler
+
+def test_pause_and_resume_from_checkpoint(task_manager):
+    seen = []
+    blocked = []
+    gate = threading.Semaphore(0)
+    task_manager.register_handler('copy', chunked_copy(4, seen, gate, blocked))
+    task = task_manager.create_task(title='Big copy', task_type='copy')
+    task_manager.start_task(task.id)
+
+    gate.release()
+    gate.release()
+    # Chunk 1 is checkpointed once the handler blocks before chunk 2
+    wait_until(lambda: blocked[-1:] == [2])
+    task_manager.pause_task(task.id)
+    gate.release()
+    assert wait_for_status(task_manager, task.id, ['paused']) == 'paused'
+    wait_until(lambda: task.id not in task_manager.tasks)
+
+    paused = task_manager.get_task(task.id)
+    assert paused.progress == 75
+    assert paused.checkpoint == '{"next_chunk": 3}'
+
+    task_manager.resume_task(task.id)
+    gate.release()
+    assert wait_for_status(task_manager, task.id, ['completed']) == 'completed'
+    assert seen == [0, 1, 2, 3]
+    assert task_manager.get_task(task.id).checkpoint is None
+
+def test_cancel_wakes_waiting_task(task_manager):
+    task = task_manager.create_task(title='Long wait', payload={'duration': 30})
+    task_manager.start_task(task.id)
+    wait_for_status(task_manager, task.id, ['running'])
+
+    started = time.monotonic()
+    task_manager.cancel_task(task.id)
+    wait_until(lambda: task.id not in task_manager.tasks)
+    assert time.monotonic() - started < 2
+    assert task_manager.get_task(task.id).status == 'cancelled'
+
+def test_pause_queued_task_and_invalid_transitions(task_manager):
+    task = task_manager.create_task(title='Waiting')
+    task_manager.pause_task(task.id)
+    assert task_manager.get_task(task.id).status == 'paused'
+    task_manager.cancel_task(task.id)
+
+    with pytest.raises(TaskValidationError):
+        task_manager.resume_task(task.id)
+    with pytest.raises(TaskValidationError):
+        task_manager.pause_task(task.id)
+
+def record_pid(context):
+    """Process-mode handler writing its worker pid to ``payload['path']``"""
+    context.report_progress(50)
+    with open(context.payload['path'], 'w') as f:
+        f.write(str(os.getpid()))
+    if context.payload.get('fail'):
+        raise TaskError('CHECKSUM_MISMATCH', 'Digest differs')
+
+def wait_in_process(context):
+    context.checkpoint(progress=10, state={'step': 1})
+    context.wait(30)
+
+def test_process_mode_runs_in_worker_process(task_manager, tmp_path):
+    task_manager.register_handler('hash', record_pid, mode='process')
+    ok = task_manager.create_task(title='Hash', task_type='hash', payload={'path': str(tmp_path / 'ok')})
+    bad = task_manager.create_task(title='Hash', task_type='hash',
+                                   payload={'path': str(tmp_path / 'bad'), 'fail': True})
+    task_manager.start_task(ok.id)
+    task_manager.start_task(bad.id)
+
+    assert wait_for_status(task_manager, ok.id, ['completed'], timeout=30) == 'completed'
+    assert int((tmp_path / 'ok').read_text()) != os.getpid()
+    assert wait_for_status(task_manager, bad.id, ['failed'], timeout=30) == 'failed'
+    assert task_manager.get_task(bad.id).error_code == 'CHECKSUM_MISMATCH'
+
+def test_process_pool_recycled_without_max_tasks_per_child(tmp_path, monkeypatch):
+    from src.modules.tasks import process_pool
+    monkeypatch.setattr(process_pool, 'NATIVE_MAX_TASKS_PER_CHILD', False)
+    manager = TaskManager(database_uri=f"sqlite:///{tmp_path / 'tasks.db'}",
+                          process_workers=1, max_tasks_per_process=1)
+    try:
+        manager.register_handler('hash', record_pid, mode='process')
+        pids = []
+        for name in ('first', 'second'):
+            task = manager.create_task(title='Hash', task_type='hash', payload={'path': str(tmp_path / name)})
+            manager.start_task(task.id)
+            assert wait_for_status(manager, task.id, ['completed'], timeout=30) == 'completed'
+            pids.append(int((tmp_path / name).read_text()))
+        assert pids[0] != pids[1]
+    finally:
+        manager.shutdown()
+
+def test_process_mode_pause_keeps_checkpoint(task_manager):
+    task_manager.register_handler('wait', wait_in_process, mode='process')
+    task = task_manager.create_task(title='Wait', task_type='wait')
+    task_manager.start_task(task.id)
+    wait_until(lambda: task_manager.get_task(task.id).progress == 10, timeout=30)
+
+    task_manager.pause_task(task.id)
+    wait_until(lambda: task.id not in task_manager.tasks)
+    paused = task_manager.get_task(task.id)
+    assert paused.status == 'paused'
+    assert paused.checkpoint == '{"step": 1}'
+
+def sleep_in_process(context):
+    """Process-mode handler that only checks for cancellation after a long sleep"""
+    context.report_progress(5)
+    time.sleep(context.payload['seconds'])
+    context.check()
+
+def test_process_mode_cancel_frees_pool_slot(tmp_path):
+    manager = TaskManager(database_uri=f"sqlite:///{tmp_path / 'tasks.db'}", max_workers=1)
+    try:
+        manager.register_handler('sleep', sleep_in_process, mode='process')
+        task = manager.create_task(title='Sleep', task_type='sleep', payload={'seconds': 5})
+        manager.start_task(task.id)
+        wait_until(lambda: manager.get_task(task.id).progress == 5, timeout=30)
+
+        started = time.monotonic()
+        manager.cancel_task(task.id)
+        wait_until(lambda: task.id not in manager.tasks)
+        # The single pool slot runs the next task while the worker still sleeps
+        quick = manager.create_task(title='Quick', payload={'duration': 0})
+        manager.start_task(quick.id)
+        assert wait_for_status(manager, quick.id, ['completed']) == 'completed'
+        assert time.monotonic() - started < 2
+        assert manager.get_task(task.id).status == 'cancelled'
+    finally:
+        manager.shutdown()
+
+def test_process_mode_rejects_unpicklable_handler(task_manager):
+    with pytest.raises(TaskValidationError):
+        task_manager.register_handler('inline', lambda context: None, mode='process')
+    with pytest.raises(TaskValidationError):
+        task_manager.register_handler('inline', record_pid, mode='fiber')
+
+def test_async_mode_respects_host_limits(tmp_path):
+    manager = TaskManager(database_uri=f"sqlite:///{tmp_path / 'tasks.db'}", async_host_limits={'10.0.0.5': 2})
+    active = {'10.0.0.5': 0, '10.0.0.6': 0}
+    peak = dict(active)
+
+    async def transfer(context):
+        host = context.payload['host']
+        active[host] += 1
+        peak[host] = max(peak[host], active[host])
+        await context.wait(0.3)
+        active[host] -= 1
+        await context.report_progress(100)
+
+    manager.register_handler('transfer', transfer, mode='async')
+    ids = [
+        manager.create_task(title='Transfer', task_type='transfer', payload={'host': host}).id
+        for host in ['10.0.0.5'] * 6 + ['10.0.0.6'] * 6
+    ]
+    for task_id in ids:
+        manager.start_task(task_id)
+
+    for task_id in ids:
+        assert wait_for_status(manager, task_id, ['completed']) == 'completed'
+    assert peak['10.0.0.5'] == 2
+    assert peak['10.0.0.6'] > 2
+    manager.shutdown()
+
+def test_async_mode_cancel_wakes_waiting_coroutine(task_manager):
+    async def idle(context):
+        await context.checkpoint(progress=5, state={'offset': 0})
+        await context.wait(30)
+
+    task_manager.register_handler('idle', idle, mode='async')
+    task = task_manager.create_task(title='Idle', task_type='idle')
+    task_manager.start_task(task.id)
+    wait_until(lambda: task_manager.get_task(task.id).progress == 5)
+
+    task_manager.cancel_task(task.id)
+    wait_until(lambda: task.id not in task_manager.tasks)
+    assert task_manager.get_task(task.id).status == 'cancelled'
+    assert task_manager.metrics()['async']['running'] == 0
+
+def test_async_mode_requires_coroutine_handler(task_manager):
+    with pytest.raises(TaskValidationError):
+        task_manager.register_handler('transfer', record_pid, mode='async')
+
+def test_retry_policy_backoff_bounds():
+    policy = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=5.0, jitter=0.5,
+                         retryable_codes=['REMOTE_UNREACHABLE'])
+    assert 0.5 <= policy.delay(1) <= 1.0
+    assert 1.0 <= policy.delay(2) <= 2.0
+    assert 2.5 <= policy.delay(10) <= 5.0
+    assert policy.should_retry(4, 'REMOTE_UNREACHABLE')
+    assert not policy.should_retry(5, 'REMOTE_UNREACHABLE')
+    assert not policy.should_retry(1, 'CHECKSUM_MISMATCH')
+    with pytest.raises(TaskValidationError):
+        RetryPolicy.from_dict({'max_attempts': 0})
+
+def flaky(failures, code='REMOTE_UNREACHABLE'):
+    """Handler failing its first ``failures`` attempts"""
+    attempts = []
+    def handler(context):
+        attempts.append(context.task_id)
+        if len(attempts) <= failures:
+            raise TaskError(code, 'Connection reset')
+    return handler, attempts
+
+def test_retry_then_succeed(task_manager):
+    handler, attempts = flaky(2)
+    task_manager.register_handler('fetch', handler, retry=RetryPolicy(max_attempts=3, base_delay=0.01))
+    task = task_manager.create_task(title='Fetch', task_type='fetch')
+    task_manager.start_task(task.id)
+
+    assert wait_for_status(task_manager, task.id, ['completed']) == 'completed'
+    assert len(attempts) == 3
+    assert task_manager.get_task(task.id).attempts == 3
+
+def test_exhausted_retries_dead_letter_and_requeue(task_manager):
+    handler, attempts = flaky(3)
+    task_manager.register_handler('fetch', handler)
+    task = task_manager.create_task(title='Fetch', task_type='fetch',
+                                    retry_policy={'max_attempts': 2, 'base_delay': 0.01})
+    other = task_manager.create_task(title='Fetch', task_type='fetch',
+                                     retry_policy={'max_attempts': 2, 'retryable_codes': ['TIMEOUT']})
+    task_manager.start_task(task.id)
+    task_manager.start_task(other.id)
+
+    assert wait_for_status(task_manager, task.id, ['dead_letter']) == 'dead_letter'
+    assert wait_for_status(task_manager, other.id, ['failed']) == 'failed'
+    assert task_manager.get_task(task.id).error_code == 'REMOTE_UNREACHABLE'
+
+    assert task_manager.requeue_dead_letters() == [task.id]
+    assert wait_for_status(task_manager, task.id, ['completed']) == 'completed'
+    assert len(attempts) == 4
+
+def test_dependencies_run_after_parents(task_manager):
+    order = []
+    lock = threading.Lock()
+
+    def step(context):
+        with lock:
+            order.append(context.payload['step'])
+
+    task_manager.register_handler('step', step)
+    fetch = task_manager.create_task(title='Fetch', task_type='step', payload={'step': 'fetch'})
+    verify = task_manager.create_task(title='Verify', task_type='step', payload={'step': 'verify'},
+                                      depends_on=[fetch.id])
+    index = task_manager.create_task(title='Index', task_type='step', payload={'step': 'index'},
+                                     depends_on=[fetch.id])
+    archive = task_manager.create_task(title='Archive', task_type='step', payload={'step': 'archive'},
+                                       depends_on=[verify.id, index.id])
+    for task in (archive, verify, index):
+        task_manager.start_task(task.id)
+        assert task_manager.get_task(task.id).status == 'waiting'
+    task_manager.start_task(fetch.id)
+
+    assert wait_for_status(task_manager, archive.id, ['completed']) == 'completed'
+    assert order[0] == 'fetch' and order[-1] == 'archive'
+    assert sorted(order[1:3]) == ['index', 'verify']
+    assert task_manager.get_dependencies(archive.id) == [verify.id, index.id]
+
+def test_dependency_cycles_are_rejected(task_manager):
+    first = task_manager.create_task(title='First')
+    second = task_manager.create_task(title='Second', depends_on=[first.id])
+    third = task_manager.create_task(title='Third', depends_on=[second.id])
+
+    with pytest.raises(TaskValidationError) as excinfo:
+        task_manager.update_task(first.id, {'depends_on': [third.id]})
+    assert excinfo.value.code == 'DEPENDENCY_CYCLE'
+    with pytest.raises(TaskValidationError):
+        task_manager.update_task(first.id, {'depends_on': [first.id]})
+    with pytest.raises(TaskValidationError):
+        task_manager.create_task(title='Orphan', depends_on=[999])
+
+def test_failed_parent_skips_descendants(task_manager):
+    def fail(context):
+        raise TaskError('REMOTE_UNREACHABLE', 'Server did not answer')
+
+    task_manager.register_handler('fetch', fail)
+    fetch = task_manager.create_task(title='Fetch', task_type='fetch')
+    verify = task_manager.create_task(title='Verify', depends_on=[fetch.id])
+    archive = task_manager.create_task(title='Archive', depends_on=[verify.id])
+    task_manager.start_task(verify.id)
+    task_manager.start_task(archive.id)
+    task_manager.start_task(fetch.id)
+
+    assert wait_for_status(task_manager, archive.id, ['skipped']) == 'skipped'
+    assert task_manager.get_task(verify.id).status == 'skipped'
+    assert task_manager.get_task(verify.id).error_code == 'DEPENDENCY_FAILED'
+    with pytest.raises(TaskValidationError):
+        task_manager.start_task(verify.id)
+
+def test_failed_parent_skips_pending_descendants(task_manager):
+    def fail(context):
+        raise TaskError('REMOTE_UNREACHABLE', 'Server did not answer')
+
+    task_manager.register_handler('fetch', fail)
+    fetch = task_manager.create_task(title='Fetch', task_type='fetch')
+    verify = task_manager.create_task(title='Verify', depends_on=[fetch.id])
+    archive = task_manager.create_task(title='Archive', depends_on=[verify.id])
+    # Verify is never started, so it is still pending when fetch fails
+    task_manager.start_task(archive.id)
+    task_manager.start_task(fetch.id)
+
+    assert wait_for_status(task_manager, archive.id, ['skipped']) == 'skipped'
+    assert task_manager.get_task(verify.id).status == 'skipped'
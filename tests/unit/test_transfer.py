@@ -0,0 +1,165 @@
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from sqlalchemy import create_engine, select
+from app.models import Log, db
+from src.modules.files.content_store import ContentStore
+from src.modules.files.exceptions import FileError, FileValidationError
+from src.modules.files.transfer import TransferEngine
+from src.modules.tasks.task_manager import TaskManager
+
+CONTENT = os.urandom(300 * 1024 + 123)
+
+class SourceHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a file server, with optional Range support"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.headers.get('Range'))
+            fail = server.failures > 0 and self.headers.get('Range') not in (None, 'bytes=0-0')
+            if fail:
+                server.failures -= 1
+        content = server.content
+        header = self.headers.get('Range')
+        if header and server.ranges:
+            start, end = (int(value) for value in header[len('bytes='):].split('-'))
+            body = content[start:end + 1]
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(content)}')
+        else:
+            body = content
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        if server.etag:
+            self.send_header('ETag', server.etag)
+        self.end_headers()
+        if fail:
+            # Send half the body, then drop the connection
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+@pytest.fixture
+def source():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SourceHandler)
+    server.content = CONTENT
+    server.ranges = True
+    server.failures = 0
+    server.etag = None
+    server.requests = []
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_port}/exports/data.bin'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'transfer.db'}")
+    db.metadata.create_all(engine)
+    return engine
+
+@pytest.fixture
+def transfer_engine(engine, tmp_path):
+    return TransferEngine(engine, destination_root=str(tmp_path / 'dest'), part_size=64 * 1024,
+                          max_connections=3, retry_delay=0.01)
+
+def _logs(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(Log)).fetchall()
+
+def test_parallel_ranged_copy(source, transfer_engine, engine, tmp_path):
+    checksum = hashlib.sha256(CONTENT).hexdigest()
+    result = transfer_engine.copy(source.url, 'in/data.bin', checksum=checksum, source_server_name='fs-01')
+
+    assert result.parts == 5
+    assert result.checksum == checksum
+    with open(tmp_path / 'dest' / 'in' / 'data.bin', 'rb') as f:
+        assert f.read() == CONTENT
+    assert not os.path.exists(result.path + '.part')
+    assert len([r for r in source.requests if r and r != 'bytes=0-0']) == 5
+
+    logs = _logs(engine)
+    assert len(logs) == 1
+    assert logs[0].source_server_name == 'fs-01'
+    assert logs[0].source_server_ip == '127.0.0.1'
+    assert logs[0].source_server_file_path == '/exports'
+    assert logs[0].source_server_file_name == 'data.bin'
+    assert logs[0].bytes_transferred == len(CONTENT)
+    assert logs[0].error_message is None
+
+def test_part_retried_after_dropped_connection(source, transfer_engine):
+    source.failures = 2
+    result = transfer_engine.copy(source.url, 'data.bin', checksum=hashlib.sha256(CONTENT).hexdigest())
+    with open(result.path, 'rb') as f:
+        assert f.read() == CONTENT
+
+def test_server_without_ranges(source, transfer_engine):
+    source.ranges = False
+    result = transfer_engine.copy(source.url, 'data.bin', algorithm='md5')
+    assert result.parts == 1
+    assert result.checksum == hashlib.md5(CONTENT).hexdigest()
+
+def test_checksum_mismatch_logs_failure(source, transfer_engine, engine, tmp_path):
+    with pytest.raises(FileError) as excinfo:
+        transfer_engine.copy(source.url, 'data.bin', checksum='0' * 64)
+    assert excinfo.value.code == 'CHECKSUM_MISMATCH'
+    assert os.listdir(tmp_path / 'dest') == []
+    assert 'Checksum mismatch' in _logs(engine)[0].error_message
+
+def test_destination_must_stay_inside_root(transfer_engine):
+    with pytest.raises(FileValidationError):
+        transfer_engine.copy('http://127.0.0.1:1/a', '../outside.bin')
+    with pytest.raises(FileValidationError):
+        transfer_engine.copy('ftp://example.com/a', 'a.bin')
+
+def test_file_copy_task(source, transfer_engine, engine):
+    task_manager = TaskManager(engine=engine)
+    try:
+        task_manager.register_handler('file_copy', transfer_engine.run_task)
+        task = task_manager.create_task(title='Copy', task_type='file_copy', payload={
+            'url': source.url, 'destination': 'task.bin', 'checksum': hashlib.sha256(CONTENT).hexdigest()
+        })
+        task_manager.start_task(task.id)
+        deadline = time.monotonic() + 10
+        while task_manager.get_task(task.id).status != 'completed' and time.monotonic() < deadline:
+            time.sleep(0.02)
+        task = task_manager.get_task(task.id)
+        assert task.status == 'completed'
+        assert task.progress == 100
+        assert _logs(engine)[0].task_id == task.id
+    finally:
+        task_manager.shutdown()
+
+def test_repeated_copy_is_placed_from_content_store(source, engine, tmp_path):
+    store = ContentStore(engine, str(tmp_path / 'store'))
+    transfer_engine = TransferEngine(engine, destination_root=str(tmp_path / 'dest'), part_size=64 * 1024,
+                                     content_store=store)
+    source.etag = '"v1"'
+    checksum = hashlib.sha256(CONTENT).hexdigest()
+    transfer_engine.copy(source.url, 'first.bin', checksum=checksum)
+    requests = len(source.requests)
+
+    result = transfer_engine.copy(source.url, 'second.bin', checksum=checksum)
+    # Only the probe went to the server
+    assert len(source.requests) == requests + 1
+    assert result.parts == 0 and result.checksum == checksum
+    with open(tmp_path / 'dest' / 'second.bin', 'rb') as f:
+        assert f.read() == CONTENT
+    assert _logs(engine)[-1].bytes_transferred == 0
+
+    # A new version of the source is downloaded again
+    source.etag = '"v2"'
+    result = transfer_engine.copy(source.url, 'third.bin')
+    assert result.parts > 0
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import pytest
+from sqlalchemy import create_engine, select
+from app.models import FileChecksum, db
+from src.modules.files.exceptions import FileValidationError
+from src.modules.files.verify import FileVerifier, hash_mapped
+
+CONTENT = os.urandom(3 * 1024 * 1024 + 17)
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'verify.db'}")
+    db.metadata.create_all(engine)
+    return engine
+
+@pytest.fixture
+def verifier(engine, tmp_path):
+    verifier = FileVerifier(engine, root=str(tmp_path / 'files'), workers=2)
+    yield verifier
+    verifier.shutdown()
+
+def test_hash_mapped_computes_every_algorithm(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(CONTENT)
+    digests, size, _ = hash_mapped(str(path), ['sha256', 'md5', 'blake2b'])
+    assert size == len(CONTENT)
+    assert digests == {name: hashlib.new(name, CONTENT).hexdigest() for name in ('sha256', 'md5', 'blake2b')}
+
+    (tmp_path / 'empty.bin').write_bytes(b'')
+    assert hash_mapped(str(tmp_path / 'empty.bin'), ['sha256'])[0]['sha256'] == hashlib.sha256().hexdigest()
+
+def test_verify_batch_and_reuse(verifier, engine, tmp_path, monkeypatch):
+    os.makedirs(tmp_path / 'files')
+    path = tmp_path / 'files' / 'data.bin'
+    path.write_bytes(CONTENT)
+    sha256 = hashlib.sha256(CONTENT).hexdigest()
+    files = [
+        {'path': verifier.resolve('data.bin'), 'expected': {'SHA256': sha256.upper()}},
+        {'path': verifier.resolve('data.bin'), 'expected': {'md5': '0' * 32}},
+        {'path': verifier.resolve('missing.bin')}
+    ]
+    results = verifier.verify(files, ['sha1'])
+    assert results[0]['matches'] is True and not results[0]['cached']
+    assert set(results[0]['checksums']) == {'sha1', 'sha256'}
+    assert results[1]['matches'] is False
+    assert results[2]['error']['code'] == 'FILE_NOT_FOUND'
+    with engine.connect() as connection:
+        assert {row.algorithm for row in connection.execute(select(FileChecksum))} == {'sha1', 'sha256', 'md5'}
+
+    # Unchanged files are answered from the stored digests
+    monkeypatch.setattr('src.modules.files.verify.hash_mapped', None)
+    result = verifier.verify(files[:1], ['sha1'])[0]
+    assert result['cached'] and result['matches'] is True
+
+def test_changed_file_is_hashed_again(verifier, tmp_path):
+    os.makedirs(tmp_path / 'files')
+    path = tmp_path / 'files' / 'data.bin'
+    path.write_bytes(b'first')
+    verifier.verify([{'path': str(path)}])
+    path.write_bytes(b'second version')
+    result = verifier.verify([{'path': str(path)}])[0]
+    assert not result['cached']
+    assert result['checksums']['sha256'] == hashlib.sha256(b'second version').hexdigest()
+
+def test_invalid_requests(verifier):
+    with pytest.raises(FileValidationError):
+        verifier.resolve('../outside.bin')
+    with pytest.raises(FileValidationError):
+        verifier.resolve('data.bin.part')
+    with pytest.raises(FileValidationError):
+        verifier.verify([{'path': '/tmp/x'}], ['shake_128'])
+
+def test_symlink_cannot_escape_root(verifier, tmp_path):
+    (tmp_path / 'files').mkdir(exist_ok=True)
+    (tmp_path / 'secret.bin').write_bytes(b'outside')
+    os.symlink(tmp_path / 'secret.bin', tmp_path / 'files' / 'link.bin')
+    os.symlink(tmp_path, tmp_path / 'files' / 'up')
+    with pytest.raises(FileValidationError):
+        verifier.resolve('link.bin')
+    with pytest.raises(FileValidationError):
+        verifier.resolve('up/secret.bin')
+
+    (tmp_path / 'files' / 'inside.bin').write_bytes(b'inside')
+    os.symlink(tmp_path / 'files' / 'inside.bin', tmp_path / 'files' / 'alias.bin')
+    assert verifier.resolve('alias.bin') == str(tmp_path / 'files' / 'inside.bin')
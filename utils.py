@@ -1,17 +1,10 @@
 import os
-import logging
 from datetime import datetime
+from app.logging_setup import configure_logging
 
-def setup_logger():
-    """配置日志记录器"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler("system.log"),
-            logging.StreamHandler()
-        ]
-    )
+def setup_logger(config=None):
+    """配置日志记录器 (写入 system.log 并输出到控制台)"""
+    configure_logging({'LOG_CONSOLE': True, **(config or {})})
 
 def validate_file_path(file_path):
     """验证文件路径是否存在"""